@@ -0,0 +1,158 @@
+# ban_index.py
+"""
+Name index over a guild's ban list, for unbanning people by a (partially remembered) name.
+
+Listing a guild's bans costs one API request per 1000 entries, so the index is built once and
+then kept current by the caller from ban/unban events. Lookups go through a trigram index:
+each name is split into overlapping three-character pieces, and a query only scores the
+entries sharing the most pieces with it, so search cost doesn't grow with the size of the
+ban list. Postings are compact arrays of slot numbers; removed entries leave a tombstone that
+is compacted away once tombstones outnumber live entries, like TimingWheel's cancelled timers.
+"""
+import array
+import collections
+import difflib
+
+# One search result. `exact` means the query equals the username, display name or legacy tag.
+BanMatch = collections.namedtuple('BanMatch', 'user_id name global_name score exact')
+
+
+def _fold(text):
+    return (text or "").casefold().strip()
+
+
+def _trigrams(*folded_names):
+    """Trigrams of folded names, padded so even one-letter names have some."""
+    grams = set()
+    for folded in folded_names:
+        padded = f"  {folded} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class _BanEntry:
+    """One banned user. `tag` is the legacy Name#1234 form, kept only when it differs from the name."""
+    __slots__ = ('user_id', 'name', 'global_name', 'tag')
+
+    def __init__(self, user_id, name, global_name, tag):
+        self.user_id = user_id
+        self.name = name
+        self.global_name = global_name
+        self.tag = tag if tag != name else None
+
+    def keys(self):
+        """Folded forms the query is matched against."""
+        return {_fold(self.name), _fold(self.global_name), _fold(self.tag)} - {""}
+
+
+class BanIndex:
+    """
+    Banned users of one guild, searchable by name.
+
+    While the index is being built from the ban listing (`ready` is False), `discard` remembers
+    users unbanned in the meantime so that `add_listed` doesn't resurrect them from a listing
+    page fetched before the unban.
+    """
+
+    CANDIDATES = 50 # Entries scored in full per search, taken by shared trigram count
+
+    def __init__(self):
+        self.ready = False
+        self._slots = [] # slot -> _BanEntry, or None once removed
+        self._slot_of = {} # user_id -> slot
+        self._grams = {} # trigram -> array of slots
+        self._stale = 0 # Removed slots still referenced by postings
+        self._unbanned_while_building = set()
+
+    def __len__(self):
+        return len(self._slot_of)
+
+    def __contains__(self, user_id):
+        return user_id in self._slot_of
+
+    def add(self, user_id, name, global_name=None, tag=None):
+        """Adds or replaces a banned user, e.g. from a ban event."""
+        self._unbanned_while_building.discard(user_id)
+        self._remove(user_id)
+        entry = _BanEntry(user_id, name, global_name, tag or name)
+        slot = len(self._slots)
+        self._slots.append(entry)
+        self._slot_of[user_id] = slot
+        for gram in _trigrams(*entry.keys()):
+            postings = self._grams.get(gram)
+            if postings is None:
+                postings = self._grams[gram] = array.array('I')
+            postings.append(slot)
+
+    def add_listed(self, user_id, name, global_name=None, tag=None):
+        """Adds a user from the ban listing unless they were unbanned while it was being read."""
+        if user_id not in self._unbanned_while_building:
+            self.add(user_id, name, global_name, tag)
+
+    def discard(self, user_id):
+        """Removes an unbanned user."""
+        if not self.ready:
+            self._unbanned_while_building.add(user_id)
+        self._remove(user_id)
+
+    def mark_ready(self):
+        """Called once the whole ban listing has been added."""
+        self.ready = True
+        self._unbanned_while_building.clear()
+
+    def get(self, user_id):
+        """The indexed entry for a user as a BanMatch, or None."""
+        slot = self._slot_of.get(user_id)
+        if slot is None:
+            return None
+        entry = self._slots[slot]
+        return BanMatch(entry.user_id, entry.name, entry.global_name, 1.0, True)
+
+    def search(self, query, limit=5, cutoff=0.5):
+        """
+        Best matches for a name, best first. Exact matches score 1.0; otherwise names that
+        contain the query rank above names that merely look alike.
+        """
+        folded = _fold(query)
+        if not folded:
+            return []
+        shared = collections.Counter()
+        for gram in _trigrams(folded):
+            postings = self._grams.get(gram)
+            if postings is not None:
+                shared.update(postings)
+        results = []
+        for slot, _ in shared.most_common(self.CANDIDATES):
+            entry = self._slots[slot]
+            if entry is None:
+                continue
+            score = max(self._score(folded, key) for key in entry.keys())
+            if score >= cutoff:
+                results.append(BanMatch(entry.user_id, entry.name, entry.global_name, score, score == 1.0))
+        results.sort(key=lambda match: match.score, reverse=True)
+        return results[:limit]
+
+    @staticmethod
+    def _score(folded, key):
+        if folded == key:
+            return 1.0
+        similarity = difflib.SequenceMatcher(None, folded, key).ratio()
+        if folded in key:
+            return 0.5 + similarity * 0.49 # Substring matches rank above look-alikes, below exact ones
+        return similarity * 0.9
+
+    def _remove(self, user_id):
+        slot = self._slot_of.pop(user_id, None)
+        if slot is None:
+            return
+        self._slots[slot] = None
+        self._stale += 1
+        if self._stale > max(1024, len(self._slot_of)):
+            self._compact()
+
+    def _compact(self):
+        """Rebuilds slots and postings without the removed entries."""
+        entries = [entry for entry in self._slots if entry is not None]
+        self._slots, self._slot_of, self._grams, self._stale = [], {}, {}, 0
+        for entry in entries:
+            self.add(entry.user_id, entry.name, entry.global_name, entry.tag or entry.name)
@@ -0,0 +1,154 @@
+# benchmarks/bulk_rate_limits.py
+"""
+Bulk member actions against a local mock of Discord's per-route rate limits.
+
+The mock server answers PUT /api/v10/guilds/<id>/members/<id>/roles/<id> after a fixed
+latency and enforces one bucket of --limit requests per --window seconds. It sends
+X-RateLimit-* headers like Discord, and a 429 with Retry-After once the bucket is empty.
+Every client retries a 429 after Retry-After, as discord.py does. Compared strategies:
+strictly sequential (the old mass command loop), unbounded gather, a fixed semaphore,
+and BulkExecutor with a RateLimitObserver fed by the session's trace config.
+
+Usage: python benchmarks/bulk_rate_limits.py [--members 300] [--limit 10] [--window 1.0] [--latency 0.05]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import time
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from bulk_executor import BulkExecutor, RateLimitObserver # noqa: E402
+
+GUILD_ID = 1
+ROLE_ID = 2
+
+class MockBucket:
+    """One Discord-style rate limit bucket: `limit` requests per fixed `window`."""
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self.remaining = limit
+        self.reset_at = 0.0
+        self.requests = 0
+        self.rejected = 0
+
+    def take(self):
+        """Returns (allowed, headers) for one request arriving now."""
+        now = time.monotonic()
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.window
+        self.requests += 1
+        reset_after = max(0.0, self.reset_at - now)
+        headers = {
+            'X-RateLimit-Limit': str(self.limit),
+            'X-RateLimit-Reset-After': f"{reset_after:.3f}",
+            'X-RateLimit-Bucket': 'mock-member-roles',
+        }
+        if self.remaining == 0:
+            self.rejected += 1
+            headers['X-RateLimit-Remaining'] = '0'
+            headers['Retry-After'] = f"{reset_after:.3f}"
+            return False, headers
+        self.remaining -= 1
+        headers['X-RateLimit-Remaining'] = str(self.remaining)
+        return True, headers
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def _create_mock_app(bucket, latency):
+    async def add_role(request):
+        await asyncio.sleep(latency)
+        allowed, headers = bucket.take()
+        if not allowed:
+            return web.json_response({"message": "You are being rate limited.", "retry_after": float(headers['Retry-After']), "global": False},
+                                     status=429, headers=headers)
+        return web.Response(status=204, headers=headers)
+
+    app = web.Application()
+    app.router.add_put(r'/api/v10/guilds/{guild_id:\d+}/members/{member_id:\d+}/roles/{role_id:\d+}', add_role)
+    return app
+
+async def _add_role(session, base_url, member_id):
+    """One role add, retrying 429s after Retry-After like discord.py's HTTP client."""
+    url = f"{base_url}/api/v10/guilds/{GUILD_ID}/members/{member_id}/roles/{ROLE_ID}"
+    while True:
+        async with session.put(url) as response:
+            if response.status != 429:
+                response.raise_for_status()
+                return
+            await asyncio.sleep(float(response.headers.get('Retry-After', 1)))
+
+async def run_sequential(session, base_url, members, observer):
+    for member_id in members:
+        await _add_role(session, base_url, member_id)
+
+async def run_gather(session, base_url, members, observer):
+    await asyncio.gather(*(_add_role(session, base_url, member_id) for member_id in members))
+
+async def run_semaphore(session, base_url, members, observer):
+    semaphore = asyncio.Semaphore(8)
+
+    async def one(member_id):
+        async with semaphore:
+            await _add_role(session, base_url, member_id)
+    await asyncio.gather(*(one(member_id) for member_id in members))
+
+async def run_executor(session, base_url, members, observer):
+    route = RateLimitObserver.route_key("PUT", f"/guilds/{GUILD_ID}/members/0/roles/0")
+    executor = BulkExecutor(lambda member_id: _add_role(session, base_url, member_id),
+                            route=route, observer=observer, max_concurrency=8)
+    result = await executor.run(members)
+    assert result.failed == 0, result.failures[:3]
+
+STRATEGIES = {
+    "sequential": run_sequential,
+    "gather (unbounded)": run_gather,
+    "semaphore(8)": run_semaphore,
+    "BulkExecutor": run_executor,
+}
+
+async def bench(strategy, args):
+    bucket = MockBucket(args.limit, args.window)
+    runner = web.AppRunner(_create_mock_app(bucket, args.latency), access_log=None)
+    await runner.setup()
+    port = _free_port()
+    await web.TCPSite(runner, '127.0.0.1', port).start()
+    observer = RateLimitObserver()
+    try:
+        async with aiohttp.ClientSession(trace_configs=[observer.trace_config()]) as session:
+            start = time.perf_counter()
+            await STRATEGIES[strategy](session, f"http://127.0.0.1:{port}", list(range(1, args.members + 1)), observer)
+            elapsed = time.perf_counter() - start
+    finally:
+        await runner.cleanup()
+    return elapsed, bucket.requests, bucket.rejected
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--members', type=int, default=300, help='role adds per run')
+    parser.add_argument('--limit', type=int, default=10, help='requests per bucket window')
+    parser.add_argument('--window', type=float, default=1.0, help='bucket window in seconds')
+    parser.add_argument('--latency', type=float, default=0.05, help='mock server latency per request')
+    parser.add_argument('--strategies', nargs='+', default=list(STRATEGIES), choices=list(STRATEGIES))
+    args = parser.parse_args()
+
+    ideal = args.members / args.limit * args.window
+    print(f"{args.members} role adds, bucket {args.limit}/{args.window}s, {args.latency * 1000:.0f}ms latency "
+          f"(bucket-bound minimum ~{ideal:.1f}s)")
+    print(f"{'strategy':>20} {'elapsed':>9} {'requests':>9} {'429s':>6}")
+    for strategy in args.strategies:
+        elapsed, requests, rejected = asyncio.run(bench(strategy, args))
+        print(f"{strategy:>20} {elapsed:8.2f}s {requests:>9} {rejected:>6}")
+
+if __name__ == '__main__':
+    main()
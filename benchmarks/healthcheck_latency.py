@@ -0,0 +1,137 @@
+# benchmarks/healthcheck_latency.py
+"""
+Health-check latency under simulated message load: the old threaded Flask keep-alive
+server versus the aiohttp server running on the bot's event loop.
+
+The "bot" is an asyncio loop handling synthetic messages (AutoMod-style regex scans with an
+await between messages). A probe thread hits GET / over a keep-alive connection and records
+round-trip times. Flask is only needed for the threaded run and is skipped if not installed.
+
+Usage: python benchmarks/healthcheck_latency.py [--rate 2000] [--seconds 5] [--probes-per-second 50]
+"""
+import argparse
+import asyncio
+import http.client
+import logging
+import os
+import re
+import socket
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import webserver # noqa: E402
+
+INVITE_PATTERN = re.compile(r"(?:discord\.gg|discord(?:app)?\.com/invite)/[a-zA-Z0-9-]+")
+LINK_PATTERN = re.compile(r"https?://\S+")
+SAMPLE_MESSAGE = "hey everyone check out https://example.com/some/page and tell me what you think " * 4
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+async def _message_load(rate, stop_at):
+    """Handles `rate` synthetic messages per second until `stop_at`."""
+    interval = 1 / rate
+    next_at = time.perf_counter()
+    handled = 0
+    while time.perf_counter() < stop_at:
+        INVITE_PATTERN.search(SAMPLE_MESSAGE)
+        LINK_PATTERN.search(SAMPLE_MESSAGE)
+        SAMPLE_MESSAGE.lower().split()
+        handled += 1
+        next_at += interval
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+    return handled
+
+def _probe(port, probes_per_second, stop_at, results):
+    """Runs in a thread: times GET / until `stop_at`."""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+    while time.perf_counter() < stop_at:
+        start = time.perf_counter()
+        conn.request('GET', '/')
+        conn.getresponse().read()
+        results.append(time.perf_counter() - start)
+        time.sleep(1 / probes_per_second)
+    conn.close()
+
+def _wait_for_port(port, timeout=5.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"server on port {port} did not come up")
+
+async def _run_with_probe(port, args):
+    stop_at = time.perf_counter() + args.seconds
+    results = []
+    probe = threading.Thread(target=_probe, args=(port, args.probes_per_second, stop_at, results), daemon=True)
+    probe.start()
+    handled = await _message_load(args.rate, stop_at)
+    await asyncio.to_thread(probe.join)
+    return results, handled
+
+async def bench_aiohttp(args):
+    port = _free_port()
+    os.environ['PORT'] = str(port)
+    await webserver.start_web_server()
+    try:
+        _wait_for_port(port)
+        return await _run_with_probe(port, args)
+    finally:
+        await webserver.stop_web_server()
+
+async def bench_flask_thread(args):
+    from flask import Flask
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR) # No per-request access log
+    app = Flask('')
+    app.add_url_rule('/', 'home', lambda: "Bot is alive!")
+    port = _free_port()
+    server = make_server('127.0.0.1', port, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        _wait_for_port(port)
+        return await _run_with_probe(port, args)
+    finally:
+        server.shutdown()
+
+def _report(name, results, handled, seconds):
+    if not results:
+        print(f"{name:>14}: no probes completed")
+        return
+    ordered = sorted(results)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(
+        f"{name:>14}: {len(results)} probes  p50 {statistics.median(results) * 1000:6.2f}ms  "
+        f"p99 {p99 * 1000:6.2f}ms  max {ordered[-1] * 1000:6.2f}ms  "
+        f"messages/s {handled / seconds:8.0f}"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rate', type=int, default=2000, help='synthetic messages per second')
+    parser.add_argument('--seconds', type=float, default=5.0, help='duration of each run')
+    parser.add_argument('--probes-per-second', type=int, default=50, help='health checks per second')
+    args = parser.parse_args()
+
+    print(f"Message load: {args.rate}/s for {args.seconds}s, {args.probes_per_second} health checks/s")
+    results, handled = asyncio.run(bench_aiohttp(args))
+    _report("aiohttp (loop)", results, handled, args.seconds)
+    try:
+        results, handled = asyncio.run(bench_flask_thread(args))
+    except ImportError:
+        print("  flask thread: skipped (Flask is not installed)")
+    else:
+        _report("flask thread", results, handled, args.seconds)
+
+if __name__ == '__main__':
+    main()
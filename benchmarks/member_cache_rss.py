@@ -0,0 +1,100 @@
+# benchmarks/member_cache_rss.py
+"""
+Resident memory of the member cache across guild sizes: discord.py's full member cache versus
+the lazy policy (bot.py's MEMBER_CACHE_POLICY=lazy) backed by RecentMemberCache.
+
+Each guild size and policy runs in a fresh subprocess. "full" adds every member to the guild
+the way chunking at startup does. "lazy" adds only the bot itself, then feeds the members
+who were active (--active-fraction of the guild, seen in messages) through RecentMemberCache
+with the default 5,000-member bound. Members are real discord.Member objects built from
+gateway-shaped payloads with a couple of roles each.
+
+Usage: python benchmarks/member_cache_rss.py [--sizes 10000 100000 500000] [--active-fraction 0.02]
+"""
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import discord # noqa: E402
+from discord.state import ConnectionState # noqa: E402
+from member_cache import RecentMemberCache # noqa: E402
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+GUILD_ID = 100000000000000000
+BOT_ID = 200000000000000000
+
+def _rss():
+    """Current resident set size in bytes (Linux)."""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * PAGE_SIZE
+
+def _role(role_id, position):
+    return {"id": str(role_id), "name": f"role-{position}", "permissions": "0", "position": position,
+            "color": 0, "hoist": False, "managed": False, "mentionable": False}
+
+def _make_guild(cache_flags):
+    intents = discord.Intents.default()
+    intents.members = True
+    state = ConnectionState(dispatch=lambda *args, **kwargs: None, handlers={}, hooks={}, http=None,
+                            intents=intents, member_cache_flags=cache_flags)
+    roles = [_role(GUILD_ID, 0)] + [_role(GUILD_ID + i, i) for i in range(1, 21)]
+    return state, discord.Guild(data={"id": str(GUILD_ID), "name": "bench", "roles": roles, "member_count": 0}, state=state)
+
+def _member(guild, state, user_id):
+    data = {
+        "user": {"id": str(user_id), "username": f"user{user_id}", "discriminator": "0", "avatar": None, "global_name": f"User {user_id}"},
+        "roles": [str(GUILD_ID + 1 + user_id % 20), str(GUILD_ID + 1 + (user_id // 20) % 20)],
+        "joined_at": "2024-01-01T00:00:00+00:00", "deaf": False, "mute": False, "flags": 0,
+    }
+    return discord.Member(data=data, guild=guild, state=state)
+
+def bench(policy, size, active_fraction):
+    gc.collect()
+    base = _rss()
+    if policy == "full":
+        state, guild = _make_guild(discord.MemberCacheFlags.all())
+        for i in range(size):
+            guild._add_member(_member(guild, state, BOT_ID + 1 + i)) # What chunking at startup does
+        cached = len(guild.members)
+    else:
+        state, guild = _make_guild(discord.MemberCacheFlags.none())
+        guild._add_member(_member(guild, state, BOT_ID)) # discord.py always caches the bot itself
+        cache = RecentMemberCache()
+        step = max(1, round(1 / active_fraction)) if active_fraction else size + 1
+        for i in range(0, size, step):
+            cache.remember(_member(guild, state, BOT_ID + 1 + i))
+        cached = len(cache) + len(guild.members)
+    gc.collect()
+    return {"memory": _rss() - base, "cached": cached}
+
+def _run_isolated(policy, size, active_fraction):
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', policy, str(size), str(active_fraction)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 500_000])
+    parser.add_argument('--active-fraction', type=float, default=0.02, help='share of members seen recently')
+    parser.add_argument('--child', nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        policy, size, active_fraction = args.child
+        print(json.dumps(bench(policy, int(size), float(active_fraction))))
+        return
+
+    print(f"{'members':>10} {'policy':>6} {'cached':>8} {'RSS added':>12} {'bytes/member':>13}")
+    for size in args.sizes:
+        for policy in ("full", "lazy"):
+            result = _run_isolated(policy, size, args.active_fraction)
+            print(f"{size:>10} {policy:>6} {result['cached']:>8} {result['memory'] / 2**20:>10.1f}MB {result['memory'] / size:>13.0f}")
+
+if __name__ == '__main__':
+    main()
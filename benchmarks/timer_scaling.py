@@ -0,0 +1,148 @@
+# benchmarks/timer_scaling.py
+"""
+Pending-timer scaling: one asyncio.sleep task per timer vs a heapq min-heap vs TimingWheel.
+
+For each size, every strategy runs in a fresh subprocess so resident memory can be compared.
+Timers are spread uniformly over 30 days. Measured: time to schedule all timers, resident
+memory added per pending timer, time to cancel 10% of them, and (heap and wheel) time to
+drain everything by advancing the clock past the horizon in one-second steps.
+
+asyncio.sleep tasks cost around a kilobyte each, so that strategy is skipped above
+--max-sleep-tasks (default 1,000,000) to keep the benchmark from exhausting memory.
+
+Usage: python benchmarks/timer_scaling.py [--sizes 10000 1000000 5000000] [--max-sleep-tasks 1000000]
+"""
+import argparse
+import asyncio
+import heapq
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from timing_wheel import TimingWheel # noqa: E402
+
+HORIZON = 30 * 86400 # Timers are due within 30 days
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+def _rss():
+    """Current resident set size in bytes (Linux)."""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * PAGE_SIZE
+
+def _dues(n):
+    rng = random.Random(42)
+    return [rng.uniform(1, HORIZON) for _ in range(n)]
+
+def bench_sleep(n):
+    dues = _dues(n)
+
+    async def run():
+        base = _rss()
+        start = time.perf_counter()
+        tasks = [asyncio.ensure_future(asyncio.sleep(due)) for due in dues]
+        await asyncio.sleep(0) # Let every task start and park in its sleep
+        schedule = time.perf_counter() - start
+        memory = _rss() - base
+        start = time.perf_counter()
+        for task in tasks[::10]:
+            task.cancel()
+        await asyncio.sleep(0)
+        cancel = time.perf_counter() - start
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return {"schedule": schedule, "memory": memory, "cancel": cancel, "drain": None}
+
+    return asyncio.run(run())
+
+def bench_heap(n):
+    dues = _dues(n)
+    base = _rss()
+    start = time.perf_counter()
+    heap = []
+    live = {}
+    for key, due in enumerate(dues):
+        heapq.heappush(heap, (due, key))
+        live[key] = due
+    schedule = time.perf_counter() - start
+    memory = _rss() - base
+    start = time.perf_counter()
+    for key in range(0, n, 10):
+        del live[key] # Lazy cancel: the heap entry stays until it reaches the top
+    cancel = time.perf_counter() - start
+    start = time.perf_counter()
+    fired = 0
+    for now in range(0, HORIZON + 2):
+        while heap and heap[0][0] <= now:
+            due, key = heapq.heappop(heap)
+            if live.pop(key, None) is not None:
+                fired += 1
+    drain = time.perf_counter() - start
+    assert fired == n - len(range(0, n, 10))
+    return {"schedule": schedule, "memory": memory, "cancel": cancel, "drain": drain}
+
+def bench_wheel(n):
+    dues = _dues(n)
+    clock = [0.0]
+    base = _rss()
+    start = time.perf_counter()
+    wheel = TimingWheel(tick=1.0, clock=lambda: clock[0])
+    for key, due in enumerate(dues):
+        wheel.insert(key, due)
+    schedule = time.perf_counter() - start
+    memory = _rss() - base
+    start = time.perf_counter()
+    for key in range(0, n, 10):
+        wheel.cancel(key)
+    cancel = time.perf_counter() - start
+    start = time.perf_counter()
+    fired = 0
+    for now in range(0, HORIZON + 2):
+        fired += len(wheel.advance(now))
+    drain = time.perf_counter() - start
+    assert fired == n - len(range(0, n, 10))
+    return {"schedule": schedule, "memory": memory, "cancel": cancel, "drain": drain}
+
+STRATEGIES = {"asyncio.sleep": bench_sleep, "heapq": bench_heap, "TimingWheel": bench_wheel}
+
+def _run_isolated(strategy, n):
+    """Runs one strategy/size in a fresh interpreter and returns its measurements."""
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', strategy, str(n)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def _format(seconds):
+    return "-" if seconds is None else f"{seconds:8.2f}s"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 1_000_000, 5_000_000])
+    parser.add_argument('--max-sleep-tasks', type=int, default=1_000_000)
+    parser.add_argument('--child', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        strategy, n = args.child
+        print(json.dumps(STRATEGIES[strategy](int(n))))
+        return
+
+    print(f"{'timers':>10} {'strategy':>14} {'schedule':>10} {'bytes/timer':>12} {'cancel 10%':>11} {'drain':>10}")
+    for n in args.sizes:
+        for strategy in STRATEGIES:
+            if strategy == "asyncio.sleep" and n > args.max_sleep_tasks:
+                print(f"{n:>10} {strategy:>14} {'skipped (--max-sleep-tasks)':>46}")
+                continue
+            result = _run_isolated(strategy, n)
+            print(
+                f"{n:>10} {strategy:>14} {_format(result['schedule']):>10} {result['memory'] / n:>12.0f} "
+                f"{_format(result['cancel']):>11} {_format(result['drain']):>10}"
+            )
+
+if __name__ == '__main__':
+    main()
@@ -2,15 +2,35 @@
 import discord
 from discord.ext import commands, tasks
 import asyncio
+import bisect
+import collections
 import datetime
+import functools
+import itertools
 import json
+import math
 import os
 import aiohttp # For fetching images for emoji commands and now for memes
 from io import BytesIO # For handling image data
-from typing import Union # Import Union from the typing module
+from typing import Optional, Union # Import Union from the typing module
 import random # For random bot statuses
+import csv # For ban list exports
 import re # For parsing time strings in remindme
-from webserver import keep_alive # Import the keep_alive function from webserver.py
+import shlex # For quoted terms in purge filter expressions
+try:
+    from re import _parser as _regex_parser, _constants as _regex_constants # Python 3.11+
+except ImportError:
+    import sre_parse as _regex_parser, sre_constants as _regex_constants
+import tempfile # Scratch files for ban list exports
+import time
+import types
+import uuid
+from ban_index import BanIndex # Searchable name index over a guild's bans
+from bulk_executor import BulkExecutor, RateLimitObserver # Rate-limit-aware bulk operations
+from member_cache import RecentMemberCache # Bounded member cache for the lazy cache policy
+from message_cache import BudgetedMessageCache # Memory-budgeted message cache shared by channel activity
+from timing_wheel import TimingWheel # Scheduler index for pending jobs
+from webserver import start_web_server, stop_web_server, set_metrics_provider, set_health_provider, register_admin_resource # Web server helpers from webserver.py
 
 # IMPORTANT: Get the Discord bot token from environment variables for security.
 # When deploying to Render, you will set this environment variable in their dashboard.
@@ -25,12 +45,37 @@ intents.members = True # Required to access member information (e.g., for kick/b
 intents.message_content = True # Required to read message content for commands
 intents.voice_states = True # Required for voice channel moderation commands
 
+# Member cache policy (MEMBER_CACHE_POLICY environment variable):
+# "full" (default) keeps every member of every guild in memory, as discord.py does by default.
+# "lazy" only lets discord.py cache the bot itself and members in voice channels; members who
+# were seen recently or hold one of MEMBER_CACHE_ROLE_IDS (comma-separated) are kept in a small
+# bounded cache, and everyone else is fetched on demand (see "Lazy Member Cache").
+MEMBER_CACHE_POLICY = os.environ.get("MEMBER_CACHE_POLICY", "full").lower()
+LAZY_MEMBER_CACHE = MEMBER_CACHE_POLICY == "lazy"
+MEMBER_CACHE_TTL = float(os.environ.get("MEMBER_CACHE_TTL", 900)) # Seconds a recently seen member is kept
+MEMBER_CACHE_MAX_PER_GUILD = int(os.environ.get("MEMBER_CACHE_MAX_PER_GUILD", 5000))
+MEMBER_CACHE_ROLE_IDS = {int(role_id) for role_id in os.environ.get("MEMBER_CACHE_ROLE_IDS", "").split(",") if role_id.strip().isdigit()}
+if LAZY_MEMBER_CACHE:
+    member_cache_flags = discord.MemberCacheFlags.none()
+    member_cache_flags.voice = True # mass_move_vc and voice channel info need voice members
+else:
+    member_cache_flags = discord.MemberCacheFlags.from_intents(intents)
+
+# Message cache: discord.py's own cache (last 1000 messages across every guild) is turned off and
+# replaced by a cache with a global memory budget (MESSAGE_CACHE_BUDGET_MB) that channels share by
+# how much traffic and moderation activity they see (see "Message Cache").
+MESSAGE_CACHE_BUDGET_MB = float(os.environ.get("MESSAGE_CACHE_BUDGET_MB", 64))
+MESSAGE_CACHE_HALF_LIFE = float(os.environ.get("MESSAGE_CACHE_HALF_LIFE", 600)) # Seconds for a channel's activity score to halve
+
 # --- Persistent Storage File Paths ---
 PREFIXES_FILE = 'prefixes.json'
 WARNINGS_FILE = 'warnings.json'
 MOD_LOG_CHANNELS_FILE = 'mod_log_channels.json'
 AFK_FILE = 'afk_status.json' # New file for AFK status
 AUTOMOD_SETTINGS_FILE = 'automod_settings.json' # New file for AutoMod settings
+AUTORESPONDERS_FILE = 'autoresponders.json' # Per-guild keyword auto-responses
+SCHEDULED_JOBS_FILE = 'scheduled_jobs.json' # Pending reminders, timed unmutes, etc.
+MASS_JOBS_FILE = 'mass_jobs.json' # Checkpoints of running/paused mass operations
 
 # --- In-memory Dictionaries (will be loaded from/saved to files) ---
 guild_prefixes = {}
@@ -38,6 +83,10 @@ user_warnings = {}
 mod_log_channels = {}
 afk_status = {} # New dictionary for AFK status
 automod_settings = {} # Will be loaded from file
+store_versions = collections.Counter() # store name -> change counter, used for admin API ETags
+autoresponders = {} # guild_id -> {trigger: {"response": str, "embed": bool, "cooldown": int}}
+scheduled_jobs = {} # job_id -> {"kind": str, "due": unix timestamp, "data": dict}
+mass_jobs = {} # job_id -> job record with a member ID cursor; see "Resumable Mass Jobs"
 
 # --- Bot Activities for Status ---
 # Changed to dnd status and watching "SERVERS !!!"
@@ -55,6 +104,7 @@ def load_prefixes():
             try:
                 guild_prefixes = json.load(f)
                 # Convert string keys (guild IDs) back to integers
+                # Values are either a single prefix string or {"prefixes": [...], "case_insensitive": bool}
                 guild_prefixes = {int(k): v for k, v in guild_prefixes.items()}
                 print(f"Loaded prefixes: {guild_prefixes}")
             except json.JSONDecodeError:
@@ -63,6 +113,7 @@ def load_prefixes():
     else:
         print(f"{PREFIXES_FILE} not found. Starting with empty prefixes.")
         guild_prefixes = {}
+    _prefix_matchers.clear() # Compiled matchers are stale after a reload
 
 def save_prefixes():
     """Saves custom prefixes to a JSON file."""
@@ -74,6 +125,7 @@ def save_prefixes():
 def load_warnings():
     """Loads user warnings from a JSON file."""
     global user_warnings
+    store_versions["warnings"] += 1
     if os.path.exists(WARNINGS_FILE):
         with open(WARNINGS_FILE, 'r') as f:
             try:
@@ -90,6 +142,7 @@ def load_warnings():
 
 def save_warnings():
     """Saves user warnings to a JSON file."""
+    store_versions["warnings"] += 1
     with open(WARNINGS_FILE, 'w') as f:
         # Convert integer keys (user IDs) to strings for JSON serialization
         json.dump({str(k): v for k, v in user_warnings.items()}, f, indent=4)
@@ -122,6 +175,7 @@ def save_mod_log_channels():
 def load_afk_status():
     """Loads AFK statuses from a JSON file."""
     global afk_status
+    store_versions["afk_status"] += 1
     if os.path.exists(AFK_FILE):
         with open(AFK_FILE, 'r') as f:
             try:
@@ -138,6 +192,7 @@ def load_afk_status():
 
 def save_afk_status():
     """Saves AFK statuses to a JSON file."""
+    store_versions["afk_status"] += 1
     with open(AFK_FILE, 'w') as f:
         # Convert integer keys (user IDs) to strings for JSON serialization
         json.dump({str(k): v for k, v in afk_status.items()}, f, indent=4)
@@ -146,6 +201,7 @@ def save_afk_status():
 def load_automod_settings():
     """Loads AutoMod settings from a JSON file."""
     global automod_settings
+    store_versions["automod_settings"] += 1
     if os.path.exists(AUTOMOD_SETTINGS_FILE):
         with open(AUTOMOD_SETTINGS_FILE, 'r') as f:
             try:
@@ -176,23 +232,558 @@ def load_automod_settings():
 
 def save_automod_settings():
     """Saves AutoMod settings to a JSON file."""
+    store_versions["automod_settings"] += 1
     with open(AUTOMOD_SETTINGS_FILE, 'w') as f:
         json.dump(automod_settings, f, indent=4)
         print(f"Saved AutoMod settings: {automod_settings}")
 
+def load_autoresponders():
+    """Loads per-guild auto-responder triggers from a JSON file."""
+    global autoresponders
+    if os.path.exists(AUTORESPONDERS_FILE):
+        with open(AUTORESPONDERS_FILE, 'r') as f:
+            try:
+                autoresponders = json.load(f)
+                # Convert string keys (guild IDs) back to integers
+                autoresponders = {int(k): v for k, v in autoresponders.items()}
+                print(f"Loaded auto-responders for {len(autoresponders)} guild(s).")
+            except json.JSONDecodeError:
+                print(f"Error decoding {AUTORESPONDERS_FILE}. Starting with no auto-responders.")
+                autoresponders = {}
+    else:
+        print(f"{AUTORESPONDERS_FILE} not found. Starting with no auto-responders.")
+        autoresponders = {}
+    _autoresponder_index.clear() # Any compiled indexes are stale after a reload
+
+def save_autoresponders():
+    """Saves per-guild auto-responder triggers to a JSON file."""
+    with open(AUTORESPONDERS_FILE, 'w') as f:
+        # Convert integer keys (guild IDs) to strings for JSON serialization
+        json.dump({str(k): v for k, v in autoresponders.items()}, f, indent=4)
+        print(f"Saved auto-responders for {len(autoresponders)} guild(s).")
+
+def load_scheduled_jobs():
+    """Loads pending scheduled jobs from a JSON file and rebuilds the scheduler's timing wheel."""
+    global scheduled_jobs
+    if os.path.exists(SCHEDULED_JOBS_FILE):
+        with open(SCHEDULED_JOBS_FILE, 'r') as f:
+            try:
+                scheduled_jobs = json.load(f)
+                print(f"Loaded {len(scheduled_jobs)} scheduled job(s).")
+            except json.JSONDecodeError:
+                print(f"Error decoding {SCHEDULED_JOBS_FILE}. Starting with no scheduled jobs.")
+                scheduled_jobs = {}
+    else:
+        print(f"{SCHEDULED_JOBS_FILE} not found. Starting with no scheduled jobs.")
+        scheduled_jobs = {}
+    _rebuild_job_wheel()
+
+def save_scheduled_jobs():
+    """Saves pending scheduled jobs to a JSON file."""
+    with open(SCHEDULED_JOBS_FILE, 'w') as f:
+        json.dump(scheduled_jobs, f, indent=4)
+        print(f"Saved {len(scheduled_jobs)} scheduled job(s).")
+
+def load_mass_jobs():
+    """Loads mass job checkpoints from a JSON file."""
+    global mass_jobs
+    if os.path.exists(MASS_JOBS_FILE):
+        with open(MASS_JOBS_FILE, 'r') as f:
+            try:
+                mass_jobs = json.load(f)
+                print(f"Loaded {len(mass_jobs)} mass job(s).")
+            except json.JSONDecodeError:
+                print(f"Error decoding {MASS_JOBS_FILE}. Starting with no mass jobs.")
+                mass_jobs = {}
+    else:
+        print(f"{MASS_JOBS_FILE} not found. Starting with no mass jobs.")
+        mass_jobs = {}
+
+def save_mass_jobs():
+    """Saves mass job checkpoints to a JSON file."""
+    with open(MASS_JOBS_FILE, 'w') as f:
+        json.dump(mass_jobs, f, indent=4)
+        print(f"Saved {len(mass_jobs)} mass job(s).")
+
+# --- Metrics ---
+# Plain counters and histograms updated from the event loop. The /metrics route is served
+# from the same loop, so rendering reads them without any locking and a scrape only costs
+# the time to format the text.
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class _Histogram:
+    """Fixed-bucket latency histogram in the Prometheus layout (last slot is +Inf)."""
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+command_latency = {} # qualified command name -> _Histogram
+command_invocations = collections.Counter() # (command, "success"/"failure") -> count
+command_errors = collections.Counter() # (command, exception type name) -> count
+command_cooldown_rejections = collections.Counter() # command -> count
+event_phase_latency = {} # (event, phase) -> _Histogram
+
+def _observe(histograms, key, seconds):
+    """Records one latency observation, creating the histogram on first use."""
+    histogram = histograms.get(key)
+    if histogram is None:
+        histogram = histograms[key] = _Histogram()
+    histogram.observe(seconds)
+
+class _PhaseTimer:
+    """Context manager timing one phase of an event handler, awaits included."""
+    __slots__ = ('key', 'start')
+
+    def __init__(self, event, phase):
+        self.key = (event, phase)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        _observe(event_phase_latency, self.key, time.perf_counter() - self.start)
+
+def _metric_labels(**labels):
+    """Formats a Prometheus label set, escaping values."""
+    parts = []
+    for name, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+def _render_histograms(lines, metric, histograms, label_names):
+    """Appends cumulative bucket, sum and count lines for each histogram."""
+    for key, histogram in list(histograms.items()):
+        labels = dict(zip(label_names, key if isinstance(key, tuple) else (key,)))
+        counts = list(histogram.counts)
+        cumulative = 0
+        for bound, bucket_count in zip(LATENCY_BUCKETS + ("+Inf",), counts):
+            cumulative += bucket_count
+            lines.append(f"{metric}_bucket{_metric_labels(**labels, le=bound)} {cumulative}")
+        lines.append(f"{metric}_sum{_metric_labels(**labels)} {histogram.total}")
+        lines.append(f"{metric}_count{_metric_labels(**labels)} {cumulative}")
+
+def render_metrics():
+    """Renders every bot metric in the Prometheus text exposition format."""
+    lines = []
+
+    lines.append("# HELP bot_command_invocations_total Commands invoked, by outcome.")
+    lines.append("# TYPE bot_command_invocations_total counter")
+    for (command, outcome), count in list(command_invocations.items()):
+        lines.append(f"bot_command_invocations_total{_metric_labels(command=command, outcome=outcome)} {count}")
+
+    lines.append("# HELP bot_command_errors_total Command errors, by exception type.")
+    lines.append("# TYPE bot_command_errors_total counter")
+    for (command, error_type), count in list(command_errors.items()):
+        lines.append(f"bot_command_errors_total{_metric_labels(command=command, error=error_type)} {count}")
+
+    lines.append("# HELP bot_command_cooldown_rejections_total Invocations rejected by a cooldown.")
+    lines.append("# TYPE bot_command_cooldown_rejections_total counter")
+    for command, count in list(command_cooldown_rejections.items()):
+        lines.append(f"bot_command_cooldown_rejections_total{_metric_labels(command=command)} {count}")
+
+    lines.append("# HELP bot_command_latency_seconds Time spent in command callbacks.")
+    lines.append("# TYPE bot_command_latency_seconds histogram")
+    _render_histograms(lines, "bot_command_latency_seconds", command_latency, ("command",))
+
+    lines.append("# HELP bot_event_phase_latency_seconds Time spent in each phase of an event handler.")
+    lines.append("# TYPE bot_event_phase_latency_seconds histogram")
+    _render_histograms(lines, "bot_event_phase_latency_seconds", event_phase_latency, ("event", "phase"))
+
+    lag_samples = list(loop_lag_samples)
+    lines.append("# HELP bot_event_loop_lag_seconds Most recent event loop lag sample.")
+    lines.append("# TYPE bot_event_loop_lag_seconds gauge")
+    lines.append(f"bot_event_loop_lag_seconds {lag_samples[-1] if lag_samples else 0.0}")
+    lines.append("# HELP bot_event_loop_lag_max_seconds Worst event loop lag in the sample window.")
+    lines.append("# TYPE bot_event_loop_lag_max_seconds gauge")
+    lines.append(f"bot_event_loop_lag_max_seconds {max(lag_samples, default=0.0)}")
+    lines.append("# HELP bot_slow_steps_total Handler steps that blocked the loop past the threshold.")
+    lines.append("# TYPE bot_slow_steps_total counter")
+    lines.append(f"bot_slow_steps_total {slow_step_count}")
+
+    lines.append("# HELP bot_gateway_latency_seconds Latest gateway heartbeat latency.")
+    lines.append("# TYPE bot_gateway_latency_seconds gauge")
+    gateway_latency = bot.latency
+    lines.append(f"bot_gateway_latency_seconds {gateway_latency if gateway_latency == gateway_latency else 0.0}") # NaN before the first heartbeat
+
+    lines.append("# HELP bot_member_permission_cache_total Member permission cache lookups, by result.")
+    lines.append("# TYPE bot_member_permission_cache_total counter")
+    lines.append(f'bot_member_permission_cache_total{{result="hit"}} {perm_cache_stats["hits"]}')
+    lines.append(f'bot_member_permission_cache_total{{result="miss"}} {perm_cache_stats["misses"]}')
+    lines.append(f'bot_member_permission_cache_total{{result="eviction"}} {perm_cache_stats["evictions"]}')
+    lines.append("# HELP bot_lazy_member_cache_size Members held by the lazy member cache.")
+    lines.append("# TYPE bot_lazy_member_cache_size gauge")
+    lines.append(f"bot_lazy_member_cache_size {len(member_cache)}")
+    lines.append("# HELP bot_lazy_member_cache_total Lazy member cache lookups and evictions.")
+    lines.append("# TYPE bot_lazy_member_cache_total counter")
+    lines.append(f'bot_lazy_member_cache_total{{result="hit"}} {member_cache.hits}')
+    lines.append(f'bot_lazy_member_cache_total{{result="miss"}} {member_cache.misses}')
+    lines.append(f'bot_lazy_member_cache_total{{result="eviction"}} {member_cache.evictions}')
+
+    cache_stats = message_cache.stats()
+    lines.append("# HELP bot_message_cache_bytes Estimated memory held by the message cache.")
+    lines.append("# TYPE bot_message_cache_bytes gauge")
+    lines.append(f"bot_message_cache_bytes {cache_stats['bytes']}")
+    lines.append("# HELP bot_message_cache_budget_bytes Memory budget of the message cache.")
+    lines.append("# TYPE bot_message_cache_budget_bytes gauge")
+    lines.append(f"bot_message_cache_budget_bytes {cache_stats['budget_bytes']}")
+    lines.append("# HELP bot_message_cache_messages Messages held by the message cache.")
+    lines.append("# TYPE bot_message_cache_messages gauge")
+    lines.append(f"bot_message_cache_messages {cache_stats['messages']}")
+    lines.append("# HELP bot_message_cache_channels Channels with cached messages.")
+    lines.append("# TYPE bot_message_cache_channels gauge")
+    lines.append(f"bot_message_cache_channels {cache_stats['channels']}")
+    lines.append("# HELP bot_message_cache_total Message cache lookups and evictions.")
+    lines.append("# TYPE bot_message_cache_total counter")
+    lines.append(f'bot_message_cache_total{{result="hit"}} {cache_stats["hits"]}')
+    lines.append(f'bot_message_cache_total{{result="miss"}} {cache_stats["misses"]}')
+    lines.append(f'bot_message_cache_total{{result="eviction"}} {cache_stats["evictions"]}')
+
+    lines.append("# HELP bot_mod_log_pending Mod-log embeds waiting to be delivered.")
+    lines.append("# TYPE bot_mod_log_pending gauge")
+    lines.append(f"bot_mod_log_pending {mod_log_pending()}")
+    lines.append("# HELP bot_mod_log_embeds_total Mod-log embeds, by outcome.")
+    lines.append("# TYPE bot_mod_log_embeds_total counter")
+    for outcome in ("embeds", "dropped", "failed"):
+        lines.append(f'bot_mod_log_embeds_total{{outcome="{"delivered" if outcome == "embeds" else outcome}"}} {mod_log_stats[outcome]}')
+    lines.append("# HELP bot_mod_log_messages_total Messages sent to mod-log channels.")
+    lines.append("# TYPE bot_mod_log_messages_total counter")
+    lines.append(f"bot_mod_log_messages_total {mod_log_stats['messages']}")
+
+    lines.append("# HELP bot_dm_queue_depth DM notifications waiting to be sent.")
+    lines.append("# TYPE bot_dm_queue_depth gauge")
+    lines.append(f"bot_dm_queue_depth {_dm_queue.qsize()}")
+    lines.append("# HELP bot_dm_notifications_total DM notifications, by outcome.")
+    lines.append("# TYPE bot_dm_notifications_total counter")
+    for outcome in ("sent", "retried", "failed", "forbidden", "deduped", "dropped"):
+        lines.append(f'bot_dm_notifications_total{{outcome="{outcome}"}} {dm_stats[outcome]}')
+
+    return "\n".join(lines) + "\n"
+
+# --- Event Loop Monitoring ---
+# A sampler measures how late the loop wakes up from a short sleep. With SLOW_STEP_TRACING=1,
+# every event handler and command callback is also driven through a step timer that records any
+# synchronous stretch (the code between two awaits) longer than the threshold, attributed to its
+# handler name. The step timer adds a Python-level hop to every await, so it is off by default.
+
+LOOP_LAG_SAMPLE_INTERVAL = 0.5 # Seconds between loop lag samples
+LOOP_LAG_WINDOW = 240 # Samples kept (~2 minutes at the interval above)
+SLOW_STEP_THRESHOLD = 0.1 # Seconds a single step may block the loop before it is recorded
+SLOW_STEP_LOG_SIZE = 50 # Slow steps kept for the owner command
+SLOW_STEP_TRACING = os.environ.get("SLOW_STEP_TRACING", "").lower() in ("1", "true", "yes")
+
+loop_lag_samples = collections.deque(maxlen=LOOP_LAG_WINDOW) # lag in seconds, oldest first
+slow_step_log = collections.deque(maxlen=SLOW_STEP_LOG_SIZE) # (unix time, name, seconds)
+slow_step_count = 0 # Total slow steps seen, including ones rotated out of the log
+
+def _record_slow_step(name, elapsed):
+    """Adds a step to the slow step log if it blocked the loop for longer than the threshold."""
+    global slow_step_count
+    if elapsed >= SLOW_STEP_THRESHOLD:
+        slow_step_count += 1
+        slow_step_log.append((time.time(), name, elapsed))
+        print(f"DEBUG: Slow step in {name}: blocked the event loop for {elapsed * 1000:.0f}ms")
+
+@types.coroutine
+def _timed_steps(name, coro):
+    """Drives a coroutine to completion, timing each step it runs between awaits."""
+    value, error = None, None
+    while True:
+        start = time.perf_counter()
+        try:
+            if error is not None:
+                yielded = coro.throw(error)
+            else:
+                yielded = coro.send(value)
+        except StopIteration as stop:
+            _record_slow_step(name, time.perf_counter() - start)
+            return stop.value
+        except BaseException:
+            _record_slow_step(name, time.perf_counter() - start)
+            raise
+        _record_slow_step(name, time.perf_counter() - start)
+        value, error = None, None
+        try:
+            value = yield yielded
+        except GeneratorExit:
+            coro.close()
+            raise
+        except BaseException as e:
+            error = e
+
+def _watch_slow_steps(name, func):
+    """Wraps a coroutine function so its steps are checked by the slow step detector."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await _timed_steps(name, func(*args, **kwargs))
+    return wrapper
+
+def _instrument_slow_steps():
+    """Wraps every registered event handler and command callback with the slow step detector."""
+    if not SLOW_STEP_TRACING:
+        return
+    for name, handler in list(vars(bot).items()):
+        if name.startswith('on_') and asyncio.iscoroutinefunction(handler):
+            setattr(bot, name, _watch_slow_steps(name, handler))
+    for command in bot.walk_commands():
+        command.callback = _watch_slow_steps(f"command:{command.qualified_name}", command.callback)
+
+def _loop_lag_summary():
+    """Returns (latest, average, worst) loop lag in seconds over the sample window."""
+    if not loop_lag_samples:
+        return 0.0, 0.0, 0.0
+    return loop_lag_samples[-1], sum(loop_lag_samples) / len(loop_lag_samples), max(loop_lag_samples)
+
+# --- Deferred Persistence ---
+# Hot paths (on_message) mark a store dirty instead of rewriting its JSON file inline;
+# the flush loop writes each dirty store at most once per interval.
+
+STORE_FLUSH_INTERVAL = 5 # Seconds between flushes of dirty stores
+
+_dirty_stores = {} # save function -> monotonic time it was first marked dirty
+
+def _schedule_save(save_func):
+    """Marks a store as needing to be written by the next flush."""
+    _dirty_stores.setdefault(save_func, time.monotonic())
+    store_versions[save_func.__name__.removeprefix("save_")] += 1 # Readers see the change before the write
+
+def flush_dirty_stores_now():
+    """Writes every dirty store immediately. Failed writes stay dirty for the next attempt."""
+    for save_func, dirty_since in list(_dirty_stores.items()):
+        del _dirty_stores[save_func]
+        start = time.perf_counter()
+        try:
+            save_func()
+            _record_slow_step(f"save:{save_func.__name__}", time.perf_counter() - start)
+        except Exception as e:
+            _dirty_stores.setdefault(save_func, dirty_since)
+            print(f"DEBUG: Failed to flush {save_func.__name__}: {e}")
+
+# --- Health Checks ---
+# /healthz (liveness) and /readyz (readiness) are computed purely from local state: gateway
+# events, heartbeat latencies, the loop lag sampler, the dirty store table and task handles.
+# Thresholds are in seconds and can be overridden through environment variables.
+
+HEALTH_MAX_LOOP_LAG = float(os.environ.get("HEALTH_MAX_LOOP_LAG", 5.0)) # Liveness: loop considered wedged
+HEALTH_MAX_DISCONNECTED = float(os.environ.get("HEALTH_MAX_DISCONNECTED", 300.0)) # Liveness: gateway down this long
+HEALTH_MAX_UNFLUSHED_AGE = float(os.environ.get("HEALTH_MAX_UNFLUSHED_AGE", 120.0)) # Liveness: dirty store not written
+READY_MAX_LOOP_LAG = float(os.environ.get("READY_MAX_LOOP_LAG", 0.5)) # Readiness: loop too slow to serve traffic
+READY_MAX_GATEWAY_LATENCY = float(os.environ.get("READY_MAX_GATEWAY_LATENCY", 2.0)) # Readiness: heartbeat too slow
+
+_gateway_state = {"connected": False, "since": time.monotonic()} # Updated by connect/disconnect events
+
+def _set_gateway_connected(connected):
+    """Records a gateway connection state change (only the transition time is kept)."""
+    if _gateway_state["connected"] != connected:
+        _gateway_state["connected"] = connected
+        _gateway_state["since"] = time.monotonic()
+
+def _finite_or_none(value):
+    """Heartbeat latencies are NaN/inf until the first ACK; JSON gets null instead."""
+    return round(value, 4) if value is not None and math.isfinite(value) else None
+
+def health_report(readiness):
+    """
+    Builds the /healthz (readiness=False) or /readyz (readiness=True) report.
+    Returns (ok, report) where report is JSON-serializable.
+    """
+    now = time.monotonic()
+    checks = {}
+
+    # Gateway
+    connected = _gateway_state["connected"]
+    state_for = now - _gateway_state["since"]
+    if isinstance(bot, discord.AutoShardedClient):
+        latencies = bot.latencies
+    else:
+        latencies = [(bot.shard_id or 0, bot.latency)]
+    shard_latencies = {str(shard_id): _finite_or_none(latency) for shard_id, latency in latencies}
+    gateway = {
+        "connected": connected,
+        "ready": bot.is_ready(),
+        "ws_ratelimited": bot.is_ws_ratelimited(),
+        "state_for_seconds": round(state_for, 1),
+        "shard_latencies": shard_latencies,
+    }
+    if readiness:
+        worst_latency = max((l for l in shard_latencies.values() if l is not None), default=None)
+        gateway["ok"] = (
+            connected and bot.is_ready() and not bot.is_ws_ratelimited()
+            and worst_latency is not None and worst_latency <= READY_MAX_GATEWAY_LATENCY
+        )
+    else:
+        gateway["ok"] = connected or state_for <= HEALTH_MAX_DISCONNECTED
+    checks["gateway"] = gateway
+
+    # Event loop
+    latest_lag, _, worst_lag = _loop_lag_summary()
+    max_lag = READY_MAX_LOOP_LAG if readiness else HEALTH_MAX_LOOP_LAG
+    checks["event_loop"] = {
+        "ok": latest_lag <= max_lag,
+        "lag_seconds": round(latest_lag, 4),
+        "worst_lag_seconds": round(worst_lag, 4),
+        "threshold_seconds": max_lag,
+    }
+
+    # Persistence backlog
+    oldest_dirty = min(_dirty_stores.values(), default=None)
+    oldest_age = now - oldest_dirty if oldest_dirty is not None else 0.0
+    checks["persistence"] = {
+        "ok": oldest_age <= HEALTH_MAX_UNFLUSHED_AGE,
+        "unflushed_stores": sorted(save_func.__name__ for save_func in _dirty_stores),
+        "oldest_unflushed_seconds": round(oldest_age, 1),
+        "threshold_seconds": HEALTH_MAX_UNFLUSHED_AGE,
+    }
+
+    # Background tasks (only expected to run once on_ready has started them)
+    background_tasks = {}
+    for name, loop in (("change_status", change_status), ("flush_dirty_stores", flush_dirty_stores), ("sample_loop_lag", sample_loop_lag),
+                       ("deliver_mod_logs", deliver_mod_logs), ("deliver_dms", deliver_dms)):
+        background_tasks[name] = {"running": loop.is_running(), "failed": loop.failed()}
+    checks["background_tasks"] = {
+        "ok": not bot.is_ready() or all(t["running"] and not t["failed"] for t in background_tasks.values()),
+        "tasks": background_tasks,
+    }
+
+    ok = all(check["ok"] for check in checks.values())
+    return ok, {"status": "ok" if ok else "fail", "checks": checks}
+
+# --- Admin API Data ---
+# Read-only views served by the web server's /api routes. Each returns (version, data) where
+# the version comes from store_versions, so unchanged data yields the same ETag. Snowflakes
+# are sent as strings because they don't fit in a JavaScript number.
+
+_guild_warning_index = {} # guild_id -> (cache key, items)
+
+async def _api_guild_warnings(guild_id):
+    """Members of a guild with warnings, most-warned first (None if the bot isn't in it)."""
+    guild = bot.get_guild(guild_id)
+    if guild is None:
+        return None
+    # Warnings are stored per user, so the view also changes when members join or leave
+    key = (store_versions["warnings"], guild.member_count)
+    cached = _guild_warning_index.get(guild_id)
+    if cached is None or cached[0] != key:
+        warned = [user_id for user_id, reasons in user_warnings.items() if reasons]
+        if LAZY_MEMBER_CACHE:
+            members = await resolve_members(guild, warned) # Most members aren't cached; ask the gateway
+        else:
+            members = {user_id: member for user_id in warned if (member := guild.get_member(user_id)) is not None}
+        items = []
+        for user_id in warned:
+            member = members.get(user_id)
+            if member is not None:
+                reasons = user_warnings.get(user_id, [])
+                items.append({"user_id": str(user_id), "name": str(member), "count": len(reasons), "warnings": list(reasons)})
+        items.sort(key=lambda item: (-item["count"], int(item["user_id"])))
+        cached = _guild_warning_index[guild_id] = (key, items)
+    return f"{key[0]}.{key[1]}", cached[1]
+
+def _api_user_warnings(user_id):
+    """One user's warnings, oldest first."""
+    reasons = user_warnings.get(user_id, [])
+    return store_versions["warnings"], [{"number": i, "reason": reason} for i, reason in enumerate(reasons, start=1)]
+
+def _api_afk():
+    """Everyone currently AFK, ordered by user ID."""
+    return store_versions["afk_status"], [
+        {"user_id": str(user_id), "message": info.get("message"), "since": info.get("time")}
+        for user_id, info in sorted(afk_status.items())
+    ]
+
+def _api_automod():
+    """The AutoMod settings, with channel and role IDs as strings."""
+    config = dict(automod_settings)
+    config["automod_ignored_channels"] = [str(i) for i in automod_settings.get("automod_ignored_channels", [])]
+    config["automod_ignored_roles"] = [str(i) for i in automod_settings.get("automod_ignored_roles", [])]
+    return store_versions["automod_settings"], config
+
 # --- Helper to send DMs ---
+# Moderation DMs are queued and sent by a background loop instead of being awaited by the
+# command. Sends are paced globally and run a few at a time, DM channel IDs are cached so a
+# repeat recipient doesn't cost a channel-creation call, the same notice to the same user is
+# only sent once per dedupe window, and transient failures are retried with backoff.
+
+DM_CONCURRENCY = 4 # DMs in flight at once
+DM_MIN_INTERVAL = 0.25 # Seconds between DM sends across the whole bot
+DM_QUEUE_MAX = 1000 # Notices beyond this are dropped (and counted)
+DM_MAX_ATTEMPTS = 3 # Tries per notice for transient errors
+DM_RETRY_DELAY = 5.0 # Seconds before the first retry; doubles after each failure
+DM_DEDUPE_WINDOW = 300 # Seconds during which an identical notice to the same user is skipped
+DM_CHANNEL_CACHE_SIZE = 5000 # Most recently used DM channel IDs kept
+
+_dm_queue = asyncio.Queue(maxsize=DM_QUEUE_MAX) # (user, message, attempt)
+_dm_slots = asyncio.Semaphore(DM_CONCURRENCY)
+_dm_channel_ids = collections.OrderedDict() # user_id -> DM channel ID, least recently used first
+_dm_recent = collections.OrderedDict() # (user_id, message) -> monotonic time it was queued, oldest first
+_dm_next_send_at = 0.0
+dm_stats = collections.Counter() # "sent", "retried", "failed", "forbidden", "deduped", "dropped"
+
 async def _send_dm_to_member(member: discord.Member, message: str):
     """
-    Attempts to send a direct message to a member.
+    Queues a direct message to a member; it is sent in the background.
     Handles cases where DMs might be disabled.
     """
+    now = time.monotonic()
+    while _dm_recent and now - next(iter(_dm_recent.values())) >= DM_DEDUPE_WINDOW:
+        _dm_recent.popitem(last=False) # Forget notices that are past the dedupe window, oldest first
+    key = (member.id, message)
+    if key in _dm_recent:
+        dm_stats["deduped"] += 1
+        return
+    try:
+        _dm_queue.put_nowait((member, message, 1))
+        _dm_recent[key] = now
+    except asyncio.QueueFull:
+        dm_stats["dropped"] += 1
+        print(f"DEBUG: DM queue full; dropped a DM to {member.name} ({member.id}).")
+
+async def _dm_channel_for(user):
+    """The user's DM channel, created only if its ID isn't cached yet."""
+    channel_id = _dm_channel_ids.get(user.id)
+    if channel_id is not None:
+        _dm_channel_ids.move_to_end(user.id)
+        return bot.get_partial_messageable(channel_id, type=discord.ChannelType.private)
+    channel = user.dm_channel or await user.create_dm()
+    _dm_channel_ids[user.id] = channel.id
+    if len(_dm_channel_ids) > DM_CHANNEL_CACHE_SIZE:
+        _dm_channel_ids.popitem(last=False)
+    return channel
+
+def _requeue_dm(user, message, attempt):
     try:
-        await member.send(message)
-        print(f"DEBUG: Sent DM to {member.name} ({member.id}).")
+        _dm_queue.put_nowait((user, message, attempt))
+    except asyncio.QueueFull:
+        dm_stats["dropped"] += 1
+
+async def _deliver_dm(user, message, attempt):
+    """Sends one queued DM, scheduling a retry for transient errors."""
+    try:
+        channel = await _dm_channel_for(user)
+        await channel.send(message)
+        dm_stats["sent"] += 1
+        print(f"DEBUG: Sent DM to {user.name} ({user.id}).")
     except discord.Forbidden:
-        print(f"DEBUG: Could not send DM to {member.name} ({member.id}). DMs might be disabled.")
+        dm_stats["forbidden"] += 1
+        print(f"DEBUG: Could not send DM to {user.name} ({user.id}). DMs might be disabled.")
     except Exception as e:
-        print(f"DEBUG: An error occurred while sending DM to {member.name} ({member.id}): {e}")
+        if attempt < DM_MAX_ATTEMPTS:
+            dm_stats["retried"] += 1
+            asyncio.get_running_loop().call_later(DM_RETRY_DELAY * 2 ** (attempt - 1), _requeue_dm, user, message, attempt + 1)
+        else:
+            dm_stats["failed"] += 1
+        print(f"DEBUG: An error occurred while sending DM to {user.name} ({user.id}) (attempt {attempt}): {e}")
+    finally:
+        _dm_slots.release()
 
 # Refactor warn logic into a reusable function
 async def _perform_warn(guild: discord.Guild, channel: discord.TextChannel, member: discord.Member, moderator: discord.Member, reason: str):
@@ -202,7 +793,7 @@ async def _perform_warn(guild: discord.Guild, channel: discord.TextChannel, memb
     if member.id not in user_warnings:
         user_warnings[member.id] = []
     user_warnings[member.id].append(reason)
-    save_warnings() # Save warnings after modification
+    _schedule_save(save_warnings) # Written by the flush loop; AutoMod calls this from on_message
 
     await channel.send(f'{member.mention} has been warned by {moderator.mention} for: {reason}. They now have {len(user_warnings[member.id])} warning(s).')
     await log_moderation_action(guild, "Warn", member, moderator, reason)
@@ -210,25 +801,255 @@ async def _perform_warn(guild: discord.Guild, channel: discord.TextChannel, memb
 
 
 # --- Dynamic Prefix Function ---
+DEFAULT_PREFIX = '_'
+MAX_PREFIXES = 5 # Per guild
+MAX_PREFIX_LENGTH = 5 # Limit prefix length to prevent abuse
+
+class _PrefixMatcher:
+    """
+    A guild's prefixes compiled once. `match` hands discord.py a prebuilt list, so resolving
+    the prefix for a message allocates nothing for case-sensitive guilds and only caches a
+    new list the first time a case variant (e.g. "Bot!" vs "bot!") is seen.
+    """
+    __slots__ = ('prefixes', 'primary', 'case_insensitive', 'mention_prefixes', '_candidates', '_pattern', '_variants')
+
+    def __init__(self, prefixes, case_insensitive: bool, mention_prefixes):
+        self.prefixes = tuple(prefixes)
+        self.primary = self.prefixes[0]
+        self.case_insensitive = case_insensitive
+        self.mention_prefixes = tuple(mention_prefixes)
+        # Longest first: discord.py uses the first candidate the message starts with
+        ordered = sorted(self.prefixes, key=len, reverse=True)
+        self._candidates = ordered + list(self.mention_prefixes)
+        self._pattern = re.compile('|'.join(re.escape(p) for p in ordered), re.IGNORECASE) if case_insensitive else None
+        self._variants = {}
+
+    def match(self, content: str):
+        """Returns the prefix candidates for discord.py to try against this message."""
+        if self._pattern is None:
+            return self._candidates
+        found = self._pattern.match(content)
+        if found is None:
+            return self._candidates
+        text = found.group(0)
+        variant = self._variants.get(text)
+        if variant is None:
+            variant = self._variants[text] = [text] + list(self.mention_prefixes)
+        return variant
+
+    def display(self) -> str:
+        """Human-readable list of this guild's prefixes."""
+        return ", ".join(f"`{p}`" for p in self.prefixes) + (" (case-insensitive)" if self.case_insensitive else "")
+
+_prefix_matchers = {} # guild_id (None for DMs) -> _PrefixMatcher, invalidated by setprefix
+
+def _get_prefix_matcher(guild_id):
+    """Returns the cached prefix matcher for a guild, compiling it on first use."""
+    matcher = _prefix_matchers.get(guild_id)
+    if matcher is not None:
+        return matcher
+
+    config = guild_prefixes.get(guild_id) if guild_id is not None else None
+    if isinstance(config, dict):
+        prefixes = config.get("prefixes") or [DEFAULT_PREFIX]
+        case_insensitive = config.get("case_insensitive", False)
+    elif isinstance(config, str): # Older single-prefix format
+        prefixes, case_insensitive = [config], False
+    else:
+        prefixes, case_insensitive = [DEFAULT_PREFIX], False
+
+    if bot.user is None:
+        # Not logged in yet, so the mention prefix is unknown; don't cache this matcher
+        return _PrefixMatcher(prefixes, case_insensitive, ())
+    matcher = _PrefixMatcher(prefixes, case_insensitive, (f'<@{bot.user.id}> ', f'<@!{bot.user.id}> '))
+    _prefix_matchers[guild_id] = matcher
+    return matcher
+
 async def get_prefix(bot, message):
     """
-    Dynamically gets the command prefix for the guild the message originated from.
-    Falls back to '_' if no custom prefix is set for the guild.
+    Dynamically gets the command prefixes for the guild the message originated from.
+    Falls back to '_' if no custom prefix is set for the guild. Mentioning the bot
+    always works as a prefix.
     """
-    if message.guild:
-        # Get the custom prefix for the guild, defaulting to '_'
-        return guild_prefixes.get(message.guild.id, '_')
-    else:
-        # For DMs, always use the default prefix
-        return '_'
+    return _get_prefix_matcher(message.guild.id if message.guild else None).match(message.content)
+
+# Every HTTP response's rate limit headers are recorded here so bulk operations can pace themselves.
+rate_limit_observer = RateLimitObserver()
 
 # Initialize the bot with a dynamic command prefix and the defined intents.
 # We disable the default help command to create our own custom one.
-bot = commands.Bot(command_prefix=get_prefix, intents=intents, help_command=None)
+bot = commands.Bot(command_prefix=get_prefix, intents=intents, help_command=None, http_trace=rate_limit_observer.trace_config(),
+                   member_cache_flags=member_cache_flags, chunk_guilds_at_startup=not LAZY_MEMBER_CACHE, max_messages=None)
 
 # Emoji for poll reactions (up to 9 options)
 poll_emojis = ['1️⃣', '2️⃣', '3️⃣', '4️⃣', '5️⃣', '6️⃣', '7️⃣', '8️⃣', '9️⃣']
 
+# --- Member Permission Cache ---
+# Role-derived data (guild permissions, top role, AutoMod exemption) is recomputed from the
+# member's role list on every access. Cache it per (guild, member) and drop entries when a
+# gateway event says the underlying roles or overwrites changed. Each guild keeps at most as many
+# entries as the member cache (MEMBER_CACHE_MAX_PER_GUILD), least recently used first out, so mass
+# jobs that walk a whole member list don't leave an entry behind for everyone.
+
+PERM_CACHE_MAX_PER_GUILD = MEMBER_CACHE_MAX_PER_GUILD
+
+# guild_id -> OrderedDict {member_id: (Permissions, top role sort key, AutoMod-exempt flag)}, least recently used first
+_member_perm_cache = {}
+perm_cache_stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+
+def _member_perm_entry(member: discord.Member):
+    """Returns the cached (permissions, top_role_key, automod_exempt) tuple for a member."""
+    guild_cache = _member_perm_cache.get(member.guild.id)
+    if guild_cache is not None:
+        entry = guild_cache.get(member.id)
+        if entry is not None:
+            perm_cache_stats["hits"] += 1
+            guild_cache.move_to_end(member.id)
+            return entry
+
+    perm_cache_stats["misses"] += 1
+    permissions = member.guild_permissions
+    top_role = member.top_role
+    # Same ordering as discord.Role comparisons: @everyone lowest, ties broken by lower ID
+    top_role_key = (-1, 0) if top_role.is_default() else (top_role.position, -top_role.id)
+    ignored_roles = automod_settings.get("automod_ignored_roles", [])
+    automod_exempt = permissions.administrator or any(role.id in ignored_roles for role in member.roles)
+    entry = (permissions, top_role_key, automod_exempt)
+
+    # Timed-out members have masked permissions until the timeout lapses, which sends no event
+    if not member.is_timed_out():
+        guild_cache = _member_perm_cache.setdefault(member.guild.id, collections.OrderedDict())
+        guild_cache[member.id] = entry
+        if len(guild_cache) > PERM_CACHE_MAX_PER_GUILD:
+            guild_cache.popitem(last=False)
+            perm_cache_stats["evictions"] += 1
+    return entry
+
+def _cached_guild_permissions(member: discord.Member) -> discord.Permissions:
+    """Cached equivalent of `member.guild_permissions`."""
+    return _member_perm_entry(member)[0]
+
+def _top_role_key(member: discord.Member):
+    """Sortable key for `member.top_role`; compare keys instead of Role objects."""
+    return _member_perm_entry(member)[1]
+
+def _is_automod_exempt(member: discord.Member) -> bool:
+    """True if the member is an administrator or holds an AutoMod-ignored role."""
+    return _member_perm_entry(member)[2]
+
+def _invalidate_member_perms(guild_id: int, member_id: int):
+    """Drops the cached entry for a single member."""
+    guild_cache = _member_perm_cache.get(guild_id)
+    if guild_cache and guild_cache.pop(member_id, None) is not None:
+        perm_cache_stats["invalidations"] += 1
+
+def _invalidate_guild_perms(guild_id: int = None):
+    """Drops every cached entry for a guild, or for all guilds if guild_id is None."""
+    if guild_id is None:
+        perm_cache_stats["invalidations"] += sum(len(c) for c in _member_perm_cache.values())
+        _member_perm_cache.clear()
+        return
+    guild_cache = _member_perm_cache.pop(guild_id, None)
+    if guild_cache:
+        perm_cache_stats["invalidations"] += len(guild_cache)
+
+# --- Lazy Member Cache ---
+# With MEMBER_CACHE_POLICY=lazy, members the bot sees (message authors) go into a bounded
+# RecentMemberCache instead of discord.py's cache. Lookups go through get_cached_member and
+# resolve_member(s), which fall back to gateway member queries (up to 100 IDs per request,
+# no REST rate limit) for anyone not cached. Discord sends no member updates for uncached
+# members, so a cached entry is refreshed, and its cached permissions dropped, whenever the
+# member is seen again with different roles; pinned role holders are rescanned periodically.
+
+MEMBER_QUERY_CHUNK = 100 # Discord's maximum user IDs per gateway member query
+MEMBER_CACHE_ROLE_RESCAN = 3600 # Seconds between rescans of pinned role holders
+
+member_cache = RecentMemberCache(ttl=MEMBER_CACHE_TTL, max_per_guild=MEMBER_CACHE_MAX_PER_GUILD,
+                                 pinned_role_ids=MEMBER_CACHE_ROLE_IDS, on_evict=_invalidate_member_perms)
+
+def _remember_member(member: discord.Member):
+    """Records a member the bot just saw (lazy mode only)."""
+    if not LAZY_MEMBER_CACHE or member.guild.get_member(member.id) is not None:
+        return # Tracked by discord.py's own cache, which receives member updates
+    previous = member_cache.remember(member)
+    if previous is not None and previous.roles != member.roles:
+        _invalidate_member_perms(member.guild.id, member.id)
+
+def get_cached_member(guild: discord.Guild, user_id: int):
+    """guild.get_member, falling back to the recently seen members in lazy mode."""
+    member = guild.get_member(user_id)
+    if member is None and LAZY_MEMBER_CACHE:
+        member = member_cache.get(guild.id, user_id)
+    return member
+
+async def resolve_members(guild: discord.Guild, user_ids):
+    """
+    Resolves many user IDs to members: cached ones directly, the rest through gateway member
+    queries in chunks. Returns {user_id: member}; users who aren't in the guild are left out.
+    """
+    found, missing = {}, []
+    for user_id in user_ids:
+        member = get_cached_member(guild, user_id)
+        if member is not None:
+            found[user_id] = member
+        else:
+            missing.append(user_id)
+    for start in range(0, len(missing), MEMBER_QUERY_CHUNK):
+        chunk = missing[start:start + MEMBER_QUERY_CHUNK]
+        try:
+            members = await guild.query_members(user_ids=chunk, limit=len(chunk), cache=False)
+        except asyncio.TimeoutError:
+            print(f"DEBUG: Member query for {len(chunk)} user(s) in guild {guild.name} timed out. Falling back to REST.")
+            members = []
+            for user_id in chunk:
+                try:
+                    members.append(await guild.fetch_member(user_id))
+                except discord.NotFound:
+                    pass # Not in the guild
+        for member in members:
+            found[member.id] = member
+            _remember_member(member)
+    return found
+
+async def resolve_member(guild: discord.Guild, user_id: int):
+    """A single member from the cache or fetched on demand, or None if they aren't in the guild."""
+    return get_cached_member(guild, user_id) or (await resolve_members(guild, [user_id])).get(user_id)
+
+async def _refresh_pinned_members(guild: discord.Guild):
+    """Streams the guild's member list once and keeps only the pinned role holders."""
+    holders = [member async for member in guild.fetch_members(limit=None) if member_cache.is_pinned_member(member)]
+    count = member_cache.replace_pinned(guild.id, holders)
+    print(f"DEBUG: Pinned {count} member(s) with cached roles in guild {guild.name}.")
+
+def role_member_count(role: discord.Role):
+    """
+    How many members hold a role. In lazy mode only pinned roles (counted from the pinned member
+    rescan) and @everyone are known; returns None for any other role.
+    """
+    if not LAZY_MEMBER_CACHE:
+        return len(role.members)
+    if role.is_default():
+        return role.guild.member_count
+    if role.id in MEMBER_CACHE_ROLE_IDS:
+        return sum(1 for member in member_cache.pinned_members(role.guild.id) if member.get_role(role.id))
+    return None
+
+# --- Message Cache ---
+# discord.py's message cache is disabled (max_messages=None); guild messages are cached here
+# instead, under a global memory budget. Channels earn their share of the budget from traffic and,
+# much more so, from moderation activity: purges and reaction confirmations boost a channel, and
+# the coldest channels are evicted first. Edits, deletes and reactions are handled through raw
+# events, which don't depend on discord.py's cache; an edit only refreshes a message that is
+# already cached.
+
+MESSAGE_CACHE_MODERATION_BOOST = 50.0 # Activity a moderation action adds, in messages' worth
+
+message_cache = BudgetedMessageCache(int(MESSAGE_CACHE_BUDGET_MB * 1024 * 1024), half_life=MESSAGE_CACHE_HALF_LIFE)
+
+def _boost_message_cache(channel_id: int):
+    """Gives a channel with moderation activity a larger share of the message cache."""
+    message_cache.boost(channel_id, MESSAGE_CACHE_MODERATION_BOOST)
+
 # --- Helper Functions for Moderation Logic ---
 
 async def _check_mod_permissions(ctx, member, action_name):
@@ -243,17 +1064,18 @@ async def _check_mod_permissions(ctx, member, action_name):
     if member == bot.user:
         await ctx.send(f"I cannot {action_name} myself!")
         return False
-    if member == ctx.guild.owner:
+    if member.id == ctx.guild.owner_id:
         await ctx.send(f"I cannot {action_name} the server owner.")
         return False
-    
+
     # Bot's role must be higher than the target member's top role
-    if ctx.guild.me.top_role <= member.top_role:
+    member_key = _top_role_key(member)
+    if _top_role_key(ctx.guild.me) <= member_key:
         await ctx.send(f"I cannot {action_name} {member.mention} because their highest role is equal to or higher than my highest role. Please ensure my role is above theirs.")
         return False
-    
+
     # Moderator's role must be higher than the target member's top role (unless moderator is guild owner)
-    if ctx.author.top_role <= member.top_role and ctx.author != ctx.guild.owner:
+    if _top_role_key(ctx.author) <= member_key and ctx.author.id != ctx.guild.owner_id:
         await ctx.send(f"You cannot {action_name} someone with an equal or higher role than you.")
         return False
     
@@ -282,15 +1104,18 @@ async def _confirm_action(ctx_or_interaction: Union[commands.Context, discord.In
         await confirm_message.add_reaction('✅')
         await confirm_message.add_reaction('❌')
 
-        def check(reaction, user):
+        _boost_message_cache(confirm_message.channel.id)
+
+        def check(payload):
             # The user checking is always the original author for the command/interaction
             author_id = ctx_or_interaction.author.id if not is_interaction else ctx_or_interaction.user.id
-            return user.id == author_id and str(reaction.emoji) in ['✅', '❌'] and reaction.message.id == confirm_message.id
+            return payload.user_id == author_id and str(payload.emoji) in ['✅', '❌'] and payload.message_id == confirm_message.id
 
-        reaction, user = await bot.wait_for('reaction_add', timeout=timeout, check=check)
+        # The raw event fires whether or not the prompt is in a message cache
+        payload = await bot.wait_for('raw_reaction_add', timeout=timeout, check=check)
         await confirm_message.delete()
 
-        if str(reaction.emoji) == '✅':
+        if str(payload.emoji) == '✅':
             return True
         else:
             if is_interaction:
@@ -320,6 +1145,7 @@ async def log_moderation_action(guild, action_type, target, moderator, reason):
     """
     Logs moderation actions to the designated moderation log channel.
     Target can be a Member, User, Channel, or Role object.
+    The embed is queued for batched delivery, so this returns without waiting on Discord.
     """
     if guild.id not in mod_log_channels:
         print(f"DEBUG: No mod log channel set for guild {guild.name}. Skipping log.")
@@ -347,17 +1173,101 @@ async def log_moderation_action(guild, action_type, target, moderator, reason):
     elif isinstance(target, discord.Role):
         embed.add_field(name="Target Role", value=f"{target.name} (`{target.id}`)", inline=False)
     else:
-        embed.add_field(name="Target", value=str(target), inline=False) # Fallback for other types
+        embed.add_field(name="Target", value=_clip(target, 1024), inline=False) # Fallback for other types
 
     embed.add_field(name="Moderator", value=f"{moderator.mention} (`{moderator.id}`)", inline=False)
-    embed.add_field(name="Reason", value=reason, inline=False)
+    embed.add_field(name="Reason", value=_clip(reason, 1024), inline=False) # Embed field values are capped at 1024 characters
+
+    _queue_mod_log(guild.id, embed) # Delivered in batches by deliver_mod_logs; never waits on Discord
+
+# --- Mod Log Delivery ---
+# Log embeds are buffered per guild and sent by one background loop, packed up to 10 embeds per
+# message. A buffer is flushed as soon as it holds a full message, otherwise after a short delay
+# so bursts (mass actions, AutoMod storms) coalesce. Buffers are bounded: if a log channel can't
+# keep up, the oldest entries are dropped and replaced by a notice, so logging never holds up
+# the moderation action or grows without limit.
+
+MOD_LOG_BATCH_SIZE = 10 # Discord's maximum embeds per message
+MOD_LOG_MAX_MESSAGE_CHARS = 6000 # Discord's limit on the combined size of a message's embeds
+MOD_LOG_FLUSH_INTERVAL = 2.0 # Seconds a partial batch waits for more entries
+MOD_LOG_MAX_PENDING = 500 # Per guild; older entries are dropped beyond this
+
+_mod_log_buffers = {} # guild_id -> deque of pending embeds
+_mod_log_dropped = collections.Counter() # guild_id -> entries dropped since the last flush
+_mod_log_wakeup = asyncio.Event() # Set when the first entry is queued
+_mod_log_full = asyncio.Event() # Set when a buffer holds a full message
+mod_log_stats = collections.Counter() # "embeds", "messages", "dropped", "failed"
+
+def _queue_mod_log(guild_id, embed):
+    """Adds an embed to the guild's log buffer and wakes the delivery loop."""
+    buffer = _mod_log_buffers.get(guild_id)
+    if buffer is None:
+        buffer = _mod_log_buffers[guild_id] = collections.deque(maxlen=MOD_LOG_MAX_PENDING)
+    if len(buffer) == MOD_LOG_MAX_PENDING:
+        _mod_log_dropped[guild_id] += 1 # The deque drops the oldest entry
+        mod_log_stats["dropped"] += 1
+    buffer.append(embed)
+    _mod_log_wakeup.set()
+    if len(buffer) >= MOD_LOG_BATCH_SIZE:
+        _mod_log_full.set()
+
+def _pack_embeds(embeds):
+    """Splits embeds into message-sized groups: at most 10 embeds and 6000 characters each."""
+    batch, size = [], 0
+    for embed in embeds:
+        embed_size = len(embed)
+        if batch and (len(batch) == MOD_LOG_BATCH_SIZE or size + embed_size > MOD_LOG_MAX_MESSAGE_CHARS):
+            yield batch
+            batch, size = [], 0
+        batch.append(embed)
+        size += embed_size
+    if batch:
+        yield batch
+
+async def _flush_mod_log(guild_id):
+    """Sends everything buffered for one guild."""
+    buffer = _mod_log_buffers.pop(guild_id, None)
+    dropped = _mod_log_dropped.pop(guild_id, 0)
+    guild = bot.get_guild(guild_id)
+    log_channel = guild.get_channel(mod_log_channels.get(guild_id, 0)) if guild else None
+    if not buffer or log_channel is None:
+        return # The bot left, or the log channel was unset or deleted meanwhile
+
+    embeds = list(buffer)
+    if dropped:
+        embeds.insert(0, discord.Embed(
+            description=f"⚠️ {dropped} older log entr{'y was' if dropped == 1 else 'ies were'} dropped because this channel couldn't keep up.",
+            color=discord.Color.orange()
+        ))
+    undelivered = len(embeds)
+    batches = collections.deque(_pack_embeds(embeds))
+    while batches:
+        batch = batches.popleft()
+        try:
+            await log_channel.send(embeds=batch)
+            mod_log_stats["messages"] += 1
+            mod_log_stats["embeds"] += len(batch)
+            undelivered -= len(batch)
+        except discord.Forbidden:
+            mod_log_stats["failed"] += undelivered
+            print(f"DEBUG: Bot does not have permission to send messages to the mod log channel ({log_channel.name}) in guild {guild.name}. Check bot permissions.")
+            return
+        except discord.HTTPException as e:
+            if e.status == 400 and len(batch) > 1:
+                # One invalid embed rejects the whole message; resend them one at a time so only it is lost
+                batches.extendleft([embed] for embed in reversed(batch))
+                continue
+            mod_log_stats["failed"] += len(batch)
+            undelivered -= len(batch)
+            print(f"DEBUG: An error occurred while logging moderation actions to channel {log_channel.name}: {e}")
+        except Exception as e:
+            mod_log_stats["failed"] += len(batch)
+            undelivered -= len(batch)
+            print(f"DEBUG: An error occurred while logging moderation actions to channel {log_channel.name}: {e}")
 
-    try:
-        await log_channel.send(embed=embed)
-    except discord.Forbidden:
-        print(f"DEBUG: Bot does not have permission to send messages to the mod log channel ({log_channel.name}) in guild {guild.name}. Check bot permissions.")
-    except Exception as e:
-        print(f"DEBUG: An error occurred while logging moderation action to channel {log_channel.name}: {e}")
+def mod_log_pending():
+    """Number of log embeds waiting to be delivered."""
+    return sum(len(buffer) for buffer in _mod_log_buffers.values())
 
 # --- AutoMod Helper Functions ---
 
@@ -383,26 +1293,1338 @@ def _contains_profanity(message_content: str):
     pattern = r'\b(?:' + '|'.join(re.escape(word) for word in sorted_words) + r')\b'
     return re.search(pattern, message_content, re.IGNORECASE)
 
+async def _run_automod(message: discord.Message):
+    """
+    Applies the AutoMod rules to a guild message from a non-exempt member.
+    Returns True if the message was removed and the member warned.
+    """
+    if automod_settings["anti_invite_enabled"] and _is_discord_invite(message.content):
+        try:
+            await message.delete()
+            await message.channel.send(f"{message.author.mention}, Discord invite links are not allowed here!", delete_after=5)
+            await _perform_warn(message.guild, message.channel, message.author, bot.user, reason="Posted Discord invite link (AutoMod)")
+        except discord.Forbidden:
+            await message.channel.send(f"AutoMod: I lack permissions to delete messages or warn {message.author.mention}. Please grant 'Manage Messages' and 'Kick Members' permissions.", delete_after=10)
+        return True
+
+    if automod_settings["anti_link_enabled"] and _contains_link(message.content):
+        try:
+            await message.delete()
+            await message.channel.send(f"{message.author.mention}, external links are not allowed here!", delete_after=5)
+            await _perform_warn(message.guild, message.channel, message.author, bot.user, reason="Posted external link (AutoMod)")
+        except discord.Forbidden:
+            await message.channel.send(f"AutoMod: I lack permissions to delete messages or warn {message.author.mention}. Please grant 'Manage Messages' and 'Kick Members' permissions.", delete_after=10)
+        return True
+
+    if automod_settings["anti_profanity_enabled"] and _contains_profanity(message.content):
+        try:
+            await message.delete()
+            await message.channel.send(f"{message.author.mention}, please watch your language!", delete_after=5)
+            await _perform_warn(message.guild, message.channel, message.author, bot.user, reason="Used profanity (AutoMod)")
+        except discord.Forbidden:
+            await message.channel.send(f"AutoMod: I lack permissions to delete messages or warn {message.author.mention}. Please grant 'Manage Messages' and 'Kick Members' permissions.", delete_after=10)
+        return True
+    return False
+
+# --- Purge Filters ---
+# purge and clear take an optional filter expression: whitespace-separated terms that must all
+# match, e.g. `bots links`, `!pinned regex:"free\s+nitro"` or `from:@user after:<message id>`.
+# It is compiled once into a single predicate that the history scan evaluates per message, so any
+# combination of terms still costs one pass; before:/after: also bound the scan itself.
+
+PURGE_FILTER_MAX_PATTERN = 200 # Characters allowed in a regex: term
+
+PURGE_FILTER_FLAGS = {
+    "bots": lambda message: message.author.bot,
+    "humans": lambda message: not message.author.bot,
+    "links": lambda message: bool(_is_discord_invite(message.content) or _contains_link(message.content)), # Invites are links too
+    "invites": lambda message: bool(_is_discord_invite(message.content)),
+    "attachments": lambda message: bool(message.attachments),
+    "embeds": lambda message: bool(message.embeds),
+    "pinned": lambda message: message.pinned,
+}
+
+# Python's re has no match timeout, so regex: patterns that can backtrack catastrophically are
+# rejected up front instead. Inside anything repeated more than once (`+`, `*`, `{8}`), a pattern
+# may not contain a variable-length repeat, as in `(a+)+` or `(.*a){8}`, nor an alternation,
+# as in `(a|aa)+` (alternations of single characters compile to a character class and are fine).
+_REGEX_REPEATS = {getattr(_regex_constants, name) for name in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT') if hasattr(_regex_constants, name)}
+
+def _regex_subpatterns(av):
+    """Subpatterns nested anywhere in a parsed regex node's arguments (groups, branches, lookarounds)."""
+    if isinstance(av, _regex_parser.SubPattern):
+        yield av
+    elif isinstance(av, (tuple, list)):
+        for item in av:
+            yield from _regex_subpatterns(item)
+
+def _backtracks_catastrophically(pattern, repeated=False):
+    """True if a parsed regex has a variable-length repeat or an alternation inside a repeat."""
+    for op, av in pattern:
+        if op in _REGEX_REPEATS:
+            low, high, sub = av
+            if repeated and high > low:
+                return True
+            if _backtracks_catastrophically(sub, repeated or high > 1):
+                return True
+        elif op == _regex_constants.BRANCH and repeated:
+            return True
+        elif any(_backtracks_catastrophically(sub, repeated) for sub in _regex_subpatterns(av)):
+            return True
+    return False
+
+# A compiled filter: `matches(message)`, the message ID bounds (None if unbounded) and the normalized text
+PurgeFilter = collections.namedtuple('PurgeFilter', 'matches before after text')
+
+def _compile_purge_term(name, value):
+    """The predicate for one `name:value` term."""
+    if name == "from":
+        found = re.fullmatch(r'<@!?(\d+)>|(\d+)', value)
+        if not found:
+            raise ValueError(f"`from:` needs a user mention or ID, not `{value}`.")
+        user_id = int(found.group(1) or found.group(2))
+        return lambda message: message.author.id == user_id
+    if name == "contains":
+        if not value:
+            raise ValueError("`contains:` needs some text.")
+        needle = value.lower()
+        return lambda message: needle in message.content.lower()
+    if name == "regex":
+        if not value or len(value) > PURGE_FILTER_MAX_PATTERN:
+            raise ValueError(f"`regex:` needs a pattern of at most {PURGE_FILTER_MAX_PATTERN} characters.")
+        try:
+            parsed = _regex_parser.parse(value, re.IGNORECASE)
+            pattern = re.compile(value, re.IGNORECASE)
+        except re.error as e:
+            raise ValueError(f"Invalid regex `{value}`: {e}.")
+        if _backtracks_catastrophically(parsed):
+            raise ValueError(f"Regex `{value}` repeats a part that can match in several ways (like `(a+)+` or `(a|aa)+`), which can take forever to match.")
+        return lambda message: pattern.search(message.content) is not None
+    raise ValueError(f"Unknown filter term `{name}`. Use {', '.join(PURGE_FILTER_FLAGS)}, from:, contains:, regex:, before: or after:.")
+
+def compile_purge_filter(expression: str = None):
+    """
+    Compiles a purge filter expression into a PurgeFilter. `!` in front of a term negates it.
+    Raises ValueError with a user-facing message if the expression is invalid.
+    """
+    lexer = shlex.shlex(expression or "", posix=True)
+    lexer.whitespace_split = True
+    lexer.escape = '' # Backslashes belong to regex: terms
+    predicates = []
+    terms = []
+    before = after = None
+    for term in lexer:
+        negated = term.startswith('!')
+        name, separator, value = term.lstrip('!').partition(':')
+        name = name.lower()
+        if name in ("before", "after"):
+            if negated or not value.isdigit():
+                raise ValueError(f"`{name}:` needs a message ID.")
+            if name == "before":
+                before = int(value) if before is None else min(before, int(value))
+            else:
+                after = int(value) if after is None else max(after, int(value))
+        elif not separator and name in PURGE_FILTER_FLAGS:
+            predicates.append((PURGE_FILTER_FLAGS[name], negated))
+        else:
+            predicates.append((_compile_purge_term(name, value), negated))
+        terms.append(shlex.quote(term)) # Quoted so `text` compiles back to the same filter
+
+    def matches(message):
+        if before is not None and message.id >= before:
+            return False
+        if after is not None and message.id <= after:
+            return False
+        return all(predicate(message) != negated for predicate, negated in predicates)
+
+    return PurgeFilter(matches, before, after, " ".join(terms))
+
+# --- AFK Notice Throttling ---
+
+AFK_NOTICE_COOLDOWN = 60 # Seconds before the same AFK user is announced again in a channel
+AFK_NOTICE_THROTTLE_SIZE = 2048 # Max (channel, user) pairs remembered
+AFK_NOTICE_REASON_MAX = 200 # Characters of each AFK message shown when several AFK members are mentioned
+AFK_NOTICE_EMBED_MAX = 5800 # Total embed characters for those, under Discord's 6000 with room for the footer
+
+class _BoundedTTLMap:
+    """
+    A small map of keys to expiry times. Every entry shares the same TTL, so insertion
+    order is expiry order and expired entries can be dropped from the front.
+    """
+    __slots__ = ('ttl', 'maxsize', '_entries')
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = collections.OrderedDict()
+
+    def check_and_set(self, key, now: float) -> bool:
+        """Returns True if the key is still fresh; otherwise records it and returns False."""
+        entries = self._entries
+        while entries:
+            oldest_key, expires_at = next(iter(entries.items()))
+            if expires_at > now:
+                break
+            del entries[oldest_key]
+
+        if key in entries:
+            return True
+        entries[key] = now + self.ttl
+        if len(entries) > self.maxsize:
+            entries.popitem(last=False)
+        return False
+
+    def __len__(self):
+        return len(self._entries)
+
+_afk_notice_throttle = _BoundedTTLMap(AFK_NOTICE_COOLDOWN, AFK_NOTICE_THROTTLE_SIZE)
+
+# --- AFK Mention Digest ---
+# While a user is AFK, each mention is kept in a fixed-size ring buffer in memory (never in
+# afk_status), and one summary is delivered when they come back.
+
+AFK_DIGEST_SIZE = 20 # Most recent mentions kept per AFK user
+
+# user_id -> [deque of (jump_url, author_id, unix_timestamp), total mention count]
+_afk_mention_digests = {}
+
+def _record_afk_mention(afk_user_id: int, message: discord.Message):
+    """Appends a mention to the AFK user's ring buffer; the oldest entry falls off when full."""
+    digest = _afk_mention_digests.get(afk_user_id)
+    if digest is None:
+        digest = _afk_mention_digests[afk_user_id] = [collections.deque(maxlen=AFK_DIGEST_SIZE), 0]
+    digest[0].append((message.jump_url, message.author.id, int(message.created_at.timestamp())))
+    digest[1] += 1
+
+async def _deliver_afk_digest(user: discord.abc.User, fallback_channel, digest):
+    """DMs the returning user one summary of who mentioned them, falling back to the channel."""
+    mentions, total = digest
+    lines = [f"<t:{ts}:R> <@{author_id}> — [jump to message]({url})" for url, author_id, ts in mentions]
+    embed = discord.Embed(
+        title="📬 Mentions while you were AFK",
+        description="\n".join(lines),
+        color=discord.Color.from_rgb(173, 216, 230), # Light blue color
+        timestamp=datetime.datetime.now(datetime.timezone.utc)
+    )
+    if total > len(mentions):
+        embed.set_footer(text=f"Showing the latest {len(mentions)} of {total} mentions")
+
+    try:
+        await user.send(embed=embed)
+    except discord.Forbidden:
+        try:
+            await fallback_channel.send(content=user.mention, embed=embed, allowed_mentions=discord.AllowedMentions(users=[user]))
+        except discord.HTTPException as e:
+            print(f"DEBUG: Could not deliver AFK digest to {user} ({user.id}): {e}")
+    except discord.HTTPException as e:
+        print(f"DEBUG: HTTPException while sending AFK digest to {user} ({user.id}): {e}")
+
+# --- Auto-Responder Engine ---
+
+AUTORESPONDER_MAX_TRIGGERS = 500 # Per guild
+AUTORESPONDER_DEFAULT_COOLDOWN = 30 # Seconds before the same trigger can fire again in a channel
+AUTORESPONDER_PLACEHOLDERS = ('{user}', '{channel}', '{server}')
+
+# guild_id -> (compiled multi-trigger pattern, {trigger: _AutoResponseTemplate})
+# Built lazily on the first message after a change, so a message costs one regex scan
+# no matter how many triggers the guild has.
+_autoresponder_index = {}
+# channel_id -> {trigger: monotonic time the trigger may fire again}
+_autoresponder_cooldowns = {}
+
+class _AutoResponseTemplate:
+    """A pre-rendered auto-response. Static replies reuse the same Embed/content on every hit."""
+    __slots__ = ('text', 'use_embed', 'cooldown', 'dynamic', 'embed')
+
+    def __init__(self, text: str, use_embed: bool, cooldown: int):
+        self.text = text
+        self.use_embed = use_embed
+        self.cooldown = cooldown
+        self.dynamic = any(p in text for p in AUTORESPONDER_PLACEHOLDERS)
+        self.embed = discord.Embed(description=text, color=discord.Color.blue()) if use_embed else None
+
+    def render(self, message: discord.Message):
+        """Returns the keyword arguments for `channel.send` for this trigger."""
+        if not self.dynamic:
+            return {'embed': self.embed} if self.use_embed else {'content': self.text}
+        text = (self.text.replace('{user}', message.author.mention)
+                         .replace('{channel}', message.channel.mention)
+                         .replace('{server}', message.guild.name))
+        if self.use_embed:
+            embed = self.embed.copy()
+            embed.description = text
+            return {'embed': embed}
+        return {'content': text}
+
+def _get_autoresponder_index(guild_id: int):
+    """Returns the compiled trigger index for a guild, building and caching it if needed."""
+    index = _autoresponder_index.get(guild_id)
+    if index is not None:
+        return index
+    triggers = autoresponders.get(guild_id)
+    if not triggers:
+        index = (None, {})
+    else:
+        # Longest triggers first so "good morning" wins over "good"
+        ordered = sorted(triggers, key=len, reverse=True)
+        pattern = re.compile(r'(?<!\w)(?:' + '|'.join(re.escape(t) for t in ordered) + r')(?!\w)', re.IGNORECASE)
+        templates = {
+            trigger: _AutoResponseTemplate(entry["response"], entry.get("embed", False), entry.get("cooldown", AUTORESPONDER_DEFAULT_COOLDOWN))
+            for trigger, entry in triggers.items()
+        }
+        index = (pattern, templates)
+    _autoresponder_index[guild_id] = index
+    return index
+
+def _invalidate_autoresponder_index(guild_id: int):
+    """Drops the compiled index for a guild after its triggers change."""
+    _autoresponder_index.pop(guild_id, None)
+
+async def _handle_autoresponse(message: discord.Message):
+    """Replies to the first trigger in the message that is not cooling down in this channel."""
+    pattern, templates = _get_autoresponder_index(message.guild.id)
+    if pattern is None:
+        return
+
+    now = asyncio.get_running_loop().time()
+    bucket = _autoresponder_cooldowns.get(message.channel.id)
+    for match in pattern.finditer(message.content):
+        trigger = match.group(0).lower()
+        template = templates.get(trigger)
+        if template is None:
+            continue
+        if bucket is not None and bucket.get(trigger, 0) > now:
+            continue # Still cooling down in this channel
+
+        if bucket is None:
+            bucket = _autoresponder_cooldowns[message.channel.id] = {}
+        else:
+            # Keep the bucket compact by dropping expired entries while we're here
+            for expired in [t for t, ready_at in bucket.items() if ready_at <= now]:
+                del bucket[expired]
+        if template.cooldown > 0:
+            bucket[trigger] = now + template.cooldown
+
+        try:
+            await message.channel.send(**template.render(message))
+        except discord.Forbidden:
+            print(f"DEBUG: Missing permissions to send auto-response in channel {message.channel.name}.")
+        except discord.HTTPException as e:
+            print(f"DEBUG: HTTPException while sending auto-response for '{trigger}': {e}")
+        return
+
+
+# --- Job Scheduler ---
+# Timed actions (reminders, unmutes, ...) are rows in scheduled_jobs, persisted to disk, and
+# indexed in a hierarchical timing wheel (O(1) insert/cancel, one small record per job).
+# A single background loop ticks the wheel once per JOB_TICK while anything is pending.
+# Commands enqueue a job and return right away; jobs that came due while the bot was offline
+# fire in batches after startup.
+
+JOB_BATCH_SIZE = 25 # Jobs fired concurrently per batch
+JOB_BATCH_PAUSE = 1.0 # Seconds between full batches, so a backlog doesn't burst the API
+JOB_TICK = 1.0 # Scheduler resolution in seconds
+
+_job_wheel = TimingWheel(tick=JOB_TICK) # job_id timers
+_due_job_ids = collections.deque() # Fired by the wheel, waiting for a batch slot
+_job_wakeup = asyncio.Event() # Set when a job is added so an idle loop starts ticking
+_job_handlers = {} # kind -> async handler(job_data)
+_job_queues = {} # kind -> queue(job_id, job_data), for kinds worked off by a worker of their own
+
+REMINDER_MAX_DAYS = 365 # Reminders are persisted jobs, so long ones cost nothing while pending
+DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+def _parse_duration(duration):
+    """
+    Parses durations like 30s, 10m, 2h, 3d, 1w or combinations such as 1d12h.
+    Returns the total number of seconds, or None if the string isn't a valid duration.
+    """
+    parts = re.findall(r'(\d+)([smhdw])', duration.lower())
+    if not parts or ''.join(value + unit for value, unit in parts) != duration.lower():
+        return None
+    return sum(int(value) * DURATION_UNITS[unit] for value, unit in parts)
+
+def _split_leading_duration(text):
+    """
+    Splits an optional leading duration off a free-text argument: "7d spamming" -> (604800, "spamming").
+    Returns (None, text) when the first word isn't a duration.
+    """
+    first, _, rest = text.partition(' ')
+    seconds = _parse_duration(first)
+    if not seconds:
+        return None, text
+    return seconds, rest.strip()
+
+def _format_duration(seconds):
+    """Formats seconds as a compact duration like 1d12h or 45m."""
+    parts = []
+    for unit, size in (('d', 86400), ('h', 3600), ('m', 60), ('s', 1)):
+        if seconds >= size:
+            parts.append(f"{int(seconds // size)}{unit}")
+            seconds %= size
+    return ''.join(parts) or '0s'
+
+def _job_handler(kind):
+    """Registers the coroutine that runs jobs of the given kind."""
+    def decorator(func):
+        _job_handlers[kind] = func
+        return func
+    return decorator
+
+def _job_queue(kind):
+    """
+    Registers a function that hands due jobs of the given kind to a worker. Those jobs stay in
+    scheduled_jobs until the worker removes them, so a restart fires them again.
+    """
+    def decorator(func):
+        _job_queues[kind] = func
+        return func
+    return decorator
+
+def _rebuild_job_wheel():
+    """Rebuilds the timing wheel from the job table (after loading from disk)."""
+    _job_wheel.clear()
+    _due_job_ids.clear()
+    for job_id, job in scheduled_jobs.items():
+        _job_wheel.insert(job_id, job["due"])
+    _job_wakeup.set()
+
+def schedule_job(kind, delay_seconds, job_id=None, **data):
+    """
+    Persists a job that runs `kind`'s handler with `data` after the delay. Returns the job ID.
+    Passing a job_id (e.g. "unban:<guild>:<user>") replaces any pending job with that ID.
+    """
+    job_id = job_id or uuid.uuid4().hex[:12]
+    due = time.time() + delay_seconds
+    scheduled_jobs[job_id] = {"kind": kind, "due": due, "data": data}
+    _job_wheel.insert(job_id, due)
+    _schedule_save(save_scheduled_jobs)
+    _job_wakeup.set()
+    return job_id
+
+def cancel_job(job_id):
+    """Cancels a pending job. Returns False if there was none."""
+    if scheduled_jobs.pop(job_id, None) is None:
+        return False
+    _job_wheel.cancel(job_id)
+    _schedule_save(save_scheduled_jobs)
+    return True
+
+def _pop_due_jobs(limit):
+    """Removes and returns up to `limit` jobs the wheel has fired. Queued kinds go to their queue instead."""
+    batch = []
+    while _due_job_ids and len(batch) < limit:
+        job_id = _due_job_ids.popleft()
+        job = scheduled_jobs.get(job_id)
+        if job is None: # Cancelled after firing but before its batch ran
+            continue
+        queue = _job_queues.get(job["kind"])
+        if queue is not None:
+            queue(job_id, job["data"])
+            continue
+        del scheduled_jobs[job_id]
+        batch.append((job_id, job))
+    return batch
+
+async def _run_job(job_id, job):
+    """Runs one job's handler, logging (not raising) any failure."""
+    handler = _job_handlers.get(job["kind"])
+    if handler is None:
+        print(f"DEBUG: No handler for scheduled job {job_id} of kind '{job['kind']}'. Dropping it.")
+        return
+    try:
+        await handler(job["data"])
+    except Exception as e:
+        print(f"DEBUG: Scheduled job {job_id} ({job['kind']}) failed: {e}")
+
+@_job_handler("reminder")
+async def _fire_reminder(data):
+    """DMs a reminder, falling back to the channel it was set in."""
+    user = bot.get_user(data["user_id"]) or await bot.fetch_user(data["user_id"])
+    channel = bot.get_channel(data["channel_id"]) if data.get("channel_id") else None
+
+    embed = discord.Embed(
+        title="⏰ Reminder!",
+        description=f"You asked me to remind you about: **{data['message']}**",
+        color=discord.Color.gold(),
+        timestamp=datetime.datetime.now(datetime.timezone.utc)
+    )
+    embed.set_footer(text=f"Reminder set by {user.display_name}")
+    try:
+        await user.send(embed=embed) # DM the user
+        if channel and not isinstance(channel, discord.DMChannel): # If not in DM, send a confirmation in original channel
+            await channel.send(f"{user.mention}, your reminder is ready! I've sent it to your DMs.")
+    except discord.Forbidden:
+        if channel:
+            await channel.send(f"{user.mention}, I couldn't DM you, so here is your reminder: **{data['message']}**")
+
+@_job_handler("unmute")
+async def _fire_unmute(data):
+    """Removes the Muted role once a timed mute expires."""
+    guild = bot.get_guild(data["guild_id"])
+    if guild is None:
+        return
+    member = await resolve_member(guild, data["member_id"])
+    if member is None:
+        return # They left the server
+    muted_role = discord.utils.get(guild.roles, name="Muted")
+    if not muted_role or muted_role not in member.roles: # Check if they are still muted after the duration
+        return
+    try:
+        await member.remove_roles(muted_role, reason="Mute duration expired")
+        channel = guild.get_channel(data["channel_id"]) if data.get("channel_id") else None
+        if channel:
+            await channel.send(f'{member.mention} has been unmuted automatically after {data["minutes"]} minutes.')
+        await log_moderation_action(guild, "Unmute (Auto)", member, bot.user, "Mute duration expired")
+        await _send_dm_to_member(member, f'You have been unmuted in {guild.name}.')
+    except discord.Forbidden:
+        print(f"DEBUG: Bot missing permissions to auto-unmute {member.name} in guild {guild.name}.")
+    except discord.HTTPException as e:
+        print(f"DEBUG: HTTPException during auto-unmute for {member.name}: {e}")
+
+# --- Timed Moderation Expiries ---
+# Temporary bans and roles are scheduled jobs like any other, but they don't call Discord when
+# they fire: they queue the expiry here, and the job stays stored until the expiry has been
+# applied, so a restart mid-backlog fires it again. One worker drains the queue in paced batches,
+# merges role expiries for the same member into a single call, backs off when calls start
+# waiting on rate limits, and writes one mod-log summary per guild per batch. After downtime
+# a pile of simultaneous expiries is therefore worked off at a steady rate.
+
+EXPIRY_BATCH_SIZE = 50 # Expiries handled per batch
+EXPIRY_MIN_INTERVAL = 0.25 # Seconds between expiry API calls when Discord is responding promptly
+EXPIRY_MAX_INTERVAL = 5.0 # Upper bound for the backed-off interval
+EXPIRY_SLOW_CALL = 1.0 # A call this slow most likely waited on a rate limit bucket
+
+_expiry_backlog = collections.OrderedDict() # (guild_id, kind, user_id) -> {job_id: role ID (roles only)}
+_expiry_wakeup = asyncio.Event()
+_expiry_interval = EXPIRY_MIN_INTERVAL # Adaptive pacing between calls
+
+def _queue_expiry(job_id, guild_id, kind, user_id, role_id=None):
+    """Queues an expiry for the worker, merging it with any pending one for the same member."""
+    _expiry_backlog.setdefault((guild_id, kind, user_id), {})[job_id] = role_id
+    _expiry_wakeup.set()
+
+@_job_queue("unban")
+def _expire_ban(job_id, data):
+    """Temporary ban ran out."""
+    _queue_expiry(job_id, data["guild_id"], "unban", data["user_id"])
+
+@_job_queue("role_expiry")
+def _expire_role(job_id, data):
+    """Temporary role ran out."""
+    _queue_expiry(job_id, data["guild_id"], "role", data["member_id"], data["role_id"])
+
+def _settle_expiries(key, jobs):
+    """Drops handled expiry jobs from the backlog and, unless they were rescheduled meanwhile, from the job store."""
+    pending = _expiry_backlog.get(key, {})
+    for job_id, job in jobs.items():
+        pending.pop(job_id, None)
+        if job is not None and scheduled_jobs.get(job_id) is job:
+            del scheduled_jobs[job_id]
+    if not pending:
+        _expiry_backlog.pop(key, None)
+    _schedule_save(save_scheduled_jobs)
+
+async def _apply_expiry(guild, kind, user_id, role_ids):
+    """Performs one queued expiry. Returns a line for the mod-log summary, or None if nothing was left to undo."""
+    if kind == "unban":
+        try:
+            await guild.unban(discord.Object(id=user_id), reason="Temporary ban expired")
+        except discord.NotFound:
+            return None # Already unbanned
+        return f"<@{user_id}> (`{user_id}`)"
+
+    member = await resolve_member(guild, user_id)
+    if member is None:
+        return None # They left the server
+    roles = [role for role in (guild.get_role(role_id) for role_id in role_ids) if role and role in member.roles]
+    if not roles:
+        return None
+    await member.remove_roles(*roles, reason="Temporary role expired")
+    return f"{member.mention}: {', '.join(role.name for role in roles)}"
+
+async def _log_expiry_summary(guild, kind, lines):
+    """Writes one mod-log entry covering every expiry of a kind in a batch."""
+    action = "Temporary Ban Expired" if kind == "unban" else "Temporary Role Expired"
+    await log_moderation_action(guild, f"{action} (x{len(lines)})" if len(lines) > 1 else action, _summarize_lines(lines), bot.user, "Duration expired")
+
+# --- Bulk Operations ---
+# Mass actions run as background tasks through BulkExecutor, so the command returns right away.
+# Progress is shown by editing a single status message at most every BULK_PROGRESS_INTERVAL
+# seconds, and failures are attached as a text file instead of being pasted into chat.
+
+BULK_PROGRESS_INTERVAL = 5 # Seconds between status message edits
+BULK_MAX_CONCURRENCY = 8 # Upper bound; the executor adapts below this from rate limit headers
+
+_background_jobs = set() # Keeps running bulk tasks referenced until they finish
+
+def _start_background_job(coro):
+    """Runs a coroutine as a tracked background task."""
+    task = asyncio.create_task(coro)
+    _background_jobs.add(task)
+    task.add_done_callback(_background_jobs.discard)
+    return task
+
+def _bulk_progress_text(label, progress):
+    """One-line progress summary for a status message."""
+    return (
+        f"{label}: {progress['done']}/{progress['total']} done, {progress['failed']} failed "
+        f"({progress['elapsed']:.0f}s, {progress['concurrency']} in flight)"
+    )
+
+def _failure_report(filename, failures, describe):
+    """Builds a text file listing every failed item, one per line."""
+    lines = [f"{describe(item)}\t{error}" for item, error in failures]
+    return discord.File(BytesIO("\n".join(lines).encode('utf-8')), filename=filename)
+
+async def _edit_status(message, content):
+    """Edits a status message, ignoring it if it was deleted meanwhile."""
+    try:
+        await message.edit(content=content)
+    except discord.HTTPException as e:
+        print(f"DEBUG: Could not update bulk status message: {e}")
+
+def _clip(text, limit):
+    """Cuts text down to at most `limit` characters, marking the cut with an ellipsis."""
+    text = str(text)
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+def _summarize_lines(lines, limit=1000):
+    """Joins summary lines, cutting them off to fit an embed field (1024 characters)."""
+    summary = "\n".join(lines)
+    if len(summary) > limit:
+        summary = summary[:limit].rsplit("\n", 1)[0] + f"\n... and more ({len(lines)} total)"
+    return summary
+
+async def _dm_members(members, message):
+    """Queues the same DM to every member in a list."""
+    for member in members:
+        await _send_dm_to_member(member, message)
+
+async def _report_bulk_outcome(ctx, summary, log_action, done, skipped, failures, log_reason, log_target=None, report_name="report.txt"):
+    """
+    Reports a bulk moderation action once: `summary` in chat with skipped and failed targets
+    in an attached file, and one mod-log entry covering every target in `done`.
+    """
+    problems = list(skipped) + list(failures)
+    if problems:
+        summary += f" {len(skipped)} skipped and {len(failures)} failed; see the attached report."
+        await ctx.send(summary, file=_failure_report(report_name, problems, _describe_target))
+    else:
+        await ctx.send(summary)
+
+    if done:
+        if problems:
+            log_reason += f"\n{len(skipped)} skipped, {len(failures)} failed"
+        target = log_target or _summarize_lines([f"<@{t.id}> (`{t.id}`)" for t in done])
+        await log_moderation_action(ctx.guild, f"{log_action} (x{len(done)})", target, ctx.author, log_reason)
+
+async def _run_member_action(members, operation, method, path):
+    """
+    Runs `operation(member)` for every member through BulkExecutor, with concurrency following
+    the rate limit bucket of `method path`. Returns (members done, [(member, error)]).
+    """
+    executor = BulkExecutor(operation, route=RateLimitObserver.route_key(method, path),
+                            observer=rate_limit_observer, max_concurrency=BULK_MAX_CONCURRENCY)
+    result = await executor.run(members)
+    failed_ids = {member.id for member, _ in result.failures}
+    for member, error in result.failures:
+        print(f"DEBUG: Bulk {method} {path} failed for {member} ({member.id}): {error}")
+    return [member for member in members if member.id not in failed_ids], result.failures
+
+# --- Bulk Bans ---
+# mass_ban and mass_ban_ids use Discord's bulk-ban endpoint (up to 200 users per request).
+# Hierarchy checks for the whole batch are done locally first, without sending anything,
+# and the outcome is reported in one message and one mod-log entry.
+
+BULK_BAN_CHUNK = 200 # Discord's maximum users per bulk-ban request
+MASS_BAN_MAX_IDS = 5000 # Upper bound for one mass_ban_ids run
+MASS_BAN_MAX_FILE_BYTES = 1024 * 1024 # ID list attachments larger than this are refused
+_SNOWFLAKE_PATTERN = re.compile(r"\b\d{17,20}\b")
+
+def _describe_target(target):
+    """Name and ID of a bulk action target; users who already left only have an ID."""
+    return f"{target} ({target.id})" if isinstance(target, (discord.Member, discord.User)) else str(target.id)
+
+def _partition_mod_targets(ctx, targets, action_name):
+    """
+    Checks a whole batch of moderation targets in one local pass (no API calls, no messages),
+    applying the same rules as _check_mod_permissions.
+    Targets are Members or discord.Objects for users who aren't in the server.
+    Returns (allowed targets, [(target, reason it was skipped)]), dropping duplicates.
+    """
+    return _partition_targets(ctx.guild, ctx.author, targets, action_name)
+
+def _partition_targets(guild, author, targets, action_name):
+    """_partition_mod_targets for a moderator without a command context, e.g. in a mass job."""
+    bot_key = _top_role_key(guild.me)
+    author_key = None if author.id == guild.owner_id else _top_role_key(author)
+    allowed, skipped, seen = [], [], set()
+    for target in targets:
+        if target.id in seen:
+            continue
+        seen.add(target.id)
+        if target.id == author.id:
+            skipped.append((target, f"You cannot {action_name} yourself"))
+        elif target.id == bot.user.id:
+            skipped.append((target, f"I cannot {action_name} myself"))
+        elif target.id == guild.owner_id:
+            skipped.append((target, "Server owner"))
+        elif isinstance(target, discord.Member) and _top_role_key(target) >= bot_key:
+            skipped.append((target, "Highest role is not below mine"))
+        elif isinstance(target, discord.Member) and author_key is not None and _top_role_key(target) >= author_key:
+            skipped.append((target, "Highest role is not below yours"))
+        else:
+            allowed.append(target)
+    return allowed, skipped
+
+async def _bulk_ban(guild, targets, reason):
+    """
+    Bans targets in chunks through the bulk-ban endpoint, or one by one through BulkExecutor
+    if the bot lacks Manage Server (which the endpoint requires). Returns (banned, failures).
+    """
+    if not guild.me.guild_permissions.manage_guild:
+        async def ban_one(target):
+            await guild.ban(target, reason=reason, delete_message_seconds=0)
+        return await _run_member_action(targets, ban_one, "PUT", f"/guilds/{guild.id}/bans/0")
+
+    banned, failures = [], []
+    for start in range(0, len(targets), BULK_BAN_CHUNK):
+        chunk = targets[start:start + BULK_BAN_CHUNK]
+        try:
+            result = await guild.bulk_ban(chunk, reason=reason, delete_message_seconds=0)
+        except discord.HTTPException as e: # Includes Forbidden; the whole chunk failed
+            failures.extend((target, f"{type(e).__name__}: {e}") for target in chunk)
+            print(f"DEBUG: Bulk ban of {len(chunk)} user(s) in guild {guild.name} failed: {e}")
+            continue
+        banned_ids = {user.id for user in result.banned}
+        for target in chunk:
+            if target.id in banned_ids:
+                banned.append(target)
+            else:
+                failures.append((target, "Not banned by Discord (already banned, or not bannable)"))
+    return banned, failures
+
+async def _run_mass_ban(ctx, targets, reason, duration_seconds):
+    """Checks, bans, schedules expiries, reports and logs a batch of ban targets."""
+    duration_text = f" for {_format_duration(duration_seconds)}" if duration_seconds else ""
+    bannable, skipped = _partition_mod_targets(ctx, targets, "ban")
+    if not bannable:
+        await ctx.send("None of those users can be banned: " + "; ".join(f"{_describe_target(t)}: {why}" for t, why in skipped[:10]))
+        return
+
+    banned, failures = await _bulk_ban(ctx.guild, bannable, f"Mass ban by {ctx.author.name}: {reason}")
+    for target in banned:
+        if duration_seconds:
+            schedule_job("unban", duration_seconds, job_id=f"unban:{ctx.guild.id}:{target.id}", guild_id=ctx.guild.id, user_id=target.id)
+        else:
+            cancel_job(f"unban:{ctx.guild.id}:{target.id}") # A permanent ban replaces an earlier temporary one
+    await _dm_members([t for t in banned if isinstance(t, discord.Member)],
+                      f'You have been banned from {ctx.guild.name}{duration_text} for: {reason}')
+
+    log_reason = f"{reason} (Duration: {_format_duration(duration_seconds)})" if duration_seconds else reason
+    await _report_bulk_outcome(ctx, f"Banned {len(banned)} user(s){duration_text}.", "Mass Ban", banned, skipped, failures,
+                               log_reason, report_name="mass_ban_report.txt")
+
+# --- Ban Index ---
+# Unbanning by ID needs no ban list at all. Unbanning by name needs one, and listing a guild's bans
+# costs a request per 1000 entries, so each guild's bans are read once, on the first name lookup,
+# into a BanIndex that on_member_ban/on_member_unban keep current from then on.
+
+UNBAN_SUGGESTIONS = 5 # Close matches offered when a name doesn't match exactly
+
+ban_indexes = {} # guild_id -> BanIndex (possibly still being built)
+_ban_index_builds = {} # guild_id -> task reading the ban list
+
+def _index_ban(index, user, listed=False):
+    """Adds a banned user to a ban index; `listed` for entries read from the ban list."""
+    add = index.add_listed if listed else index.add
+    add(user.id, user.name, user.global_name, str(user))
+
+async def _build_ban_index(guild: discord.Guild):
+    """Reads the guild's whole ban list into its index."""
+    index = ban_indexes[guild.id] = BanIndex()
+    started = time.monotonic()
+    try:
+        async for entry in guild.bans(limit=None):
+            _index_ban(index, entry.user, listed=True)
+    except Exception:
+        ban_indexes.pop(guild.id, None) # Let the next lookup try again
+        raise
+    finally:
+        _ban_index_builds.pop(guild.id, None)
+    index.mark_ready()
+    print(f"DEBUG: Indexed {len(index)} ban(s) in guild {guild.name} in {time.monotonic() - started:.1f}s.")
+    return index
+
+async def get_ban_index(guild: discord.Guild):
+    """The guild's ban index, reading the ban list first if this is the first lookup."""
+    index = ban_indexes.get(guild.id)
+    if index is not None and index.ready:
+        return index
+    task = _ban_index_builds.get(guild.id)
+    if task is None:
+        task = _ban_index_builds[guild.id] = asyncio.create_task(_build_ban_index(guild))
+    return await asyncio.shield(task) # A cancelled lookup doesn't abort the build for everyone else
+
+def _describe_ban_match(match):
+    """One line naming an index entry, e.g. for a list of suggestions."""
+    display = f" ({match.global_name})" if match.global_name and match.global_name != match.name else ""
+    return f"**{match.name}**{display} - `{match.user_id}`"
+
+# --- Resumable Mass Jobs ---
+# Long mass operations (role changes across a whole server, ...) are rows in mass_jobs, persisted
+# to disk with a cursor: the ID of the last member handled, in snowflake order. Members are
+# streamed from Discord in pages after the cursor, each page goes through BulkExecutor, and the
+# cursor is checkpointed after every page. After a restart running jobs pick up where they left
+# off; a page that was in flight is redone, which is harmless because every operation re-checks
+# its target first. A job keeps counters, a cursor and at most one fetched page in memory, and
+# failures go to a file on disk, so its footprint doesn't grow with the size of the guild.
+
+MASS_JOB_PAGE_SIZE = 100 # Members scanned per checkpoint
+MASS_JOB_FETCH_SIZE = 1000 # Members fetched per API request (Discord's maximum)
+MASS_JOB_FAILURES_DIR = 'mass_job_failures' # One <job_id>.txt per job, attached when it finishes
+MASS_JOB_INPUTS_DIR = 'mass_job_inputs' # Input lists too large for mass_jobs.json, deleted when the job finishes
+
+_mass_job_kinds = {} # kind -> prepare(guild, job) -> _MassJobPlan or None
+_mass_job_tasks = {} # job_id -> running task
+
+# What a prepared job does: `pages` yields (items, cursor, scanned) and `operation` runs per item.
+# `size(item)` is how many units (`unit`) an item counts for in the progress counters, 1 by default.
+_MassJobPlan = collections.namedtuple('_MassJobPlan', 'label pages operation route log_action log_target size unit max_concurrency',
+                                      defaults=(None, 'member', BULK_MAX_CONCURRENCY))
+
+class _MassJobBatch(list):
+    """
+    Items handled by one bulk request; one line in the failure report if the request fails.
+    The operation adds (item, error) to `failures` for items a successful request didn't cover.
+    """
+    noun = "items, first"
+
+    def __init__(self, items=()):
+        super().__init__(items)
+        self.failures = []
+
+    @property
+    def id(self):
+        return self[0].id
+
+    def __str__(self):
+        return f"{len(self)} {self.noun}"
+
+def _mass_job_kind(kind):
+    """Registers the function that prepares jobs of the given kind."""
+    def decorator(func):
+        _mass_job_kinds[kind] = func
+        return func
+    return decorator
+
+def create_mass_job(kind, ctx, status_message, **params):
+    """Persists a new mass job and starts running it. Returns the job ID."""
+    return _create_mass_job(kind, ctx.guild.id, ctx.channel.id, ctx.author.id, status_message.id, params)
+
+def _create_mass_job(kind, guild_id, channel_id, author_id, status_message_id, params, cursor=0):
+    """create_mass_job for jobs started by other jobs, which have no command context."""
+    job_id = uuid.uuid4().hex[:8]
+    mass_jobs[job_id] = {
+        "kind": kind,
+        "guild_id": guild_id,
+        "channel_id": channel_id,
+        "author_id": author_id,
+        "status_message_id": status_message_id,
+        "params": params,
+        "cursor": cursor,
+        "state": "running",
+        "scanned": 0,
+        "succeeded": 0,
+        "failed": 0,
+        "created": time.time(),
+    }
+    _schedule_save(save_mass_jobs)
+    _start_mass_job(job_id)
+    return job_id
+
+def _start_mass_job(job_id):
+    """Starts the runner for a job unless one is already going."""
+    task = _mass_job_tasks.get(job_id)
+    if task is None or task.done():
+        _mass_job_tasks[job_id] = _start_background_job(_run_mass_job(job_id))
+
+def resume_mass_jobs():
+    """Restarts every job that was running when the bot last stopped."""
+    for job_id, job in mass_jobs.items():
+        if job["state"] == "running":
+            _start_mass_job(job_id)
+
+def _mass_job_failures_path(job_id):
+    return os.path.join(MASS_JOB_FAILURES_DIR, f"{job_id}.txt")
+
+def _record_mass_job_failures(job_id, failures):
+    """Appends failed items to the job's failure file."""
+    os.makedirs(MASS_JOB_FAILURES_DIR, exist_ok=True)
+    with open(_mass_job_failures_path(job_id), 'a', encoding='utf-8') as f:
+        for item, error in failures:
+            if isinstance(item, discord.Message):
+                label = f"Message by {item.author} ({item.id})"
+            elif isinstance(item, discord.Object):
+                label = str(item.id) # A user who isn't in the server
+            else:
+                label = f"{item} ({item.id})"
+            f.write(f"{label}\t{error}\n")
+
+async def _update_mass_job_status(job, content):
+    """Edits the job's status message, which may be from before a restart."""
+    channel = bot.get_channel(job["channel_id"])
+    if channel is not None:
+        await _edit_status(channel.get_partial_message(job["status_message_id"]), content)
+
+def _mass_job_progress_text(plan_label, job):
+    return f"{plan_label}: {job['scanned']} scanned, {job['succeeded']} done, {job['failed']} failed"
+
+async def _run_mass_job(job_id):
+    """Works a job off page by page, checkpointing the cursor after each page."""
+    job = mass_jobs.get(job_id)
+    if job is None:
+        return
+    guild = bot.get_guild(job["guild_id"])
+    prepare = _mass_job_kinds.get(job["kind"])
+    plan = None
+    finished = False
+    try:
+        try:
+            plan = await prepare(guild, job) if (guild is not None and prepare is not None) else None
+        except Exception as e:
+            # Setting up would fail the same way on every resume, so the job is finished instead
+            print(f"DEBUG: Mass job {job_id} ({job['kind']}) could not be set up: {e}")
+            await _finish_mass_job(job_id, job, None, f"errored while starting: `{e}`")
+            return
+        if plan is None:
+            print(f"DEBUG: Mass job {job_id} ({job['kind']}) can no longer run (guild or target gone). Dropping it.")
+            await _finish_mass_job(job_id, job, None, "dropped because its server or target no longer exists")
+            return
+
+        executor = BulkExecutor(plan.operation, route=plan.route, observer=rate_limit_observer, max_concurrency=plan.max_concurrency)
+        size = plan.size or (lambda item: 1)
+        last_status = time.monotonic()
+        async for items, cursor, scanned in plan.pages:
+            job = mass_jobs.get(job_id)
+            if job is None or job["state"] != "running":
+                break # Paused or cancelled; the cursor still points at the last finished page
+            result = await executor.run(items) if items else None
+            if result is not None:
+                # Batches that went through only in part list the members that didn't
+                failed_items = {id(item) for item, _ in result.failures}
+                partial = [failure for item in items if id(item) not in failed_items for failure in getattr(item, "failures", ())]
+                failed = sum(size(item) for item, _ in result.failures) + len(partial)
+                job["succeeded"] += sum(size(item) for item in items) - failed
+                job["failed"] += failed
+                if result.failures or partial:
+                    _record_mass_job_failures(job_id, result.failures + partial)
+            job["scanned"] += scanned
+            job["cursor"] = cursor
+            job["updated"] = time.time()
+            _schedule_save(save_mass_jobs)
+            if time.monotonic() - last_status >= BULK_PROGRESS_INTERVAL:
+                last_status = time.monotonic()
+                await _update_mass_job_status(job, _mass_job_progress_text(plan.label, job))
+        else:
+            finished = True
+    except Exception as e:
+        # Leave the job running on disk so it is retried from its last checkpoint after a restart
+        print(f"DEBUG: Mass job {job_id} ({job['kind']}) stopped by an unexpected error: {e}")
+        label = plan.label if plan else f"Mass job {job_id}"
+        await _update_mass_job_status(job, f"{label}: stopped by an unexpected error: `{e}`. It will resume after a restart or `massjobs resume {job_id}`.")
+        return
+    finally:
+        _mass_job_tasks.pop(job_id, None)
+
+    if finished:
+        await _finish_mass_job(job_id, job, plan, "finished")
+        return
+    job = mass_jobs.get(job_id)
+    if job is None:
+        return
+    if job["state"] == "cancelled":
+        await _finish_mass_job(job_id, job, plan, "cancelled")
+    else:
+        await _update_mass_job_status(job, _mass_job_progress_text(plan.label, job) + f" - paused. Resume with `massjobs resume {job_id}`.")
+
+async def _finish_mass_job(job_id, job, plan, outcome):
+    """Removes a job, posts its summary with the failure report attached, and logs it."""
+    mass_jobs.pop(job_id, None)
+    _schedule_save(save_mass_jobs)
+    input_file = job["params"].get("input_file")
+    if input_file and os.path.exists(input_file):
+        os.remove(input_file)
+    label = plan.label if plan else f"Mass job {job_id}"
+    summary = f"{label} {outcome}: {job['succeeded']} done, {job['failed']} failed out of {job['scanned']} {plan.unit if plan else 'item'}(s) scanned."
+
+    path = _mass_job_failures_path(job_id)
+    file = None
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            file = discord.File(BytesIO(f.read()), filename=f"{job['kind']}_{job_id}_failures.txt")
+        os.remove(path)
+        summary += " See the attached report for the failures."
+
+    await _update_mass_job_status(job, _mass_job_progress_text(label, job) + f" - {outcome}.")
+    channel = bot.get_channel(job["channel_id"])
+    if channel is not None:
+        try:
+            await channel.send(summary, file=file)
+        except discord.HTTPException as e:
+            print(f"DEBUG: Could not post the summary of mass job {job_id}: {e}")
+
+    guild = bot.get_guild(job["guild_id"])
+    if plan and guild and job["succeeded"]:
+        moderator = get_cached_member(guild, job["author_id"]) or bot.get_user(job["author_id"]) or bot.user
+        await log_moderation_action(guild, plan.log_action, plan.log_target, moderator,
+                                    f"{summary} Reason: {job['params'].get('reason', 'No reason provided')}")
+
+def _needs_role_change(member, role, adding, bot_top_role_key):
+    """True if the bulk role change applies to this member (skips bots, the owner, higher members and no-ops)."""
+    if member.bot or member.id == member.guild.owner_id or _top_role_key(member) >= bot_top_role_key:
+        return False
+    return (role not in member.roles) if adding else (role in member.roles)
+
+def _role_change_plan(guild, job, pages):
+    """Shared plan for the role change kinds: add or remove one role on every member the pages yield."""
+    params = job["params"]
+    role = guild.get_role(params["role_id"])
+    if role is None:
+        return None
+    adding = params["adding"]
+    moderator_name = params.get("author_name", "a moderator")
+    reason = f"Mass role {'add' if adding else 'remove'} by {moderator_name}: {params.get('reason', 'No reason provided')}"
+
+    async def apply(member):
+        if adding:
+            await member.add_roles(role, reason=reason)
+        else:
+            await member.remove_roles(role, reason=reason)
+
+    return _MassJobPlan(
+        label=f"{'Adding' if adding else 'Removing'} role '{role.name}' {'to' if adding else 'from'} members",
+        pages=pages(role, adding),
+        operation=apply,
+        route=RateLimitObserver.route_key("PUT" if adding else "DELETE", f"/guilds/{guild.id}/members/0/roles/0"),
+        log_action="Mass Role Add" if adding else "Mass Role Remove",
+        log_target=role,
+    )
+
+@_mass_job_kind("role_all")
+async def _prepare_role_all(guild, job):
+    """Role change for every member of the server, streamed from Discord after the cursor."""
+    async def pages(role, adding):
+        bot_top_role_key = _top_role_key(guild.me)
+        cursor = job["cursor"]
+        while True:
+            # fetch_members yields each API page newest-first, so sort it before checkpointing inside it
+            page = [member async for member in guild.fetch_members(limit=MASS_JOB_FETCH_SIZE, after=discord.Object(id=cursor))]
+            page.sort(key=lambda member: member.id)
+            for start in range(0, len(page), MASS_JOB_PAGE_SIZE):
+                chunk = page[start:start + MASS_JOB_PAGE_SIZE]
+                yield [member for member in chunk if _needs_role_change(member, role, adding, bot_top_role_key)], chunk[-1].id, len(chunk)
+            if len(page) < MASS_JOB_FETCH_SIZE:
+                return
+            cursor = page[-1].id
+
+    return _role_change_plan(guild, job, pages)
+
+@_mass_job_kind("role_list")
+async def _prepare_role_list(guild, job):
+    """Role change for an explicit list of members (sorted IDs), resolved a page at a time."""
+    async def pages(role, adding):
+        bot_top_role_key = _top_role_key(guild.me)
+        remaining = [member_id for member_id in job["params"]["member_ids"] if member_id > job["cursor"]]
+        for start in range(0, len(remaining), MASS_JOB_PAGE_SIZE):
+            ids = remaining[start:start + MASS_JOB_PAGE_SIZE]
+            members = await resolve_members(guild, ids) # Members who left are simply missing
+            yield [member for member in members.values() if _needs_role_change(member, role, adding, bot_top_role_key)], ids[-1], len(ids)
+
+    return _role_change_plan(guild, job, pages)
+
+# Purges stream the channel's history backwards from the cursor (the oldest message scanned so
+# far) until they have `amount` matches or have scanned `scan_cap` messages. Matches younger than
+# 14 days are bulk-deleted 100 at a time; Discord refuses to bulk-delete anything older, so at
+# that boundary a purge hands the rest of its quota to a purge_old job that deletes matches one
+# by one, paced by the single-delete bucket. Only the current batch is ever held in memory.
+
+PURGE_MAX_AMOUNT = 10000 # Matching messages a single purge may delete
+PURGE_SCAN_CAP = int(os.environ.get("PURGE_SCAN_CAP", 20000)) # Messages a purge scans before giving up
+PURGE_OLD_MAX_CONCURRENCY = 2 # Single deletes have a small bucket per channel
+BULK_DELETE_CHUNK = 100 # Discord's maximum messages per bulk delete
+BULK_DELETE_MAX_AGE = datetime.timedelta(days=14, hours=-1) # Discord's limit, with a margin for slow runs
+
+class _MessageBatch(_MassJobBatch):
+    """Messages deleted with one bulk request, newest first."""
+    noun = "messages, newest"
+
+def _purge_filter(params):
+    """Compiles a purge job's filter expression, plus its member, into a PurgeFilter."""
+    expression = params.get("filter", "")
+    if params.get("member_id"):
+        expression = f"from:{params['member_id']} {expression}"
+    return compile_purge_filter(expression)
+
+def _purge_done(job, scanned=0, matched=0):
+    """True once a purge has its quota of matches or has used up its scan budget."""
+    params = job["params"]
+    return (job["succeeded"] + job["failed"] + matched >= params["amount"]
+            or job["scanned"] + scanned >= params["scan_cap"])
+
+async def _scan_purge_history(channel, job, purge_filter, batch_size, newer_than=None, scan_state=None):
+    """
+    Streams history before the job's cursor and yields (matches, cursor, scanned) every
+    `batch_size` matches or MASS_JOB_FETCH_SIZE scanned messages, until the purge is done or
+    the scan passes the filter's after: bound. With `newer_than`, stops at the first older
+    message and sets scan_state["reached_cutoff"].
+    """
+    if _purge_done(job):
+        return
+    batch, scanned, cursor = [], 0, job["cursor"]
+    start = job["cursor"] or job["params"]["before_id"]
+    if purge_filter.before is not None:
+        start = min(start, purge_filter.before)
+    async for message in channel.history(limit=None, before=discord.Object(id=start)):
+        if purge_filter.after is not None and message.id <= purge_filter.after:
+            break
+        if newer_than is not None and message.created_at <= newer_than:
+            scan_state["reached_cutoff"] = True
+            break
+        scanned += 1
+        cursor = message.id
+        if purge_filter.matches(message):
+            batch.append(message)
+        if _purge_done(job, scanned, len(batch)):
+            yield batch, cursor, scanned
+            return
+        if len(batch) >= batch_size or scanned >= MASS_JOB_FETCH_SIZE:
+            yield batch, cursor, scanned
+            batch, scanned = [], 0
+    if scanned:
+        yield batch, cursor, scanned
+
+async def _hand_off_old_purge(guild, channel, job):
+    """Starts a purge_old job for the rest of a purge's quota, from where the purge stopped."""
+    params = job["params"]
+    remaining = params["amount"] - job["succeeded"] - job["failed"]
+    status_message = await channel.send(f"Matching messages older than 14 days can't be bulk-deleted; deleting up to {remaining} of them one at a time in the background...")
+    old_params = dict(params, amount=remaining, scan_cap=params["scan_cap"] - job["scanned"],
+                      description=f"{params['description']} (older than 14 days)")
+    job["handoff"] = _create_mass_job("purge_old", guild.id, channel.id, job["author_id"], status_message.id,
+                                      old_params, cursor=job["cursor"] or params["before_id"])
+    _schedule_save(save_mass_jobs)
+    await _edit_status(status_message, f"Matching messages older than 14 days can't be bulk-deleted; deleting up to {remaining} of them one at a time in the background (job `{job['handoff']}`)...")
+
+@_mass_job_kind("purge")
+async def _prepare_purge(guild, job):
+    """Bulk-deletes matching messages younger than 14 days, then hands older matches to a purge_old job."""
+    channel = guild.get_channel_or_thread(job["channel_id"])
+    if channel is None:
+        return None
+    params = job["params"]
+    purge_filter = _purge_filter(params)
+    reason = f"Purge by {params.get('author_name', 'a moderator')}"
+
+    async def pages():
+        scan_state = {}
+        newer_than = discord.utils.utcnow() - BULK_DELETE_MAX_AGE
+        async for batch, cursor, scanned in _scan_purge_history(channel, job, purge_filter, BULK_DELETE_CHUNK, newer_than, scan_state):
+            yield ([_MessageBatch(batch)] if batch else []), cursor, scanned
+        if scan_state.get("reached_cutoff") and not job.get("handoff") and not _purge_done(job):
+            await _hand_off_old_purge(guild, channel, job)
+
+    async def delete(batch):
+        await channel.delete_messages(batch, reason=reason)
+
+    return _MassJobPlan(
+        label=params["description"],
+        pages=pages(),
+        operation=delete,
+        route=RateLimitObserver.route_key("POST", f"/channels/{channel.id}/messages/bulk-delete"),
+        log_action="Purge Messages",
+        log_target=channel,
+        size=len,
+        unit="message",
+    )
+
+@_mass_job_kind("purge_old")
+async def _prepare_purge_old(guild, job):
+    """Deletes matching messages one request at a time, for matches too old to bulk-delete."""
+    channel = guild.get_channel_or_thread(job["channel_id"])
+    if channel is None:
+        return None
+    params = job["params"]
+    purge_filter = _purge_filter(params)
+
+    async def pages():
+        async for batch, cursor, scanned in _scan_purge_history(channel, job, purge_filter, MASS_JOB_PAGE_SIZE):
+            yield batch, cursor, scanned
+
+    async def delete(message):
+        await message.delete()
+
+    return _MassJobPlan(
+        label=params["description"],
+        pages=pages(),
+        operation=delete,
+        route=RateLimitObserver.route_key("DELETE", f"/channels/{channel.id}/messages/0"),
+        log_action="Purge Messages",
+        log_target=channel,
+        unit="message",
+        max_concurrency=PURGE_OLD_MAX_CONCURRENCY,
+    )
+
+# Ban imports read their (sorted, deduplicated) user IDs from a file in MASS_JOB_INPUTS_DIR, one
+# bulk-ban request of up to 200 users per page, with a pause between pages so a restore doesn't
+# flood the server with ban events. Users banned in the meantime (per the ban index) are skipped,
+# and members of the server get the usual hierarchy checks against the moderator who started it.
+
+BAN_IMPORT_MAX_IDS = 100000 # User IDs a single import may contain
+BAN_IMPORT_MAX_FILE_BYTES = 8 * 1024 * 1024 # Import files larger than this are refused
+BAN_IMPORT_PACE = 2.0 # Seconds between bulk-ban requests
+
+def _write_mass_job_input(user_ids):
+    """Writes sorted IDs to a new input file, one per line, and returns its path."""
+    os.makedirs(MASS_JOB_INPUTS_DIR, exist_ok=True)
+    path = os.path.join(MASS_JOB_INPUTS_DIR, f"{uuid.uuid4().hex[:8]}.txt")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.writelines(f"{user_id}\n" for user_id in sorted(user_ids))
+    return path
+
+def _read_mass_job_input(path, after, size):
+    """Yields lists of up to `size` IDs from an input file, skipping those up to `after`."""
+    chunk = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            user_id = int(line)
+            if user_id <= after:
+                continue
+            chunk.append(user_id)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+@_mass_job_kind("ban_import")
+async def _prepare_ban_import(guild, job):
+    """Bans every user in the job's input file through the bulk-ban endpoint."""
+    params = job["params"]
+    author = await resolve_member(guild, job["author_id"])
+    if author is None or not os.path.exists(params["input_file"]):
+        return None # The moderator left, so their hierarchy can't be checked any more
+    reason = f"Ban import by {author.name}: {params.get('reason', 'No reason provided')}"
+
+    async def pages():
+        for ids in _read_mass_job_input(params["input_file"], job["cursor"], BULK_BAN_CHUNK):
+            index = ban_indexes.get(guild.id)
+            pending = [user_id for user_id in ids if index is None or user_id not in index]
+            members = await resolve_members(guild, pending) if pending else {}
+            allowed, skipped = _partition_targets(guild, author, [members.get(user_id) or discord.Object(id=user_id) for user_id in pending], "ban")
+            batch = _MassJobBatch(allowed + [target for target, _ in skipped])
+            batch.failures.extend(skipped) # Counted and reported as failures without being sent
+            yield ([batch] if batch else []), ids[-1], len(ids)
+            if allowed:
+                await asyncio.sleep(BAN_IMPORT_PACE)
+
+    async def ban_batch(batch):
+        targets = batch[:len(batch) - len(batch.failures)] # The skipped targets are at the end
+        if not targets:
+            return
+        result = await guild.bulk_ban(targets, reason=reason, delete_message_seconds=0)
+        banned_ids = {user.id for user in result.banned}
+        batch.failures.extend((target, "Not banned by Discord (already banned, or not bannable)")
+                              for target in targets if target.id not in banned_ids)
+
+    return _MassJobPlan(
+        label=f"Importing {params['total']} ban(s)",
+        pages=pages(),
+        operation=ban_batch,
+        route=RateLimitObserver.route_key("POST", f"/guilds/{guild.id}/bulk-ban"),
+        log_action="Ban Import",
+        log_target=f"{params['total']} user(s) from {params.get('source', 'an imported list')}",
+        size=len,
+        unit="user",
+        max_concurrency=1,
+    )
 
 # --- Bot Events ---
 
+@bot.event
+async def setup_hook():
+    """
+    Called once after login, before connecting to the gateway.
+    Starts the web server on the bot's event loop for health checks and /metrics.
+    """
+    await start_web_server()
+
 @bot.event
 async def on_ready():
     """
     Called when the bot is ready and connected to Discord.
-    Loads persistent data (prefixes, warnings, mod log channels, AFK status, AutoMod settings).
-    Starts the background task for changing bot status.
+    Loads persistent data (prefixes, warnings, mod log channels, AFK status, AutoMod settings, auto-responders, scheduled jobs, mass jobs).
+    Starts the background tasks (status, deferred saves, loop lag sampling, job scheduler, expiries, mod-log and DM delivery) and resumes mass jobs.
     """
     print(f'Logged in as {bot.user.name} ({bot.user.id})')
     print('------')
+    flush_dirty_stores_now() # on_ready also fires after reconnects; don't reload over unsaved changes
     load_prefixes()
     load_warnings()
     load_mod_log_channels()
     load_afk_status() # Load AFK status on startup
     load_automod_settings() # Load AutoMod settings on startup
-    change_status.start() # Start the background task
+    load_autoresponders() # Load auto-responder triggers on startup
+    load_scheduled_jobs() # Load pending reminders/unmutes; overdue ones fire right away
+    if not _mass_job_tasks:
+        load_mass_jobs() # Reloading under running jobs would detach them from their records
+    resume_mass_jobs() # Continue mass operations from their last checkpoint
+    if not change_status.is_running():
+        change_status.start() # Start the background task
+    if not flush_dirty_stores.is_running():
+        flush_dirty_stores.start() # Start writing deferred saves
+    if not sample_loop_lag.is_running():
+        sample_loop_lag.start() # Start measuring event loop lag
+    if not run_scheduled_jobs.is_running():
+        run_scheduled_jobs.start() # Start firing scheduled jobs
+    if not process_expiries.is_running():
+        process_expiries.start() # Start applying temporary ban/role expiries
+    if not deliver_mod_logs.is_running():
+        deliver_mod_logs.start() # Start sending buffered mod-log entries
+    if not deliver_dms.is_running():
+        deliver_dms.start() # Start sending queued DM notifications
+    if LAZY_MEMBER_CACHE and MEMBER_CACHE_ROLE_IDS and not refresh_pinned_members.is_running():
+        refresh_pinned_members.start() # Keep members with pinned roles cached
     print('Bot is ready!')
 
+@bot.before_invoke
+async def _start_command_timer(ctx):
+    """Marks when a command's callback starts, after checks, cooldowns and argument parsing."""
+    ctx.invoke_started = time.perf_counter()
+
+@bot.after_invoke
+async def _record_command_metrics(ctx):
+    """Records the callback's latency and outcome for /metrics."""
+    command_name = ctx.command.qualified_name
+    _observe(command_latency, command_name, time.perf_counter() - ctx.invoke_started)
+    command_invocations[(command_name, "failure" if ctx.command_failed else "success")] += 1
+
+@bot.event
+async def on_connect():
+    """Marks the gateway as connected for the health checks."""
+    _set_gateway_connected(True)
+
+@bot.event
+async def on_resumed():
+    """A resumed session is connected again."""
+    _set_gateway_connected(True)
+
+@bot.event
+async def on_disconnect():
+    """Marks the gateway as disconnected; liveness fails if it stays down too long."""
+    _set_gateway_connected(False)
+
 @bot.event
 async def on_command_error(ctx, error):
     """
@@ -410,6 +2632,13 @@ async def on_command_error(ctx, error):
     Catches common errors like missing permissions (both user and bot),
     missing arguments, and invalid arguments, and command cooldowns.
     """
+    command_name = ctx.command.qualified_name if ctx.command else "unknown"
+    if isinstance(error, commands.CommandOnCooldown):
+        command_cooldown_rejections[command_name] += 1
+    elif not isinstance(error, commands.CommandNotFound):
+        original = getattr(error, 'original', error) # Unwrap CommandInvokeError
+        command_errors[(command_name, type(original).__name__)] += 1
+
     # Check if the error is already handled by a local command error handler
     if hasattr(ctx.command, 'on_error'):
         return
@@ -471,92 +2700,325 @@ async def on_message(message):
 
     # Check if automod should ignore this channel or user's roles
     if message.guild: # AutoMod only applies in guilds
-        # Exclude administrators from AutoMod checks
-        if message.author.guild_permissions.administrator:
-            await bot.process_commands(message)
+        _remember_member(message.author) # Keeps active members cached in lazy mode
+        message_cache.add(message)
+        # Exclude administrators, members with ignored roles and ignored channels from AutoMod checks
+        with _PhaseTimer("on_message", "exemption"):
+            exempt = _is_automod_exempt(message.author) or message.channel.id in automod_settings["automod_ignored_channels"]
+        if exempt:
+            # Auto-responders have their own settings and still fire for exempt members and channels
+            if message.guild.id in autoresponders:
+                with _PhaseTimer("on_message", "replies"):
+                    await _handle_autoresponse(message)
+            with _PhaseTimer("on_message", "dispatch"):
+                await bot.process_commands(message) # Still process commands for exempt members and channels
             return
 
-        if message.channel.id in automod_settings["automod_ignored_channels"]:
-            await bot.process_commands(message) # Still process commands in ignored channels
-            return
-        for role in message.author.roles:
-            if role.id in automod_settings["automod_ignored_roles"]:
-                await bot.process_commands(message) # Still process commands for ignored roles
-                return
-
         # --- AutoMod Checks ---
-        if automod_settings["anti_invite_enabled"] and _is_discord_invite(message.content):
-            try:
-                await message.delete()
-                await message.channel.send(f"{message.author.mention}, Discord invite links are not allowed here!", delete_after=5)
-                await _perform_warn(message.guild, message.channel, message.author, bot.user, reason="Posted Discord invite link (AutoMod)")
-            except discord.Forbidden:
-                await message.channel.send(f"AutoMod: I lack permissions to delete messages or warn {message.author.mention}. Please grant 'Manage Messages' and 'Kick Members' permissions.", delete_after=10)
-            return # Stop further processing
-
-        if automod_settings["anti_link_enabled"] and _contains_link(message.content):
-            try:
-                await message.delete()
-                await message.channel.send(f"{message.author.mention}, external links are not allowed here!", delete_after=5)
-                await _perform_warn(message.guild, message.channel, message.author, bot.user, reason="Posted external link (AutoMod)")
-            except discord.Forbidden:
-                await message.channel.send(f"AutoMod: I lack permissions to delete messages or warn {message.author.mention}. Please grant 'Manage Messages' and 'Kick Members' permissions.", delete_after=10)
-            return # Stop further processing
-
-        if automod_settings["anti_profanity_enabled"] and _contains_profanity(message.content):
-            try:
-                await message.delete()
-                await message.channel.send(f"{message.author.mention}, please watch your language!", delete_after=5)
-                await _perform_warn(message.guild, message.channel, message.author, bot.user, reason="Used profanity (AutoMod)")
-            except discord.Forbidden:
-                await message.channel.send(f"AutoMod: I lack permissions to delete messages or warn {message.author.mention}. Please grant 'Manage Messages' and 'Kick Members' permissions.", delete_after=10)
-            return # Stop further processing
-
-    # --- Bot Mention Reply ---
-    # Check if the bot is mentioned and it's not a reply to the bot's own message
-    if bot.user.mentioned_in(message) and (not message.reference or message.reference.resolved.author != bot.user):
-        current_prefix = await bot.command_prefix(bot, message)
-        embed = discord.Embed(
-            description=f"My prefix here is `{current_prefix}`. Use `{current_prefix}help` to see all commands!",
-            color=discord.Color.blue()
-        )
-        await message.reply(embed=embed, mention_author=False)
-        # Do not return here, allow other on_message logic and command processing to continue
-
-    # --- AFK Status Handling ---
-    # Check if the author is AFK and remove their status
-    if message.author.id in afk_status:
-        del afk_status[message.author.id]
-        save_afk_status()
-        await message.channel.send(f"Welcome back {message.author.mention}! I've removed your AFK status.")
-        
-        # Check for any pending mentions (simplified for now)
-        # In a more advanced system, you might DM the AFK user a summary of mentions.
-
-    # Check for mentions of AFK users
-    for member in message.mentions:
-        if member.id in afk_status:
-            afk_info = afk_status[member.id]
-            afk_message = afk_info.get("message", "No AFK message provided.")
-            afk_time_str = afk_info.get("time", "unknown time")
-
-            # Create an embed for the AFK reply
+        with _PhaseTimer("on_message", "automod"):
+            if await _run_automod(message):
+                return # Stop further processing
+
+    with _PhaseTimer("on_message", "replies"):
+        # --- Bot Mention Reply ---
+        # Check if the bot is mentioned and it's not a reply to the bot's own message
+        # Messages that use the mention as a command prefix are left to command processing.
+        prefix_matcher = _get_prefix_matcher(message.guild.id if message.guild else None)
+        if bot.user.mentioned_in(message) and not message.content.startswith(prefix_matcher.mention_prefixes) and (not message.reference or message.reference.resolved.author != bot.user):
+            current_prefix = prefix_matcher.primary
             embed = discord.Embed(
-                title=f"💤 {member.display_name} is AFK!",
-                description=f"**Reason:** {afk_message}\n**Since:** {afk_time_str}",
-                color=discord.Color.from_rgb(173, 216, 230), # Light blue color
-                timestamp=datetime.datetime.now(datetime.timezone.utc)
+                description=f"My prefix here is {prefix_matcher.display()}. Use `{current_prefix}help` to see all commands!",
+                color=discord.Color.blue()
             )
-            embed.set_footer(text=f"Mentioned by {message.author.display_name}")
-            
-            await message.channel.send(embed=embed)
-            # Optionally, you could store who mentioned the AFK user
-            # if afk_info.get("mentions") is None:
-            #     afk_info["mentions"] = []
-            # afk_info["mentions"].append(message.author.id)
-            # save_afk_status() # Save the updated mentions
+            await message.reply(embed=embed, mention_author=False)
+            # Do not return here, allow other on_message logic and command processing to continue
+
+        # --- Auto-Responder ---
+        if message.guild and message.guild.id in autoresponders:
+            await _handle_autoresponse(message)
+
+    with _PhaseTimer("on_message", "afk"):
+        # --- AFK Status Handling ---
+        # Check if the author is AFK and remove their status
+        if message.author.id in afk_status:
+            del afk_status[message.author.id]
+            _schedule_save(save_afk_status) # Written by the flush loop, not on the message path
+            digest = _afk_mention_digests.pop(message.author.id, None)
+            if digest and digest[1]:
+                await message.channel.send(f"Welcome back {message.author.mention}! I've removed your AFK status. You were mentioned {digest[1]} time(s) while away.")
+                # Deliver the summary in the background so this message isn't held up by a DM round-trip
+                _start_background_job(_deliver_afk_digest(message.author, message.channel, digest))
+            else:
+                await message.channel.send(f"Welcome back {message.author.mention}! I've removed your AFK status.")
+
+        # Check for mentions of AFK users
+        # Fast path: skip the scan entirely when nobody is AFK or nobody was mentioned.
+        if afk_status and message.mentions:
+            now = asyncio.get_running_loop().time()
+            for member in message.mentions:
+                if member.id in afk_status and member.id != message.author.id:
+                    _record_afk_mention(member.id, message)
+            afk_mentioned = [
+                member for member in message.mentions
+                if member.id in afk_status
+                # Suppress repeat notices for the same AFK user in this channel within the cooldown
+                and not _afk_notice_throttle.check_and_set((message.channel.id, member.id), now)
+            ]
+
+            if afk_mentioned:
+                # One embed per message, however many AFK members were mentioned
+                if len(afk_mentioned) == 1:
+                    member = afk_mentioned[0]
+                    afk_info = afk_status[member.id]
+                    embed = discord.Embed(
+                        title=f"💤 {member.display_name} is AFK!",
+                        description=f"**Reason:** {_clip(afk_info.get('message', 'No AFK message provided.'), 3900)}\n**Since:** {afk_info.get('time', 'unknown time')}",
+                        color=discord.Color.from_rgb(173, 216, 230), # Light blue color
+                        timestamp=datetime.datetime.now(datetime.timezone.utc)
+                    )
+                else:
+                    embed = discord.Embed(
+                        title=f"💤 {len(afk_mentioned)} of the members you mentioned are AFK!",
+                        color=discord.Color.from_rgb(173, 216, 230), # Light blue color
+                        timestamp=datetime.datetime.now(datetime.timezone.utc)
+                    )
+                    shown = 0
+                    for member in afk_mentioned[:25]: # Embeds hold at most 25 fields
+                        afk_info = afk_status[member.id]
+                        reason = _clip(afk_info.get('message', 'No AFK message provided.'), AFK_NOTICE_REASON_MAX)
+                        value = f"**Reason:** {reason}\n**Since:** {afk_info.get('time', 'unknown time')}"
+                        if len(embed) + len(member.display_name) + len(value) > AFK_NOTICE_EMBED_MAX:
+                            break
+                        embed.add_field(name=member.display_name, value=value, inline=False)
+                        shown += 1
+                    if shown < len(afk_mentioned):
+                        embed.description = f"...and {len(afk_mentioned) - shown} more."
+                embed.set_footer(text=f"Mentioned by {message.author.display_name}")
+
+                await message.channel.send(embed=embed)
+
+    with _PhaseTimer("on_message", "dispatch"):
+        await bot.process_commands(message) # Important: Process commands after AFK checks
+
+# --- Message Cache Events ---
+
+@bot.event
+async def on_raw_message_edit(payload):
+    """Replaces the cached copy of an edited guild message. Messages that aren't cached are left out."""
+    if payload.guild_id is not None and message_cache.get(payload.channel_id, payload.message_id) is not None:
+        message_cache.add(payload.message)
 
-    await bot.process_commands(message) # Important: Process commands after AFK checks
+@bot.event
+async def on_raw_message_delete(payload):
+    """Drops deleted messages from the message cache."""
+    message_cache.remove(payload.channel_id, payload.message_id)
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    """Drops everything cached for a deleted channel."""
+    message_cache.remove_channel(channel.id)
+
+@bot.event
+async def on_raw_bulk_message_delete(payload):
+    """Drops bulk-deleted messages from the message cache."""
+    for message_id in payload.message_ids:
+        message_cache.remove(payload.channel_id, message_id)
+
+# --- Permission Cache Invalidation Events ---
+
+@bot.event
+async def on_member_update(before, after):
+    """Drops a member's cached permissions when their roles or timeout change."""
+    if before.roles != after.roles or before.timed_out_until != after.timed_out_until:
+        _invalidate_member_perms(after.guild.id, after.id)
+
+@bot.event
+async def on_raw_member_remove(payload):
+    """
+    Forgets cached permissions and lazily cached members for members who leave.
+    The raw event also fires for members that aren't in discord.py's cache.
+    """
+    _invalidate_member_perms(payload.guild_id, payload.user.id)
+    member_cache.forget(payload.guild_id, payload.user.id)
+
+@bot.event
+async def on_guild_role_create(role):
+    """A new role shifts the positions of the roles above it."""
+    _invalidate_guild_perms(role.guild.id)
+
+@bot.event
+async def on_guild_role_update(before, after):
+    """Role permission or position changes affect every member holding the role."""
+    if before.permissions != after.permissions or before.position != after.position:
+        _invalidate_guild_perms(after.guild.id)
+
+@bot.event
+async def on_guild_role_delete(role):
+    """Members lose the deleted role, so their top role and permissions may change."""
+    _invalidate_guild_perms(role.guild.id)
+
+@bot.event
+async def on_guild_channel_update(before, after):
+    """Overwrite changes are treated conservatively and reset the guild's cached entries."""
+    if before.overwrites != after.overwrites:
+        _invalidate_guild_perms(after.guild.id)
+
+@bot.event
+async def on_guild_update(before, after):
+    """A new owner implicitly gains every permission."""
+    if before.owner_id != after.owner_id:
+        _invalidate_guild_perms(after.id)
+
+@bot.event
+async def on_guild_remove(guild):
+    """Drops all cached entries for a guild the bot left."""
+    _invalidate_guild_perms(guild.id)
+    member_cache.forget_guild(guild.id)
+    _guild_warning_index.pop(guild.id, None)
+    ban_indexes.pop(guild.id, None)
+    for channel in guild.channels:
+        message_cache.remove_channel(channel.id)
+
+@bot.event
+async def on_member_ban(guild, user):
+    """Keeps the guild's ban index current, if it has been built."""
+    index = ban_indexes.get(guild.id)
+    if index is not None:
+        _index_ban(index, user)
+
+@bot.event
+async def on_member_unban(guild, user):
+    """Keeps the guild's ban index current, if it has been built."""
+    index = ban_indexes.get(guild.id)
+    if index is not None:
+        index.discard(user.id)
+
+# --- Background Task for Deferred Saves ---
+@tasks.loop(seconds=STORE_FLUSH_INTERVAL)
+async def flush_dirty_stores():
+    """Periodically writes stores that were marked dirty on hot paths."""
+    if _dirty_stores:
+        flush_dirty_stores_now()
+
+# --- Background Task for Scheduled Jobs ---
+@tasks.loop(seconds=0) # Each iteration waits for the next tick itself
+async def run_scheduled_jobs():
+    """Ticks the job wheel while jobs are pending (idles otherwise) and fires due jobs in batches."""
+    _job_wakeup.clear()
+    if not _due_job_ids:
+        _due_job_ids.extend(_job_wheel.advance(time.time()))
+    if not _due_job_ids:
+        if not _job_wheel:
+            await _job_wakeup.wait()
+            return
+        try:
+            await asyncio.wait_for(_job_wakeup.wait(), timeout=max(0.0, _job_wheel.next_tick_at() - time.time()))
+        except asyncio.TimeoutError:
+            pass
+        return
+
+    batch = _pop_due_jobs(JOB_BATCH_SIZE)
+    if batch:
+        _schedule_save(save_scheduled_jobs)
+        await asyncio.gather(*(_run_job(job_id, job) for job_id, job in batch))
+    if _due_job_ids:
+        await asyncio.sleep(JOB_BATCH_PAUSE) # More are overdue; pace the backlog
+
+# --- Background Task for Timed Moderation Expiries ---
+@tasks.loop(seconds=0) # Each iteration waits for work itself
+async def process_expiries():
+    """Works off queued ban/role expiries in paced batches, adapting the pace to how Discord responds."""
+    global _expiry_interval
+    if not _expiry_backlog:
+        _expiry_wakeup.clear()
+        await _expiry_wakeup.wait()
+        return
+
+    batch = list(itertools.islice(_expiry_backlog.items(), EXPIRY_BATCH_SIZE))
+    completed = {} # (guild_id, kind) -> (guild, summary lines)
+    for key, pending in batch:
+        guild_id, kind, user_id = key
+        jobs = {job_id: scheduled_jobs.get(job_id) for job_id in pending}
+        # Jobs cancelled (e.g. unbanned by hand) or rescheduled for later since they fired are skipped
+        role_ids = {pending[job_id] for job_id, job in jobs.items() if job is not None and job["due"] <= time.time()}
+        guild = bot.get_guild(guild_id)
+        if guild is None or not role_ids: # The bot left the guild, or nothing is left to expire
+            _settle_expiries(key, jobs)
+            continue
+        started = time.monotonic()
+        retry = False
+        try:
+            line = await _apply_expiry(guild, kind, user_id, role_ids)
+            if line:
+                completed.setdefault((guild_id, kind), (guild, []))[1].append(line)
+        except discord.HTTPException as e: # Includes Forbidden
+            print(f"DEBUG: Failed to apply {kind} expiry for {user_id} in guild {guild.name}: {e}")
+            if e.status == 429:
+                _expiry_interval = EXPIRY_MAX_INTERVAL
+            retry = e.status == 429 or e.status >= 500 # Worth another try; permission errors aren't
+        except Exception as e:
+            print(f"DEBUG: Unexpected error applying {kind} expiry for {user_id} in guild {guild.name}: {e}")
+        if retry:
+            if key in _expiry_backlog:
+                _expiry_backlog.move_to_end(key)
+        else:
+            _settle_expiries(key, jobs)
+        if time.monotonic() - started >= EXPIRY_SLOW_CALL:
+            _expiry_interval = min(EXPIRY_MAX_INTERVAL, _expiry_interval * 2) # Waited on a bucket; slow down
+        else:
+            _expiry_interval = max(EXPIRY_MIN_INTERVAL, _expiry_interval * 0.8)
+        await asyncio.sleep(_expiry_interval)
+
+    for (_, kind), (guild, lines) in completed.items():
+        await _log_expiry_summary(guild, kind, lines)
+
+# --- Background Task for Mod Log Delivery ---
+@tasks.loop(seconds=0) # Each iteration waits for log entries itself
+async def deliver_mod_logs():
+    """Sends buffered mod-log embeds: immediately once a message is full, otherwise after a short delay."""
+    if not _mod_log_buffers:
+        _mod_log_wakeup.clear()
+        await _mod_log_wakeup.wait()
+    if not any(len(buffer) >= MOD_LOG_BATCH_SIZE for buffer in _mod_log_buffers.values()):
+        _mod_log_full.clear()
+        try:
+            await asyncio.wait_for(_mod_log_full.wait(), timeout=MOD_LOG_FLUSH_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+    # Each guild logs to its own channel (its own rate limit bucket), so flush them side by side
+    await asyncio.gather(*(_flush_mod_log(guild_id) for guild_id in list(_mod_log_buffers)))
+
+# --- Background Task for DM Delivery ---
+@tasks.loop(seconds=0) # Each iteration waits for a queued DM itself
+async def deliver_dms():
+    """Starts queued DMs at a globally paced rate, at most DM_CONCURRENCY at a time."""
+    global _dm_next_send_at
+    user, message, attempt = await _dm_queue.get()
+    await _dm_slots.acquire()
+    delay = _dm_next_send_at - time.monotonic()
+    if delay > 0:
+        await asyncio.sleep(delay)
+    _dm_next_send_at = time.monotonic() + DM_MIN_INTERVAL
+    _start_background_job(_deliver_dm(user, message, attempt))
+
+# --- Background Task for Pinned Member Refresh ---
+@tasks.loop(seconds=MEMBER_CACHE_ROLE_RESCAN)
+async def refresh_pinned_members():
+    """Lazy mode: periodically rescans each guild for members holding the pinned roles."""
+    for guild in list(bot.guilds):
+        try:
+            await _refresh_pinned_members(guild)
+        except discord.HTTPException as e:
+            print(f"DEBUG: Could not refresh pinned members in guild {guild.name}: {e}")
+
+# --- Background Task for Loop Lag Sampling ---
+@tasks.loop(seconds=0) # Each iteration sleeps for the sample interval itself
+async def sample_loop_lag():
+    """Records how much later than requested the event loop woke up from a short sleep."""
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    await asyncio.sleep(LOOP_LAG_SAMPLE_INTERVAL)
+    loop_lag_samples.append(max(0.0, loop.time() - start - LOOP_LAG_SAMPLE_INTERVAL))
 
 # --- Background Task for Status ---
 @tasks.loop(minutes=10) # Change status every 10 minutes
@@ -578,15 +3040,22 @@ async def ping(ctx):
     """
     try:
         # Get the current prefix for the guild
-        current_prefix = await bot.command_prefix(bot, ctx.message)
-        
+        prefix_matcher = _get_prefix_matcher(ctx.guild.id if ctx.guild else None)
+        current_prefix = prefix_matcher.primary
+
         embed = discord.Embed(
             title="🏓 Pong!",
             description=f"Latency: **{round(bot.latency * 1000)}ms**",
             color=discord.Color.blue(),
             timestamp=datetime.datetime.now(datetime.timezone.utc)
         )
-        embed.add_field(name="Current Prefix", value=f"`{current_prefix}`", inline=False)
+        latest_lag, _, worst_lag = _loop_lag_summary()
+        embed.add_field(
+            name="Event Loop Lag",
+            value=f"**{latest_lag * 1000:.0f}ms** (worst {worst_lag * 1000:.0f}ms over the last {len(loop_lag_samples)} samples)",
+            inline=False
+        )
+        embed.add_field(name="Current Prefix", value=prefix_matcher.display(), inline=False)
         embed.set_footer(text=f"Use {current_prefix}help for a list of commands.")
         
         await ctx.send(embed=embed)
@@ -594,6 +3063,77 @@ async def ping(ctx):
         await ctx.send(f"An error occurred while checking ping: `{e}`")
         print(f"DEBUG: Error in {ctx.prefix}ping command: {e}")
 
+@bot.command(name='cachestats', hidden=True, help='Shows internal cache hit rates. Usage: {prefix}cachestats')
+@commands.is_owner()
+async def cache_stats(ctx):
+    """
+    Owner-only diagnostics for the bot's internal caches.
+    """
+    lookups = perm_cache_stats["hits"] + perm_cache_stats["misses"]
+    hit_rate = (perm_cache_stats["hits"] / lookups * 100) if lookups else 0.0
+    cached_members = sum(len(c) for c in _member_perm_cache.values())
+
+    embed = discord.Embed(
+        title="🧮 Cache Statistics",
+        color=discord.Color.blue(),
+        timestamp=datetime.datetime.now(datetime.timezone.utc)
+    )
+    embed.add_field(
+        name="Member Permissions",
+        value=(
+            f"Hit rate: **{hit_rate:.1f}%** ({perm_cache_stats['hits']} hits / {perm_cache_stats['misses']} misses)\n"
+            f"Entries: {cached_members} across {len(_member_perm_cache)} guild(s)\n"
+            f"Invalidations: {perm_cache_stats['invalidations']} / Evictions: {perm_cache_stats['evictions']}"
+        ),
+        inline=False
+    )
+    messages = message_cache.stats()
+    embed.add_field(
+        name="Messages",
+        value=(
+            f"Hit rate: **{messages['hit_rate'] * 100:.1f}%** ({messages['hits']} hits / {messages['misses']} misses)\n"
+            f"Memory: {messages['bytes'] / 1048576:.1f}MB of {messages['budget_bytes'] / 1048576:.1f}MB budget\n"
+            f"Entries: {messages['messages']} across {messages['channels']} channel(s)\n"
+            f"Evictions: {messages['evictions']}"
+        ),
+        inline=False
+    )
+    await ctx.send(embed=embed)
+
+@bot.command(name='looplag', hidden=True, help='Shows event loop lag and recent slow handler steps. Usage: {prefix}looplag')
+@commands.is_owner()
+async def loop_lag(ctx):
+    """
+    Owner-only view of the loop lag sampler and the slow step log.
+    """
+    latest_lag, average_lag, worst_lag = _loop_lag_summary()
+    embed = discord.Embed(
+        title="⏱️ Event Loop Health",
+        color=discord.Color.red() if worst_lag >= SLOW_STEP_THRESHOLD else discord.Color.blue(),
+        timestamp=datetime.datetime.now(datetime.timezone.utc)
+    )
+    embed.add_field(
+        name="Loop Lag",
+        value=(
+            f"Latest: **{latest_lag * 1000:.1f}ms**\n"
+            f"Average: {average_lag * 1000:.1f}ms / Worst: {worst_lag * 1000:.1f}ms\n"
+            f"Window: {len(loop_lag_samples)} samples every {LOOP_LAG_SAMPLE_INTERVAL}s"
+        ),
+        inline=False
+    )
+    if slow_step_log:
+        lines = [
+            f"<t:{int(ts)}:R> `{name}` blocked for **{elapsed * 1000:.0f}ms**"
+            for ts, name, elapsed in reversed(list(slow_step_log)[-10:])
+        ]
+        slow_steps_text = "\n".join(lines)
+    else:
+        slow_steps_text = f"No steps over {SLOW_STEP_THRESHOLD * 1000:.0f}ms recorded."
+    if not SLOW_STEP_TRACING:
+        slow_steps_text += "\nHandlers aren't traced; set SLOW_STEP_TRACING=1 to record their slow steps."
+    embed.add_field(name=f"Slow Steps ({len(slow_step_log)} recorded)", value=slow_steps_text, inline=False)
+    await ctx.send(embed=embed)
+
 # --- Custom Help Command with Buttons ---
 class HelpView(discord.ui.View):
     def __init__(self, bot_instance, categories):
@@ -696,12 +3236,13 @@ COMMAND_CATEGORIES = {
     "Moderation": [
         "kick", "ban", "unban", "mute", "unmute", "purge", "warn",
         "warnings", "unwarn", "clearwarnings", "softban", "slowmode", "lock",
-        "unlock", "timeout", "untimeout", "mass_kick", "mass_ban", "warns_clear_all", "clear", "punish"
+        "unlock", "timeout", "untimeout", "mass_kick", "mass_ban", "mass_ban_ids", "warns_clear_all", "clear", "punish"
     ],
     "Server Management": [
         "create_role", "delete_role", "create_channel", "delete_channel",
         "setmodlog", "nick", "setprefix", "set_channel_topic", "mass_role",
-        "add_role_to_all", "remove_role_from_all", "add_role_to_member", "remove_role_from_member"
+        "add_role_to_all", "remove_role_from_all", "add_role_to_member", "remove_role_from_member",
+        "autoresponder", "massjobs"
     ],
     "Utility": [
         "ping", "userinfo", "serverinfo", "announce", "poll", "dm",
@@ -727,32 +3268,46 @@ async def help_command(ctx):
     view = HelpView(bot, COMMAND_CATEGORIES)
     await view.send_initial_message(ctx)
 
-@bot.command(name='setprefix', help='Sets a custom command prefix for this server. Usage: {prefix}setprefix <new_prefix>')
+@bot.command(name='setprefix', help='Sets one or more command prefixes for this server. Add -i for case-insensitive matching. Usage: {prefix}setprefix <prefix> [more_prefixes...] [-i]')
 @commands.has_permissions(administrator=True)
 @commands.cooldown(1, 10, commands.BucketType.guild)
-async def set_prefix(ctx, new_prefix: str):
+async def set_prefix(ctx, *new_prefixes: str):
     """
-    Sets a custom command prefix for the current server.
+    Sets the command prefixes for the current server.
     Requires 'Administrator' permission.
-    The new prefix must be a single character or a short string.
+    Up to 5 prefixes of at most 5 characters each; the first one is shown in help messages.
+    Passing -i (or --ignore-case) makes the prefixes match regardless of letter case.
+    Mentioning the bot always works as a prefix.
     """
     if not ctx.guild:
         await ctx.send("This command can only be used in a server.")
         return
 
-    if not new_prefix:
+    case_insensitive = any(p.lower() in ('-i', '--ignore-case') for p in new_prefixes)
+    prefixes = []
+    for prefix in new_prefixes:
+        if prefix.lower() not in ('-i', '--ignore-case') and prefix not in prefixes:
+            prefixes.append(prefix)
+
+    if not prefixes:
         await ctx.send("The new prefix cannot be empty. Please provide a valid prefix.")
         return
 
-    if len(new_prefix) > 5: # Limit prefix length to prevent abuse
-        await ctx.send("The new prefix cannot be longer than 5 characters.")
+    if len(prefixes) > MAX_PREFIXES:
+        await ctx.send(f"You can set at most {MAX_PREFIXES} prefixes.")
+        return
+
+    if any(len(p) > MAX_PREFIX_LENGTH for p in prefixes):
+        await ctx.send(f"Prefixes cannot be longer than {MAX_PREFIX_LENGTH} characters.")
         return
 
     try:
-        guild_prefixes[ctx.guild.id] = new_prefix
+        guild_prefixes[ctx.guild.id] = {"prefixes": prefixes, "case_insensitive": case_insensitive}
+        _prefix_matchers.pop(ctx.guild.id, None) # Recompile on the next message
         save_prefixes() # Save the updated prefixes to file
-        await ctx.send(f"The command prefix for this server has been set to `{new_prefix}`. You can now use commands like `{new_prefix}help`.")
-        await log_moderation_action(ctx.guild, "Prefix Change", "Server", ctx.author, f"Prefix changed to '{new_prefix}'")
+        matcher = _get_prefix_matcher(ctx.guild.id)
+        await ctx.send(f"The command prefixes for this server have been set to {matcher.display()}. You can now use commands like `{matcher.primary}help`.")
+        await log_moderation_action(ctx.guild, "Prefix Change", "Server", ctx.author, f"Prefixes changed to {', '.join(repr(p) for p in prefixes)}{' (case-insensitive)' if case_insensitive else ''}")
     except discord.Forbidden:
         await ctx.send("I don't have permission to update server settings. Please check my permissions.")
         print(f"DEBUG: Bot missing permissions to change prefix in guild {ctx.guild.name}.")
@@ -793,28 +3348,38 @@ async def kick(ctx, member: discord.Member, *, reason: str = "No reason provided
         await ctx.send(f"An unexpected error occurred while trying to kick: `{e}`")
         print(f"DEBUG: Error in {ctx.prefix}kick command for {member.name}: {e}")
 
-@bot.command(name='ban', help='Bans a member from the server. Usage: {prefix}ban <member> [reason]')
+@bot.command(name='ban', help='Bans a member from the server, optionally for a limited time (e.g., 7d, 12h). Usage: {prefix}ban <member> [duration] [reason]')
 @commands.has_permissions(ban_members=True)
 @commands.bot_has_permissions(ban_members=True) # Bot must have this permission
 @commands.cooldown(1, 10, commands.BucketType.user)
 async def ban(ctx, member: discord.Member, *, reason: str = "No reason provided"):
     """
     Bans the specified member from the server.
+    A leading duration (e.g. `7d spamming`) makes it a temporary ban that is lifted automatically.
     Requires 'Ban Members' permission for the user.
     Includes a confirmation step.
     """
     if not await _check_mod_permissions(ctx, member, "ban"):
         return
 
-    confirmation_message = f"Are you sure you want to ban {member.mention} for: `{reason}`?"
+    duration_seconds, reason = _split_leading_duration(reason)
+    reason = reason or "No reason provided"
+    duration_text = f" for {_format_duration(duration_seconds)}" if duration_seconds else ""
+
+    confirmation_message = f"Are you sure you want to ban {member.mention}{duration_text} for: `{reason}`?"
     if not await _confirm_action(ctx, confirmation_message):
         return
 
     try:
         await member.ban(reason=reason, delete_message_days=0) # delete_message_days=0 means no messages are deleted
-        await ctx.send(f'{member.mention} has been banned by {ctx.author.mention} for: {reason}')
-        await log_moderation_action(ctx.guild, "Ban", member, ctx.author, reason)
-        await _send_dm_to_member(member, f'You have been banned from {ctx.guild.name} for: {reason}')
+        # A new ban replaces any earlier temporary one
+        if duration_seconds:
+            schedule_job("unban", duration_seconds, job_id=f"unban:{ctx.guild.id}:{member.id}", guild_id=ctx.guild.id, user_id=member.id)
+        else:
+            cancel_job(f"unban:{ctx.guild.id}:{member.id}")
+        await ctx.send(f'{member.mention} has been banned by {ctx.author.mention}{duration_text} for: {reason}')
+        await log_moderation_action(ctx.guild, "Temporary Ban" if duration_seconds else "Ban", member, ctx.author, f"{reason} (Duration: {_format_duration(duration_seconds)})" if duration_seconds else reason)
+        await _send_dm_to_member(member, f'You have been banned from {ctx.guild.name}{duration_text} for: {reason}')
     except discord.Forbidden:
         await ctx.send(f"I don't have permission to ban {member.mention}. Please ensure my role is higher than theirs and I have the 'Ban Members' permission.")
         print(f"DEBUG: Bot missing permissions to ban {member.name} in guild {ctx.guild.name}.")
@@ -826,7 +3391,7 @@ async def ban(ctx, member: discord.Member, *, reason: str = "No reason provided"
         print(f"DEBUG: Error in {ctx.prefix}ban command for {member.name}: {e}")
 
 
-@bot.command(name='unban', help='Unbans a user by their name and discriminator (e.g., {prefix}unban User#1234) or User ID. Usage: {prefix}unban <User ID or Username#Discriminator>')
+@bot.command(name='unban', help='Unbans a user by their User ID (or mention) or by name. A name that doesn\'t match exactly lists the closest banned names. Usage: {prefix}unban <User ID or name>')
 @commands.has_permissions(ban_members=True)
 @commands.bot_has_permissions(ban_members=True) # Bot must have this permission
 @commands.cooldown(1, 5, commands.BucketType.user)
@@ -834,34 +3399,53 @@ async def unban(ctx, *, member_id_or_name: str):
     """
     Unbans a user from the server.
     Requires 'Ban Members' permission for the user.
-    Can unban by user ID or by username#discriminator.
+    Unbanning by ID is a single request; names are looked up in the guild's ban index.
     """
+    query = member_id_or_name.strip()
     try:
-        banned_users = [entry async for entry in ctx.guild.bans()] # Get all banned users
-
-        # Try to unban by ID first
-        try:
-            member_id = int(member_id_or_name)
-            for ban_entry in banned_users:
-                user = ban_entry.user
-                if user.id == member_id:
-                    await ctx.guild.unban(user)
-                    await ctx.send(f'{user.mention} has been unbanned by {ctx.author.mention}.')
-                    await log_moderation_action(ctx.guild, "Unban", user, ctx.author, "Manual unban")
+        found = re.fullmatch(r'<@!?(\d+)>|(\d+)', query)
+        if found:
+            # Fast path: unban straight away, Discord reports whether the user was banned
+            user_id = int(found.group(1) or found.group(2))
+            name = str(user_id)
+            try:
+                await ctx.guild.unban(discord.Object(id=user_id))
+            except discord.NotFound:
+                await ctx.send(f'User ID `{user_id}` is not banned in this server.')
+                return
+            user = bot.get_user(user_id)
+            if user is None:
+                try:
+                    user = await bot.fetch_user(user_id) # For the confirmation and the mod log
+                except discord.HTTPException:
+                    user = None
+        else:
+            index = await get_ban_index(ctx.guild)
+            matches = index.search(query, limit=UNBAN_SUGGESTIONS)
+            exact = [match for match in matches if match.exact]
+            if len(exact) != 1:
+                if len(exact) > 1:
+                    header = f'Several banned users are named "{query}". Unban the right one by ID:'
+                elif matches:
+                    header = f'No banned user is named exactly "{query}". Closest matches (unban by ID):'
+                else:
+                    await ctx.send(f'Could not find a banned user with ID or name "{query}".')
                     return
-        except ValueError:
-            pass # Not an integer ID, proceed to check by name#discriminator
-
-        # If not found by ID, try to unban by name#discriminator
-        for ban_entry in banned_users:
-            user = ban_entry.user
-            if str(user) == member_id_or_name:
-                await ctx.guild.unban(user)
-                await ctx.send(f'{user.mention} has been unbanned by {ctx.author.mention}.')
-                await log_moderation_action(ctx.guild, "Unban", user, ctx.author, "Manual unban")
+                await ctx.send(header + "\n" + "\n".join(_describe_ban_match(match) for match in (exact or matches)))
                 return
-
-        await ctx.send(f'Could not find a banned user with ID or name "{member_id_or_name}".')
+            user_id, name = exact[0].user_id, exact[0].name
+            await ctx.guild.unban(discord.Object(id=user_id))
+            user = bot.get_user(user_id)
+
+        cancel_job(f"unban:{ctx.guild.id}:{user_id}") # Drop any pending automatic unban
+        if user is not None:
+            await ctx.send(f'{user.mention} has been unbanned by {ctx.author.mention}.')
+            await log_moderation_action(ctx.guild, "Unban", user, ctx.author, "Manual unban")
+        else:
+            await ctx.send(f'`{name}` has been unbanned by {ctx.author.mention}.')
+            await log_moderation_action(ctx.guild, "Unban", f"{name} (`{user_id}`)", ctx.author, "Manual unban")
+    except discord.NotFound:
+        await ctx.send(f'"{query}" is no longer banned.') # Unbanned since the index was read
     except discord.Forbidden:
         await ctx.send(f"I don't have permission to unban users. Please ensure I have the 'Ban Members' permission.")
         print(f"DEBUG: Bot missing permissions to unban in guild {ctx.guild.name}.")
@@ -872,6 +3456,153 @@ async def unban(ctx, *, member_id_or_name: str):
         await ctx.send(f"An unexpected error occurred while trying to unban: `{e}`")
         print(f"DEBUG: Error in {ctx.prefix}unban command for {member_id_or_name}: {e}")
 
+@bot.group(name='bans', invoke_without_command=True, help='Looks up, exports and imports this server\'s bans. Usage: {prefix}bans <search|export|import>')
+@commands.has_permissions(ban_members=True)
+@commands.bot_has_permissions(ban_members=True)
+@commands.guild_only()
+async def bans(ctx):
+    """
+    Base command for ban lookups, exports and imports. Shows usage if no subcommand is given.
+    """
+    await ctx.send(f"Usage: `{ctx.prefix}bans search <name>`, `{ctx.prefix}bans export [jsonl|csv]` or `{ctx.prefix}bans import [reason]` with a file attached")
+
+@bans.command(name='search', help='Finds banned users by a full or partial name. Usage: {prefix}bans search <name>')
+@commands.has_permissions(ban_members=True)
+@commands.cooldown(1, 3, commands.BucketType.user)
+async def bans_search(ctx, *, name: str):
+    """Lists the banned users whose names best match, closest first."""
+    try:
+        index = await get_ban_index(ctx.guild)
+    except discord.HTTPException as e:
+        await ctx.send(f"An error occurred with Discord's API while reading the ban list: `{e}`")
+        return
+    matches = index.search(name, limit=10, cutoff=0.3)
+    if not matches:
+        await ctx.send(f'No banned user has a name like "{name}".')
+        return
+    embed = discord.Embed(
+        title=f"🔎 Bans matching \"{name}\"",
+        description="\n".join(_describe_ban_match(match) for match in matches),
+        color=discord.Color.blue()
+    )
+    embed.set_footer(text=f"{len(index)} ban(s) indexed. Unban with {ctx.prefix}unban <ID>")
+    await ctx.send(embed=embed)
+
+@bans.command(name='export', help='Exports this server\'s ban list as a JSONL (default) or CSV attachment. Usage: {prefix}bans export [jsonl|csv]')
+@commands.has_permissions(ban_members=True)
+@commands.cooldown(1, 60, commands.BucketType.guild)
+async def bans_export(ctx, file_format: str = "jsonl"):
+    """
+    Streams the ban list into a file on disk, one ban per line, and uploads it from there,
+    so the whole list is never held in memory.
+    """
+    file_format = file_format.lower()
+    if file_format not in ("jsonl", "csv"):
+        await ctx.send("The export format must be `jsonl` or `csv`.")
+        return
+
+    status_message = await ctx.send("Exporting the ban list...")
+    fd, path = tempfile.mkstemp(suffix=f".{file_format}")
+    count = 0
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f) if file_format == "csv" else None
+            if writer:
+                writer.writerow(["user_id", "username", "global_name", "reason"])
+            async for entry in ctx.guild.bans(limit=None):
+                user = entry.user
+                if writer:
+                    writer.writerow([user.id, user.name, user.global_name or "", entry.reason or ""])
+                else:
+                    f.write(json.dumps({"user_id": str(user.id), "username": user.name, "global_name": user.global_name, "reason": entry.reason}) + "\n")
+                count += 1
+                if count % 10000 == 0:
+                    await _edit_status(status_message, f"Exporting the ban list... {count} ban(s) so far.")
+        if os.path.getsize(path) > ctx.guild.filesize_limit:
+            await _edit_status(status_message, f"The export of {count} ban(s) is larger than this server's upload limit.")
+            return
+        await ctx.send(f"Exported {count} ban(s).", file=discord.File(path, filename=f"bans_{ctx.guild.id}.{file_format}"))
+        await _edit_status(status_message, f"Exported {count} ban(s).")
+    except discord.Forbidden:
+        await _edit_status(status_message, "I don't have permission to read the ban list. Please ensure I have the 'Ban Members' permission.")
+    except discord.HTTPException as e:
+        await _edit_status(status_message, f"An error occurred with Discord's API while exporting the ban list: `{e}`")
+        print(f"DEBUG: HTTPException during ban export in guild {ctx.guild.name}: {e}")
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+def _parse_ban_import(content):
+    """
+    User IDs from a ban list file: JSONL lines (a `user_id` or `id` field), CSV rows (the first
+    column) or plain text (the first ID on each line). Returns (IDs in file order, lines skipped).
+    """
+    user_ids, skipped = [], 0
+    for line in content.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("{"):
+            try:
+                record = json.loads(line)
+                user_id = str(record.get("user_id") or record.get("id") or "")
+            except (ValueError, AttributeError):
+                user_id = ""
+        else:
+            found = _SNOWFLAKE_PATTERN.search(line.split(",", 1)[0]) # Reasons in later CSV columns may contain numbers
+            user_id = found.group(0) if found else ""
+        if _SNOWFLAKE_PATTERN.fullmatch(user_id):
+            user_ids.append(int(user_id))
+        else:
+            skipped += 1 # e.g. a CSV header
+    return user_ids, skipped
+
+@bans.command(name='import', help='Bans every user in an attached ban list (a bans export, or one ID per line) in the background. Usage: {prefix}bans import [reason] (with the file attached)')
+@commands.has_permissions(ban_members=True)
+@commands.bot_has_permissions(ban_members=True, manage_guild=True) # The bulk-ban endpoint needs both
+@commands.cooldown(1, 60, commands.BucketType.guild)
+async def bans_import(ctx, *, reason: str = "Imported ban list"):
+    """
+    Queues a ban_import mass job for the users in the attached file that aren't banned yet.
+    Requires 'Ban Members' permission.
+    Includes a confirmation step.
+    """
+    if not ctx.message.attachments:
+        await ctx.send("Please attach the ban list to import (a `bans export` file, or one user ID per line).")
+        return
+    attachment = ctx.message.attachments[0]
+    if attachment.size > BAN_IMPORT_MAX_FILE_BYTES:
+        await ctx.send(f"The attached ban list is too large (maximum {BAN_IMPORT_MAX_FILE_BYTES // (1024 * 1024)} MB).")
+        return
+    try:
+        content = (await attachment.read()).decode('utf-8', errors='ignore')
+        index = await get_ban_index(ctx.guild) # Users already banned are left out of the job
+    except discord.HTTPException as e:
+        await ctx.send(f"I couldn't read the ban list: `{e}`")
+        return
+
+    user_ids, unreadable = _parse_ban_import(content)
+    unique_ids = set(user_ids)
+    already_banned = {user_id for user_id in unique_ids if user_id in index}
+    new_ids = unique_ids - already_banned - {ctx.author.id, bot.user.id, ctx.guild.owner_id}
+    if len(new_ids) > BAN_IMPORT_MAX_IDS:
+        await ctx.send(f"You can import at most {BAN_IMPORT_MAX_IDS} bans at once ({len(new_ids)} given).")
+        return
+    counts = (f"{len(user_ids)} ID(s) read, {len(user_ids) - len(unique_ids)} duplicate(s), {len(already_banned)} already banned"
+              + (f", {unreadable} unreadable line(s)" if unreadable else ""))
+    if not new_ids:
+        await ctx.send(f"There is nobody new to ban ({counts}).")
+        return
+
+    if not await _confirm_action(ctx, f"Are you sure you want to ban {len(new_ids)} user(s) from `{attachment.filename}` for: `{reason}`? ({counts})"):
+        return
+
+    status_message = await ctx.send(f"Importing {len(new_ids)} ban(s) in the background... I'll post a summary when it's done.")
+    job_id = create_mass_job("ban_import", ctx, status_message, input_file=_write_mass_job_input(new_ids), total=len(new_ids),
+                             source=attachment.filename, reason=reason, author_name=ctx.author.name,
+                             description=f"Import {len(new_ids)} ban(s) from {attachment.filename}")
+    await _edit_status(status_message, f"Importing {len(new_ids)} ban(s) in the background (job `{job_id}`; see `{ctx.prefix}massjobs`)... I'll post a summary when it's done.")
+
 @bot.command(name='mute', help='Mutes a member for a specified duration (in minutes). Usage: {prefix}mute <member> <duration_minutes> [reason]')
 @commands.has_permissions(manage_roles=True)
 @commands.bot_has_permissions(manage_roles=True) # Bot must have this permission
@@ -907,21 +3638,8 @@ async def mute(ctx, member: discord.Member, duration_minutes: int, *, reason: st
         await log_moderation_action(ctx.guild, "Mute", member, ctx.author, reason)
         await _send_dm_to_member(member, f'You have been muted in {ctx.guild.name} for {duration_minutes} minutes for: {reason}')
 
-        # Schedule the unmute
-        await asyncio.sleep(duration_minutes * 60) # Convert minutes to seconds
-        if muted_role in member.roles: # Check if they are still muted after the duration
-            try:
-                await member.remove_roles(muted_role, reason="Mute duration expired")
-                await ctx.send(f'{member.mention} has been unmuted automatically after {duration_minutes} minutes.')
-                await log_moderation_action(ctx.guild, "Unmute (Auto)", member, bot.user, "Mute duration expired")
-                await _send_dm_to_member(member, f'You have been unmuted in {ctx.guild.name}.')
-            except discord.Forbidden:
-                print(f"DEBUG: Bot missing permissions to auto-unmute {member.name} in guild {ctx.guild.name}.")
-            except discord.HTTPException as e:
-                print(f"DEBUG: HTTPException during auto-unmute for {member.name}: {e}")
-            except Exception as e:
-                print(f"DEBUG: An unexpected error occurred while trying to automatically unmute {member.mention}: `{e}`")
-
+        # Schedule the unmute; the scheduler persists it across restarts
+        schedule_job("unmute", duration_minutes * 60, job_id=f"unmute:{ctx.guild.id}:{member.id}", guild_id=ctx.guild.id, member_id=member.id, channel_id=ctx.channel.id, minutes=duration_minutes)
     except discord.Forbidden:
         await ctx.send(f"I don't have permission to assign roles to {member.mention}. Please ensure my role is higher than the 'Muted' role and I have the 'Manage Roles' permission.")
         print(f"DEBUG: Bot missing permissions to mute {member.name} in guild {ctx.guild.name}.")
@@ -961,6 +3679,7 @@ async def unmute(ctx, member: discord.Member, *, reason: str = "No reason provid
 
     try:
         await member.remove_roles(muted_role, reason=reason)
+        cancel_job(f"unmute:{ctx.guild.id}:{member.id}") # Drop any pending automatic unmute
         await ctx.send(f'{member.mention} has been unmuted by {ctx.author.mention} for: {reason}')
         await log_moderation_action(ctx.guild, "Unmute", member, ctx.author, reason)
         await _send_dm_to_member(member, f'You have been unmuted in {ctx.guild.name}.')
@@ -974,16 +3693,17 @@ async def unmute(ctx, member: discord.Member, *, reason: str = "No reason provid
         await ctx.send(f"An unexpected error occurred while trying to unmute: `{e}`")
         print(f"DEBUG: Error in {ctx.prefix}unmute command for {member.name}: {e}")
 
-@bot.command(name='purge', help='Clears a specified number of messages from the channel, optionally from a specific member. Messages older than 30 days cannot be purged. Usage: {prefix}purge <amount> OR {prefix}purge <member> <amount>')
+@bot.command(name='purge', help='Deletes the newest <amount> messages in the channel that match, optionally only those from a specific member and/or matching a filter expression, scanning back through history until it finds them. Filter terms (all must match, prefix with ! to negate): bots, humans, links, invites, attachments, embeds, pinned, from:<user>, contains:<text>, regex:<pattern>, before:<message id>, after:<message id>. Messages older than 14 days are deleted one at a time in the background. Usage: {prefix}purge <amount> [filters] OR {prefix}purge <member> <amount> [filters]')
 @commands.has_permissions(manage_messages=True)
-@commands.bot_has_permissions(manage_messages=True) # Bot must have this permission
+@commands.bot_has_permissions(manage_messages=True, read_message_history=True) # Bot must have these permissions
 @commands.cooldown(1, 5, commands.BucketType.channel) # 1 use per 5 seconds per channel
-async def purge(ctx, member_or_amount: Union[discord.Member, int], amount: int = None):
+async def purge(ctx, member_or_amount: Union[discord.Member, int], amount: Optional[int] = None, *, filters: str = None):
     """
     Clears messages from the current channel.
     If a member is specified, clears messages only from that member.
     If only an amount is specified, clears general messages.
-    Messages older than 30 days cannot be purged.
+    A filter expression (see compile_purge_filter) narrows the messages further.
+    Runs as a mass job (see massjobs) that scans up to PURGE_SCAN_CAP messages of history.
     Requires 'Manage Messages' permission for the user.
     Includes a confirmation step.
     """
@@ -999,60 +3719,39 @@ async def purge(ctx, member_or_amount: Union[discord.Member, int], amount: int =
     if amount <= 0:
         await ctx.send("Please specify a positive number of messages to purge.")
         return
-    if amount > 1000: # Practical limit to prevent excessive fetching/deletion and potential rate limits
-        await ctx.send("You can purge a maximum of 1000 messages at once.")
+    if amount > PURGE_MAX_AMOUNT: # Practical limit; the scan cap bounds how far back a purge looks
+        await ctx.send(f"You can purge a maximum of {PURGE_MAX_AMOUNT} messages at once.")
         return
-
-    # Discord API generally restricts bulk deletion to messages younger than 14 days.
-    # We'll set a check for 30 days, but Discord's API will still enforce its own limits.
-    fourteen_days_ago = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=14)
+    try:
+        purge_filter = compile_purge_filter(filters)
+        compile_purge_filter(purge_filter.text) # The job recompiles the stored text, so it must parse back
+    except ValueError as e:
+        await ctx.send(f"Invalid filter: {e}")
+        return
+    matching = f" matching `{purge_filter.text}`" if purge_filter.text else ""
 
     if target_member:
-        confirmation_message = f"Are you sure you want to purge {amount} messages from {target_member.mention} in this channel? (Note: Discord only allows bulk deletion of messages up to 14 days old.)"
+        confirmation_message = f"Are you sure you want to purge {amount} messages from {target_member.mention}{matching} in this channel? (Note: messages older than 14 days can't be bulk-deleted and are removed one at a time, which is slow.)"
+        description = f"Purging {amount} message(s) from {target_member}{matching} in #{ctx.channel.name}"
     else:
-        confirmation_message = f"Are you sure you want to purge {amount} messages in this channel? (Note: Discord only allows bulk deletion of messages up to 14 days old.)"
+        confirmation_message = f"Are you sure you want to purge {amount} messages{matching} in this channel? (Note: messages older than 14 days can't be bulk-deleted and are removed one at a time, which is slow.)"
+        description = f"Purging {amount} message(s){matching} in #{ctx.channel.name}"
 
     if not await _confirm_action(ctx, confirmation_message):
         return
 
+    _boost_message_cache(ctx.channel.id)
     try:
-        # Add 1 to limit to account for the command message itself.
-        # The confirmation message is deleted by _confirm_action.
-        def is_target_message(message):
-            # Only delete messages within the 14-day window for bulk deletion
-            return (message.author == target_member if target_member else True) and message.created_at > fourteen_days_ago
-
-        # Fetch messages, including the command message itself, but excluding the confirmation message
-        # We fetch one more than 'amount' to potentially include the command message if it's not deleted by _confirm_action's prompt.
-        # However, since _confirm_action deletes its own message, we only need to worry about ctx.message here.
-        # The purge function itself will remove the command message if it's within the limit.
-        deleted = await ctx.channel.purge(limit=amount + 1, check=is_target_message, before=datetime.datetime.now(datetime.timezone.utc))
-        
-        # Adjust count if the command message was among those deleted
-        actual_deleted_count = len(deleted)
-        if ctx.message in deleted:
-            actual_deleted_count -= 1 # The command message itself
-
-        if actual_deleted_count < 0: # Should not happen, but a safeguard
-            actual_deleted_count = 0
+        await ctx.message.delete() # The command message itself isn't counted towards the amount
+    except discord.HTTPException:
+        pass
 
-        if target_member:
-            await ctx.send(f'Successfully purged {actual_deleted_count} messages from {target_member.mention}.', delete_after=5)
-            log_reason = f"{actual_deleted_count} messages purged from {target_member.name}"
-        else:
-            await ctx.send(f'Successfully purged {actual_deleted_count} messages.', delete_after=5)
-            log_reason = f"{actual_deleted_count} messages purged"
-        
-        await log_moderation_action(ctx.guild, "Purge Messages", ctx.channel, ctx.author, log_reason)
-    except discord.Forbidden:
-        await ctx.send(f"I don't have permission to manage messages in this channel. Please ensure I have the 'Manage Messages' permission.")
-        print(f"DEBUG: Bot missing permissions to purge messages in channel {ctx.channel.name}.")
-    except discord.HTTPException as e:
-        await ctx.send(f"An error occurred with Discord's API while trying to purge messages: `{e}`")
-        print(f"DEBUG: HTTPException during purge: {e}")
-    except Exception as e:
-        await ctx.send(f"An unexpected error occurred while trying to purge messages: `{e}`")
-        print(f"DEBUG: Error in {ctx.prefix}purge command: {e}")
+    status_message = await ctx.send(f"{description} in the background... I'll post a summary when it's done.")
+    # The scan starts just before the command message, so the status message is never deleted
+    job_id = create_mass_job("purge", ctx, status_message, amount=amount, member_id=target_member.id if target_member else None,
+                             filter=purge_filter.text, scan_cap=PURGE_SCAN_CAP, before_id=ctx.message.id, description=description,
+                             author_name=ctx.author.name)
+    await _edit_status(status_message, f"{description} in the background (job `{job_id}`; see `{ctx.prefix}massjobs`)... I'll post a summary when it's done.")
 
 
 @bot.command(name='warn', help='Warns a member. Usage: {prefix}warn <member> [reason]')
@@ -1365,14 +4064,14 @@ async def nick(ctx, member: discord.Member, *, new_nickname: str = None):
     if member == bot.user:
         await ctx.send("I cannot change my own nickname using this command.")
         return
-    if member == ctx.guild.owner:
+    if member.id == ctx.guild.owner_id:
         await ctx.send("I cannot change the nickname of the server owner.")
         return
     # Check if the bot's highest role is lower than or equal to the target's highest role
-    if ctx.guild.me.top_role <= member.top_role:
+    if _top_role_key(ctx.guild.me) <= _top_role_key(member):
         await ctx.send(f"I cannot change {member.mention}'s nickname because their highest role is equal to or higher than my highest role. Please ensure my role is above theirs.")
         return
-    if ctx.author.top_role <= member.top_role and ctx.author != ctx.guild.owner:
+    if _top_role_key(ctx.author) <= _top_role_key(member) and ctx.author.id != ctx.guild.owner_id:
         await ctx.send("You cannot change the nickname of someone with an equal or higher role than you.")
         return
     if member == ctx.author and new_nickname is None:
@@ -1398,23 +4097,32 @@ async def nick(ctx, member: discord.Member, *, new_nickname: str = None):
         await ctx.send(f"An unexpected error occurred while trying to change nickname: `{e}`")
         print(f"DEBUG: Error in {ctx.prefix}nick command for {member.name}: {e}")
 
-@bot.command(name='role', help='Adds or removes a role from a member. Usage: {prefix}role <member> <add|remove> <role_name>')
+@bot.command(name='role', help='Adds or removes a role from a member. Add a duration (e.g., 2h, 7d) after the role name to make an added role temporary. Usage: {prefix}role <member> <add|remove> <role_name> [duration]')
 @commands.has_permissions(manage_roles=True)
 @commands.bot_has_permissions(manage_roles=True) # Bot must have this permission
 @commands.cooldown(1, 5, commands.BucketType.user)
 async def role(ctx, member: discord.Member, action: str, *, role_name: str):
     """
     Adds or removes a role from the specified member.
+    A trailing duration on `add` (e.g. `role @user add Event Winner 7d`) removes the role again automatically.
     Requires 'Manage Roles' permission for the user.
     """
     action = action.lower()
+    duration_seconds = None
     target_role = discord.utils.get(ctx.guild.roles, name=role_name)
+    if not target_role and action == 'add':
+        # Exact role names win; only then treat a trailing word as a duration
+        name_part, _, last_word = role_name.rpartition(' ')
+        duration_seconds = _parse_duration(last_word) if name_part else None
+        if duration_seconds:
+            role_name = name_part
+            target_role = discord.utils.get(ctx.guild.roles, name=role_name)
 
     if not target_role:
         await ctx.send(f"Role '{role_name}' not found.")
         return
 
-    if target_role >= ctx.author.top_role and ctx.author != ctx.guild.owner:
+    if target_role >= ctx.author.top_role and ctx.author.id != ctx.guild.owner_id:
         await ctx.send("You cannot assign or remove a role that is equal to or higher than your own.")
         return
 
@@ -1422,7 +4130,7 @@ async def role(ctx, member: discord.Member, action: str, *, role_name: str):
     if ctx.guild.me.top_role <= target_role:
         await ctx.send(f"I cannot assign or remove the '{target_role.name}' role because my highest role is not above it. Please ensure my role is higher than the role you are trying to manage.")
         return
-    if member == ctx.guild.owner:
+    if member.id == ctx.guild.owner_id:
         await ctx.send("I cannot manage roles for the server owner.")
         return
 
@@ -1432,13 +4140,20 @@ async def role(ctx, member: discord.Member, action: str, *, role_name: str):
                 await ctx.send(f'{member.mention} already has the role {target_role.name}.')
             else:
                 await member.add_roles(target_role, reason=f"Role added by {ctx.author.name}")
-                await ctx.send(f'Added role {target_role.name} to {member.mention}.')
-                await log_moderation_action(ctx.guild, "Role Added", member, ctx.author, f"Added role: {target_role.name}")
+                if duration_seconds:
+                    schedule_job("role_expiry", duration_seconds, job_id=f"role_expiry:{ctx.guild.id}:{member.id}:{target_role.id}", guild_id=ctx.guild.id, member_id=member.id, role_id=target_role.id)
+                    await ctx.send(f'Added role {target_role.name} to {member.mention} for {_format_duration(duration_seconds)}.')
+                    await log_moderation_action(ctx.guild, "Temporary Role Added", member, ctx.author, f"Added role: {target_role.name} (Duration: {_format_duration(duration_seconds)})")
+                else:
+                    cancel_job(f"role_expiry:{ctx.guild.id}:{member.id}:{target_role.id}") # Now permanent
+                    await ctx.send(f'Added role {target_role.name} to {member.mention}.')
+                    await log_moderation_action(ctx.guild, "Role Added", member, ctx.author, f"Added role: {target_role.name}")
         elif action == 'remove':
             if target_role not in member.roles:
                 await ctx.send(f'{member.mention} does not have the role {target_role.name}.')
             else:
                 await member.remove_roles(target_role, reason=f"Role removed by {ctx.author.name}")
+                cancel_job(f"role_expiry:{ctx.guild.id}:{member.id}:{target_role.id}")
                 await ctx.send(f'Removed role {target_role.name} from {member.mention}.')
                 await log_moderation_action(ctx.guild, "Role Removed", member, ctx.author, f"Removed role: {target_role.name}")
         else:
@@ -1468,14 +4183,14 @@ async def add_role_to_member(ctx, member: discord.Member, *, role_name: str):
         await ctx.send(f"Role '{role_name}' not found.")
         return
 
-    if target_role >= ctx.author.top_role and ctx.author != ctx.guild.owner:
+    if target_role >= ctx.author.top_role and ctx.author.id != ctx.guild.owner_id:
         await ctx.send("You cannot assign a role that is equal to or higher than your own.")
         return
 
     if ctx.guild.me.top_role <= target_role:
         await ctx.send(f"I cannot assign the '{target_role.name}' role because my highest role is not above it. Please ensure my role is higher than the role you are trying to assign.")
         return
-    if member == ctx.guild.owner:
+    if member.id == ctx.guild.owner_id:
         await ctx.send("I cannot manage roles for the server owner.")
         return
     
@@ -1512,14 +4227,14 @@ async def remove_role_from_member(ctx, member: discord.Member, *, role_name: str
         await ctx.send(f"Role '{role_name}' not found.")
         return
 
-    if target_role >= ctx.author.top_role and ctx.author != ctx.guild.owner:
+    if target_role >= ctx.author.top_role and ctx.author.id != ctx.guild.owner_id:
         await ctx.send("You cannot remove a role that is equal to or higher than your own.")
         return
 
     if ctx.guild.me.top_role <= target_role:
         await ctx.send(f"I cannot remove the '{target_role.name}' role because my highest role is not above it. Please ensure my role is higher than the role you are trying to remove.")
         return
-    if member == ctx.guild.owner:
+    if member.id == ctx.guild.owner_id:
         await ctx.send("I cannot manage roles for the server owner.")
         return
 
@@ -1681,7 +4396,7 @@ async def channel_info(ctx, channel: discord.abc.GuildChannel = None):
         elif isinstance(channel, discord.VoiceChannel):
             embed.add_field(name="Bitrate", value=f"{channel.bitrate / 1000} kbps", inline=True)
             embed.add_field(name="User Limit", value=channel.user_limit if channel.user_limit != 0 else "None", inline=True)
-            embed.add_field(name="Connected Members", value=len(channel.members), inline=True)
+            embed.add_field(name="Connected Members", value=len(channel.members), inline=True) # Voice members stay cached in lazy mode
 
         embed.set_footer(text=f"Requested by {ctx.author.display_name}")
         await ctx.send(embed=embed)
@@ -1706,7 +4421,8 @@ async def role_info(ctx, *, role: discord.Role):
         )
         embed.add_field(name="ID", value=role.id, inline=True)
         embed.add_field(name="Color (Hex)", value=str(role.color), inline=True)
-        embed.add_field(name="Members with Role", value=len(role.members), inline=True)
+        member_count = role_member_count(role)
+        embed.add_field(name="Members with Role", value=member_count if member_count is not None else "n/a in lazy mode", inline=True)
         embed.add_field(name="Created At", value=role.created_at.strftime("%Y-%m-%d %H:%M:%S UTC"), inline=False)
         embed.add_field(name="Hoisted", value=role.hoist, inline=True)
         embed.add_field(name="Mentionable", value=role.mentionable, inline=True)
@@ -1746,7 +4462,7 @@ async def serverinfo(ctx):
         if guild.icon:
             embed.set_thumbnail(url=guild.icon.url)
         embed.add_field(name="ID", value=guild.id, inline=True)
-        embed.add_field(name="Owner", value=guild.owner.mention, inline=True)
+        embed.add_field(name="Owner", value=f"<@{guild.owner_id}>", inline=True) # The owner may not be cached
         embed.add_field(name="Members", value=guild.member_count, inline=True)
         embed.add_field(name="Channels", value=f"{len(guild.text_channels)} Text, {len(guild.voice_channels)} Voice", inline=True)
         embed.add_field(name="Roles", value=len(guild.roles), inline=True)
@@ -1830,48 +4546,38 @@ async def warns_clear_all(ctx):
 async def mass_kick(ctx, *members: discord.Member, reason: str = "No reason provided"):
     """
     Kicks multiple specified members from the server.
+    Kicks run concurrently through the bulk executor, which follows Discord's rate limits.
     Requires 'Kick Members' permission.
     """
     if not members:
         await ctx.send("Please mention at least one member to kick.")
         return
 
-    kicked_count = 0
-    failed_kicks = []
-
-    for member in members:
-        # Use the helper for individual member checks
-        if not await _check_mod_permissions(ctx, member, "kick"):
-            failed_kicks.append(f"{member.mention} (Permission/Role Hierarchy Issue)")
-            continue
+    targets, skipped = _partition_mod_targets(ctx, members, "kick")
+    if not targets:
+        await ctx.send("None of those members can be kicked: " + "; ".join(f"{_describe_target(t)}: {why}" for t, why in skipped[:10]))
+        return
 
-        try:
-            await member.kick(reason=reason)
-            kicked_count += 1
-            await log_moderation_action(ctx.guild, "Mass Kick", member, ctx.author, reason)
-            await _send_dm_to_member(member, f'You have been kicked from {ctx.guild.name} for: {reason}')
-        except discord.Forbidden:
-            failed_kicks.append(f"{member.mention} (Bot missing permissions)")
-            print(f"DEBUG: Bot missing permissions to kick {member.name} in guild {ctx.guild.name}.")
-        except discord.HTTPException as e:
-            failed_kicks.append(f"{member.mention} (Discord API error: {e})")
-            print(f"DEBUG: HTTPException during mass kick for {member.name}: {e}")
-        except Exception as e:
-            failed_kicks.append(f"{member.mention} (Unexpected error: {e})")
-            print(f"DEBUG: Error kicking {member.name}: {e}")
+    async def kick_one(member):
+        await member.kick(reason=f"Mass kick by {ctx.author.name}: {reason}")
 
-    if kicked_count > 0:
-        await ctx.send(f'Successfully kicked {kicked_count} member(s).')
-    if failed_kicks:
-        await ctx.send(f'Failed to kick: {", ".join(failed_kicks)}')
+    try:
+        kicked, failures = await _run_member_action(targets, kick_one, "DELETE", f"/guilds/{ctx.guild.id}/members/0")
+        await _dm_members(kicked, f'You have been kicked from {ctx.guild.name} for: {reason}')
+        await _report_bulk_outcome(ctx, f"Kicked {len(kicked)} member(s).", "Mass Kick", kicked, skipped, failures,
+                                   reason, report_name="mass_kick_report.txt")
+    except Exception as e:
+        await ctx.send(f"An unexpected error occurred during the mass kick: `{e}`")
+        print(f"DEBUG: Error in {ctx.prefix}mass_kick command: {e}")
 
-@bot.command(name='mass_ban', help='Bans multiple members. Usage: {prefix}mass_ban <member1> <member2> ... [reason]')
+@bot.command(name='mass_ban', help='Bans multiple members, optionally for a limited time (e.g., 7d). Usage: {prefix}mass_ban <member1> <member2> ... [duration] [reason]')
 @commands.has_permissions(ban_members=True)
 @commands.bot_has_permissions(ban_members=True) # Bot must have this permission
 @commands.cooldown(1, 30, commands.BucketType.guild)
 async def mass_ban(ctx, *members: discord.Member, reason: str = "No reason provided"):
     """
     Bans multiple specified members from the server.
+    Members are banned through Discord's bulk-ban endpoint, 200 per request.
     Requires 'Ban Members' permission.
     Includes a confirmation step.
     """
@@ -1879,39 +4585,75 @@ async def mass_ban(ctx, *members: discord.Member, reason: str = "No reason provi
         await ctx.send("Please mention at least one member to ban.")
         return
 
+    duration_seconds, reason = _split_leading_duration(reason)
+    reason = reason or "No reason provided"
+    duration_text = f" for {_format_duration(duration_seconds)}" if duration_seconds else ""
+
     member_mentions = ", ".join([m.mention for m in members])
-    confirmation_message = f"Are you sure you want to ban the following members: {member_mentions} for: `{reason}`?"
+    if len(member_mentions) > 1500:
+        member_mentions = f"{len(members)} members"
+    confirmation_message = f"Are you sure you want to ban the following members{duration_text}: {member_mentions} for: `{reason}`?"
     if not await _confirm_action(ctx, confirmation_message):
         return
 
-    banned_count = 0
-    failed_bans = []
-
-    for member in members:
-        # Use the helper for individual member checks
-        if not await _check_mod_permissions(ctx, member, "ban"):
-            failed_bans.append(f"{member.mention} (Permission/Role Hierarchy Issue)")
-            continue
+    try:
+        await _run_mass_ban(ctx, members, reason, duration_seconds)
+    except Exception as e:
+        await ctx.send(f"An unexpected error occurred during the mass ban: `{e}`")
+        print(f"DEBUG: Error in {ctx.prefix}mass_ban command: {e}")
 
+@bot.command(name='mass_ban_ids', help='Bans users by ID, including accounts that already left. IDs can also come from an attached .txt file. Usage: {prefix}mass_ban_ids <id1> <id2> ... [duration] [reason]')
+@commands.has_permissions(ban_members=True)
+@commands.bot_has_permissions(ban_members=True) # Bot must have this permission
+@commands.cooldown(1, 30, commands.BucketType.guild)
+async def mass_ban_ids(ctx, *, arguments: str = ""):
+    """
+    Bans users by ID, whether or not they are still in the server.
+    IDs (or mentions) come first, followed by an optional duration and reason.
+    Any IDs in an attached text file are added to the list.
+    Requires 'Ban Members' permission.
+    Includes a confirmation step.
+    """
+    user_ids = []
+    words = arguments.split()
+    while words and _SNOWFLAKE_PATTERN.fullmatch(words[0].strip('<@!>')):
+        user_ids.append(int(words.pop(0).strip('<@!>')))
+    duration_seconds, reason = _split_leading_duration(" ".join(words))
+    reason = reason or "No reason provided"
+
+    if ctx.message.attachments:
+        attachment = ctx.message.attachments[0]
+        if attachment.size > MASS_BAN_MAX_FILE_BYTES:
+            await ctx.send(f"The attached ID list is too large (maximum {MASS_BAN_MAX_FILE_BYTES // 1024} KB).")
+            return
         try:
-            await member.ban(reason=reason, delete_message_days=0)
-            banned_count += 1
-            await log_moderation_action(ctx.guild, "Mass Ban", member, ctx.author, reason)
-            await _send_dm_to_member(member, f'You have been banned from {ctx.guild.name} for: {reason}')
-        except discord.Forbidden:
-            failed_bans.append(f"{member.mention} (Bot missing permissions)")
-            print(f"DEBUG: Bot missing permissions to ban {member.name} in guild {ctx.guild.name}.")
+            content = (await attachment.read()).decode('utf-8', errors='ignore')
         except discord.HTTPException as e:
-            failed_bans.append(f"{member.mention} (Discord API error: {e})")
-            print(f"DEBUG: HTTPException during mass ban for {member.name}: {e}")
-        except Exception as e:
-            failed_bans.append(f"{member.mention} (Unexpected error: {e})")
-            print(f"DEBUG: Error banning {member.name}: {e}")
+            await ctx.send(f"I couldn't download the attached ID list: `{e}`")
+            return
+        user_ids.extend(int(match) for match in _SNOWFLAKE_PATTERN.findall(content))
+
+    user_ids = list(dict.fromkeys(user_ids)) # Dedupe, keeping order
+    if not user_ids:
+        await ctx.send("Please give at least one user ID, or attach a text file with one ID per line.")
+        return
+    if len(user_ids) > MASS_BAN_MAX_IDS:
+        await ctx.send(f"You can ban at most {MASS_BAN_MAX_IDS} users at once ({len(user_ids)} given).")
+        return
+
+    duration_text = f" for {_format_duration(duration_seconds)}" if duration_seconds else ""
+    confirmation_message = f"Are you sure you want to ban {len(user_ids)} user(s){duration_text} for: `{reason}`?"
+    if not await _confirm_action(ctx, confirmation_message):
+        return
 
-    if banned_count > 0:
-        await ctx.send(f'Successfully banned {banned_count} member(s).')
-    if failed_bans:
-        await ctx.send(f'Failed to ban: {", ".join(failed_bans)}')
+    # Members still in the server get the usual hierarchy checks; everyone else is banned by ID
+    members = await resolve_members(ctx.guild, user_ids)
+    targets = [members.get(user_id) or discord.Object(id=user_id) for user_id in user_ids]
+    try:
+        await _run_mass_ban(ctx, targets, reason, duration_seconds)
+    except Exception as e:
+        await ctx.send(f"An unexpected error occurred during the mass ban: `{e}`")
+        print(f"DEBUG: Error in {ctx.prefix}mass_ban_ids command: {e}")
 
 @bot.command(name='create_role', help='Creates a new role. Usage: {prefix}create_role <name> [hex_color]')
 @commands.has_permissions(manage_roles=True)
@@ -1967,7 +4709,7 @@ async def delete_role(ctx, *, role_name: str):
     if not target_role:
         await ctx.send(f"Role '{role_name}' not found.")
         return
-    if target_role >= ctx.author.top_role and ctx.author != ctx.guild.owner:
+    if target_role >= ctx.author.top_role and ctx.author.id != ctx.guild.owner_id:
         await ctx.send("You cannot delete a role that is equal to or higher than your own.")
         return
     # Check if the bot's highest role is lower than or equal to the target role
@@ -2188,15 +4930,15 @@ async def ban_vc(ctx, member: discord.Member, channel: discord.VoiceChannel, *,
     if member == bot.user:
         await ctx.send("I cannot ban myself from a voice channel.")
         return
-    if member == ctx.guild.owner:
+    if member.id == ctx.guild.owner_id:
         await ctx.send("I cannot ban the server owner from a voice channel.")
         return
     # Check if the bot's highest role is lower than or equal to the target's highest role
     # This check is less critical for channel specific overwrites, but good practice.
-    if ctx.guild.me.top_role <= member.top_role and member != ctx.guild.owner:
+    if _top_role_key(ctx.guild.me) <= _top_role_key(member) and member.id != ctx.guild.owner_id:
         await ctx.send(f"I cannot ban {member.mention} from voice channel {channel.name} because their highest role is equal to or higher than my highest role. Please ensure my role is above theirs.")
         return
-    if ctx.author.top_role <= member.top_role and ctx.author != ctx.guild.owner:
+    if _top_role_key(ctx.author) <= _top_role_key(member) and ctx.author.id != ctx.guild.owner_id:
         await ctx.send("You cannot ban someone with an equal or higher role than you from a voice channel.")
         return
 
@@ -2262,6 +5004,7 @@ async def unban_vc(ctx, member: discord.Member, channel: discord.VoiceChannel, *
 async def mass_move_vc(ctx, source_vc: discord.VoiceChannel, destination_vc: discord.VoiceChannel):
     """
     Moves all members from the source voice channel to the destination voice channel.
+    Moves run concurrently through the bulk executor, which follows Discord's rate limits.
     Requires 'Move Members' permission for the user and bot.
     """
     if source_vc == destination_vc:
@@ -2272,39 +5015,31 @@ async def mass_move_vc(ctx, source_vc: discord.VoiceChannel, destination_vc: dis
         await ctx.send(f"There are no members in {source_vc.name} to move.")
         return
 
-    moved_count = 0
-    failed_moves = []
-
-    for member in list(source_vc.members): # Iterate over a copy as members list changes during iteration
-        if member == bot.user:
+    # User's role hierarchy check is not needed here as it's a mass action by the bot.
+    bot_top_role_key = _top_role_key(ctx.guild.me)
+    targets, skipped = [], []
+    for member in source_vc.members: # Snapshot now; the list changes as members are moved
+        if member == ctx.guild.me:
             continue # Don't try to move the bot itself
+        if bot_top_role_key <= _top_role_key(member):
+            skipped.append((member, "Bot role too low to move"))
+        else:
+            targets.append(member)
 
-        # Check if the bot has permission to move this specific member
-        # User's role hierarchy check is not needed here as it's a mass action by the bot.
-        if ctx.guild.me.top_role <= member.top_role:
-            failed_moves.append(f"{member.mention} (Bot role too low to move)")
-            continue
-        
-        try:
-            await member.move_to(destination_vc, reason=f"Mass moved by {ctx.author.name}")
-            moved_count += 1
-        except discord.Forbidden:
-            failed_members.append(f"{member.mention} (Bot missing permissions)")
-            print(f"DEBUG: Bot missing permissions to move {member.name} to {destination_vc.name}.")
-        except discord.HTTPException as e:
-            failed_moves.append(f"{member.mention} (Discord API error: {e})")
-            print(f"DEBUG: HTTPException during mass move for {member.name}: {e}")
-        except Exception as e:
-            failed_moves.append(f"{member.mention} (Unexpected error: {e})")
-            print(f"DEBUG: Error moving {member.name}: {e}")
+    async def move_one(member):
+        await member.move_to(destination_vc, reason=f"Mass moved by {ctx.author.name}")
 
-    if moved_count > 0:
-        await ctx.send(f'Successfully moved {moved_count} member(s) from {source_vc.name} to {destination_vc.name}.')
-        await log_moderation_action(ctx.guild, "Mass Move VC", f"From {source_vc.name} to {destination_vc.name}", ctx.author, f"Moved {moved_count} members.")
-    if failed_moves:
-        await ctx.send(f'Failed to move: {", ".join(failed_moves)}')
-    if moved_count == 0 and not failed_moves:
-        await ctx.send(f"No members were affected by the mass role move operation for '{source_vc.name}'.")
+    try:
+        moved, failures = await _run_member_action(targets, move_one, "PATCH", f"/guilds/{ctx.guild.id}/members/0")
+        if not moved and not skipped and not failures:
+            await ctx.send(f"No members were affected by the mass move operation for '{source_vc.name}'.")
+            return
+        await _report_bulk_outcome(ctx, f"Moved {len(moved)} member(s) from {source_vc.name} to {destination_vc.name}.", "Mass Move VC",
+                                   moved, skipped, failures, _summarize_lines([m.mention for m in moved]),
+                                   log_target=f"From {source_vc.name} to {destination_vc.name}", report_name="mass_move_report.txt")
+    except Exception as e:
+        await ctx.send(f"An unexpected error occurred during the mass move: `{e}`")
+        print(f"DEBUG: Error in {ctx.prefix}mass_move_vc command: {e}")
 
 # --- New Commands ---
 
@@ -2337,50 +5072,15 @@ async def mass_role(ctx, action: str, role_name: str, *members: discord.Member,
         return
     
     # Check if the user's role is higher than the target role
-    if ctx.author.top_role <= target_role and ctx.author != ctx.guild.owner:
+    if ctx.author.top_role <= target_role and ctx.author.id != ctx.guild.owner_id:
         await ctx.send("You cannot manage a role that is equal to or higher than your own.")
         return
 
-    processed_count = 0
-    failed_members = []
-
-    for member in members:
-        if member.bot or member == ctx.guild.owner or member.top_role >= ctx.guild.me.top_role:
-            # Skip bots, server owner, and members with higher or equal roles than the bot
-            continue
-        if role in member.roles:
-            continue # Skip if already has the role
-
-        try:
-            if action == 'add':
-                if target_role not in member.roles:
-                    await member.add_roles(target_role, reason=f"Mass role add by {ctx.author.name}: {reason}")
-                    processed_count += 1
-                else:
-                    failed_members.append(f"{member.mention} (Already has role)")
-            elif action == 'remove':
-                if target_role in member.roles:
-                    await member.remove_roles(target_role, reason=f"Mass role remove by {ctx.author.name}: {reason}")
-                    processed_count += 1
-                else:
-                    failed_members.append(f"{member.mention} (Does not have role)")
-        except discord.Forbidden:
-            failed_members.append(f"{member.mention} (Bot missing permissions)")
-            print(f"DEBUG: Bot missing permissions to {action} role for {member.name}.")
-        except discord.HTTPException as e:
-            failed_members.append(f"{member.mention} (Discord API error: {e})")
-            print(f"DEBUG: HTTPException during mass_role for {member.name}: {e}")
-        except Exception as e:
-            failed_members.append(f"{member.mention} (Unexpected error: {e})")
-            print(f"DEBUG: Error during mass_role for {member.name}: {e}")
-
-    if processed_count > 0:
-        await ctx.send(f'Successfully {action}ed role `{target_role.name}` for {processed_count} member(s).')
-        await log_moderation_action(ctx.guild, f"Mass Role {action.capitalize()}", target_role, ctx.author, f"Role: {target_role.name}, Action: {action}, Count: {processed_count}, Reason: {reason}")
-    if failed_members:
-        await ctx.send(f'Failed to {action} role for: {", ".join(failed_members)}')
-    if processed_count == 0 and not failed_members:
-        await ctx.send(f"No members were affected by the mass role move operation for '{target_role.name}'.")
+    # Runs as a resumable mass job; members that don't need the change are skipped when their page comes up
+    member_ids = sorted({member.id for member in members})
+    status_message = await ctx.send(f"{'Adding' if action == 'add' else 'Removing'} role '{target_role.name}' for {len(member_ids)} member(s) in the background... I'll post a summary when it's done.")
+    create_mass_job("role_list", ctx, status_message, role_id=target_role.id, adding=action == 'add',
+                    member_ids=member_ids, author_name=ctx.author.name, reason=reason)
 
 @bot.command(name='afk', help='Sets your AFK status. The bot will respond when you are mentioned. Usage: {prefix}afk [message]')
 @commands.cooldown(1, 10, commands.BucketType.user)
@@ -2396,6 +5096,7 @@ async def afk(ctx, *, message: str = "No message provided."):
         "time": datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
     }
     save_afk_status()
+    _afk_mention_digests.pop(ctx.author.id, None) # Start a fresh mention digest
 
     embed = discord.Embed(
         title="💤 AFK Status Set!",
@@ -2427,54 +5128,29 @@ async def avatar(ctx, member: discord.Member = None):
 
     await ctx.send(embed=embed)
 
-@bot.command(name='remindme', help='Sets a reminder. Usage: {prefix}remindme <duration> <message> (e.g., 10m, 1h, 2d)')
+@bot.command(name='remindme', help='Sets a reminder. Usage: {prefix}remindme <duration> <message> (e.g., 10m, 1h, 2d, 1d12h)')
 @commands.cooldown(1, 5, commands.BucketType.user)
 async def remindme(ctx, duration: str, *, message: str):
     """
     Sets a reminder for the user after a specified duration.
-    Duration examples: 30s, 5m, 2h, 1d.
+    Duration examples: 30s, 5m, 2h, 1d, 1w, 1d12h.
     """
-    seconds = 0
-    match = re.fullmatch(r'(\d+)([smhd])', duration.lower())
-    if not match:
-        await ctx.send("Invalid duration format. Please use a number followed by 's' (seconds), 'm' (minutes), 'h' (hours), or 'd' (days). E.g., `10m`, `2h`, `3d`.")
+    seconds = _parse_duration(duration)
+    if seconds is None:
+        await ctx.send("Invalid duration format. Please use a number followed by 's' (seconds), 'm' (minutes), 'h' (hours), 'd' (days) or 'w' (weeks). E.g., `10m`, `2h`, `3d`, `1d12h`.")
         return
 
-    value, unit = int(match.group(1)), match.group(2)
-
-    if unit == 's':
-        seconds = value
-    elif unit == 'm':
-        seconds = value * 60
-    elif unit == 'h':
-        seconds = value * 3600
-    elif unit == 'd':
-        seconds = value * 86400
-
     if seconds <= 0:
         await ctx.send("Reminder duration must be positive.")
         return
-    if seconds > 7 * 86400: # Max 7 days reminder to prevent excessive long-running tasks
-        await ctx.send("Reminder duration cannot exceed 7 days.")
+    if seconds > REMINDER_MAX_DAYS * 86400:
+        await ctx.send(f"Reminder duration cannot exceed {REMINDER_MAX_DAYS} days.")
         return
 
     try:
+        # The scheduler persists the reminder, so it survives restarts and nothing waits here
+        schedule_job("reminder", seconds, user_id=ctx.author.id, channel_id=ctx.channel.id, message=message)
         await ctx.send(f"Okay, {ctx.author.mention}, I will remind you in {duration} about: `{message}`.")
-        await asyncio.sleep(seconds)
-        
-        embed = discord.Embed(
-            title="⏰ Reminder!",
-            description=f"You asked me to remind you about: **{message}**",
-            color=discord.Color.gold(),
-            timestamp=datetime.datetime.now(datetime.timezone.utc)
-        )
-        embed.set_footer(text=f"Reminder set by {ctx.author.display_name}")
-        
-        await ctx.author.send(embed=embed) # DM the user
-        if ctx.guild and ctx.author.dm_channel != ctx.channel: # If not in DM, send a confirmation in original channel
-            await ctx.send(f"{ctx.author.mention}, your reminder is ready! I've sent it to your DMs.")
-    except discord.Forbidden:
-        await ctx.send(f"I couldn't send you a DM, {ctx.author.mention}. Please check your privacy settings to allow DMs from server members.")
     except Exception as e:
         await ctx.send(f"An error occurred while setting the reminder: `{e}`")
         print(f"DEBUG: Error in {ctx.prefix}remindme command: {e}")
@@ -2489,7 +5165,7 @@ async def add_role_to_all(ctx, *, role: discord.Role):
     Requires 'Manage Roles' permission.
     Includes a confirmation step.
     """
-    if role >= ctx.author.top_role and ctx.author != ctx.guild.owner:
+    if role >= ctx.author.top_role and ctx.author.id != ctx.guild.owner_id:
         await ctx.send("You cannot assign a role that is equal to or higher than your own.")
         return
     if ctx.guild.me.top_role <= role:
@@ -2503,37 +5179,9 @@ async def add_role_to_all(ctx, *, role: discord.Role):
     if not await _confirm_action(ctx, confirmation_message):
         return
 
-    added_count = 0
-    failed_members = []
-    message = await ctx.send(f"Attempting to add role '{role.name}' to all members... This may take a while.")
-
-    for member in ctx.guild.members:
-        if member.bot or member == ctx.guild.owner or member.top_role >= ctx.guild.me.top_role:
-            # Skip bots, server owner, and members with higher or equal roles than the bot
-            continue
-        if role in member.roles:
-            continue # Skip if already has the role
-
-        try:
-            await member.add_roles(role, reason=f"Mass role add by {ctx.author.name}")
-            added_count += 1
-        except discord.Forbidden:
-            failed_members.append(f"{member.mention} (Bot missing permissions)")
-        except discord.HTTPException as e:
-            failed_members.append(f"{member.mention} (Discord API error: {e})")
-        except Exception as e:
-            failed_members.append(f"{member.mention} (Unexpected error: {e})")
-        await asyncio.sleep(0.1) # Small delay to avoid hitting Discord's rate limits
-
-    await message.delete() # Delete the initial "attempting" message
-
-    if added_count > 0:
-        await ctx.send(f'Successfully added role `{role.name}` to {added_count} member(s).')
-        await log_moderation_action(ctx.guild, "Mass Role Add", role, ctx.author, f"Added role to {added_count} members.")
-    if failed_members:
-        await ctx.send(f'Failed to add role `{role.name}` to: {", ".join(failed_members)}')
-    if added_count == 0 and not failed_members:
-        await ctx.send(f"No members were affected by the mass role add operation for '{role.name}'.")
+    status_message = await ctx.send(f"Adding role '{role.name}' to all members in the background... I'll post a summary when it's done.")
+    job_id = create_mass_job("role_all", ctx, status_message, role_id=role.id, adding=True, author_name=ctx.author.name)
+    await _edit_status(status_message, f"Adding role '{role.name}' to all members in the background (job `{job_id}`; see `{ctx.prefix}massjobs`)... I'll post a summary when it's done.")
 
 @bot.command(name='remove_role_from_all', help='Removes a role from all members in the server. Usage: {prefix}remove_role_from_all <role_name>')
 @commands.has_permissions(manage_roles=True)
@@ -2545,7 +5193,7 @@ async def remove_role_from_all(ctx, *, role: discord.Role):
     Requires 'Manage Roles' permission.
     Includes a confirmation step.
     """
-    if role >= ctx.author.top_role and ctx.author != ctx.guild.owner:
+    if role >= ctx.author.top_role and ctx.author.id != ctx.guild.owner_id:
         await ctx.send("You cannot remove a role that is equal to or higher than your own.")
         return
     if ctx.guild.me.top_role <= role:
@@ -2562,37 +5210,103 @@ async def remove_role_from_all(ctx, *, role: discord.Role):
     if not await _confirm_action(ctx, confirmation_message):
         return
 
-    removed_count = 0
-    failed_members = []
-    message = await ctx.send(f"Attempting to remove role '{role.name}' from all members... This may take a while.")
+    status_message = await ctx.send(f"Removing role '{role.name}' from all members in the background... I'll post a summary when it's done.")
+    job_id = create_mass_job("role_all", ctx, status_message, role_id=role.id, adding=False, author_name=ctx.author.name)
+    await _edit_status(status_message, f"Removing role '{role.name}' from all members in the background (job `{job_id}`; see `{ctx.prefix}massjobs`)... I'll post a summary when it's done.")
 
-    for member in ctx.guild.members:
-        if member.bot or member == ctx.guild.owner or member.top_role >= ctx.guild.me.top_role:
-            # Skip bots, server owner, and members with higher or equal roles than the bot
-            continue
-        if role not in member.roles:
-            continue # Skip if doesn't have the role
+# --- Mass Job Commands ---
 
-        try:
-            await member.remove_roles(role, reason=f"Mass role remove by {ctx.author.name}")
-            removed_count += 1
-        except discord.Forbidden:
-            failed_members.append(f"{member.mention} (Bot missing permissions)")
-        except discord.HTTPException as e:
-            failed_members.append(f"{member.mention} (Discord API error: {e})")
-        except Exception as e:
-            failed_members.append(f"{member.mention} (Unexpected error: {e})")
-        await asyncio.sleep(0.1) # Small delay to avoid hitting Discord's rate limits
+def _find_mass_job(ctx, job_id):
+    """Returns this server's job with the given ID, or None."""
+    job = mass_jobs.get(job_id)
+    return job if job is not None and job["guild_id"] == ctx.guild.id else None
+
+@bot.group(name='massjobs', aliases=['mj'], invoke_without_command=True, help='Lists and controls running mass operations. Usage: {prefix}massjobs [list|pause|resume|cancel] [job_id]')
+@commands.has_permissions(manage_guild=True)
+@commands.guild_only()
+async def massjobs(ctx):
+    """
+    Base command for mass job management. Lists this server's jobs if no subcommand is given.
+    """
+    await massjobs_list(ctx)
+
+@massjobs.command(name='list', help='Lists this server\'s mass operations. Usage: {prefix}massjobs list')
+@commands.has_permissions(manage_guild=True)
+async def massjobs_list(ctx):
+    """Lists running and paused mass jobs with their progress."""
+    jobs = [(job_id, job) for job_id, job in mass_jobs.items() if job["guild_id"] == ctx.guild.id]
+    if not jobs:
+        await ctx.send("There are no mass operations running in this server.")
+        return
 
-    await message.delete() # Delete the initial "attempting" message
+    embed = discord.Embed(
+        title=f"⚙️ Mass Operations ({len(jobs)})",
+        color=discord.Color.blue(),
+        timestamp=datetime.datetime.now(datetime.timezone.utc)
+    )
+    for job_id, job in jobs[:25]: # Embed field limit
+        description = job["params"].get("description")
+        if description is None: # Role change jobs
+            role = ctx.guild.get_role(job["params"].get("role_id", 0))
+            description = f"{'Add' if job['params'].get('adding') else 'Remove'} {f'role {role.name!r}' if role else job['kind']}"
+        embed.add_field(
+            name=f"`{job_id}` - {job['kind']} ({job['state']})",
+            value=(
+                f"{description}, started by <@{job['author_id']}> "
+                f"<t:{int(job['created'])}:R>\n{job['scanned']} scanned, {job['succeeded']} done, {job['failed']} failed"
+            ),
+            inline=False
+        )
+    embed.set_footer(text=f"Use {ctx.prefix}massjobs pause|resume|cancel <job_id>")
+    await ctx.send(embed=embed)
 
-    if removed_count > 0:
-        await ctx.send(f'Successfully removed role `{role.name}` from {removed_count} member(s).')
-        await log_moderation_action(ctx.guild, "Mass Role Remove", role, ctx.author, f"Removed role from {removed_count} members.")
-    if failed_members:
-        await ctx.send(f'Failed to remove role `{role.name}` from: {", ".join(failed_members)}')
-    if removed_count == 0 and not failed_members:
-        await ctx.send(f"No members were affected by the mass role remove operation for '{role.name}'.")
+@massjobs.command(name='pause', help='Pauses a mass operation after its current page. Usage: {prefix}massjobs pause <job_id>')
+@commands.has_permissions(manage_guild=True)
+async def massjobs_pause(ctx, job_id: str):
+    """Pauses a running job; its progress is kept."""
+    job = _find_mass_job(ctx, job_id)
+    if job is None:
+        await ctx.send(f"There is no mass operation `{job_id}` in this server.")
+        return
+    if job["state"] != "running":
+        await ctx.send(f"Mass operation `{job_id}` is not running.")
+        return
+    job["state"] = "paused"
+    _schedule_save(save_mass_jobs)
+    await ctx.send(f"Mass operation `{job_id}` will pause after its current page.")
+
+@massjobs.command(name='resume', help='Resumes a paused mass operation. Usage: {prefix}massjobs resume <job_id>')
+@commands.has_permissions(manage_guild=True)
+async def massjobs_resume(ctx, job_id: str):
+    """Resumes a paused job from its last checkpoint."""
+    job = _find_mass_job(ctx, job_id)
+    if job is None:
+        await ctx.send(f"There is no mass operation `{job_id}` in this server.")
+        return
+    if job["state"] == "cancelled":
+        await ctx.send(f"Mass operation `{job_id}` is being cancelled.")
+        return
+    job["state"] = "running"
+    _schedule_save(save_mass_jobs)
+    _start_mass_job(job_id)
+    await ctx.send(f"Mass operation `{job_id}` resumed.")
+
+@massjobs.command(name='cancel', help='Cancels a mass operation. Usage: {prefix}massjobs cancel <job_id>')
+@commands.has_permissions(manage_guild=True)
+async def massjobs_cancel(ctx, job_id: str):
+    """Cancels a job; changes already made are not undone."""
+    job = _find_mass_job(ctx, job_id)
+    if job is None:
+        await ctx.send(f"There is no mass operation `{job_id}` in this server.")
+        return
+    job["state"] = "cancelled"
+    _schedule_save(save_mass_jobs)
+    if job_id in _mass_job_tasks:
+        await ctx.send(f"Mass operation `{job_id}` will stop after its current page.")
+    else:
+        await _finish_mass_job(job_id, job, None, "cancelled")
+    await log_moderation_action(ctx.guild, "Mass Job Cancelled", f"Mass job {job_id} ({job['kind']})", ctx.author,
+                                f"{job['succeeded']} done before cancelling")
 
 # --- Fun Commands ---
 
@@ -3186,6 +5900,7 @@ async def automod_ignore_role(ctx, action: str, *, role: discord.Role):
     if action == "add":
         if role.id not in automod_settings["automod_ignored_roles"]:
             automod_settings["automod_ignored_roles"].append(role.id)
+            _invalidate_guild_perms() # Exemption flags are cached per member
             await ctx.send(f"Role {role.mention} added to AutoMod ignore list.")
             await log_moderation_action(ctx.guild, "AutoMod Config", role, ctx.author, "Added to ignore list")
         else:
@@ -3193,6 +5908,7 @@ async def automod_ignore_role(ctx, action: str, *, role: discord.Role):
     elif action == "remove":
         if role.id in automod_settings["automod_ignored_roles"]:
             automod_settings["automod_ignored_roles"].remove(role.id)
+            _invalidate_guild_perms() # Exemption flags are cached per member
             await ctx.send(f"Role {role.mention} removed from AutoMod ignore list.")
             await log_moderation_action(ctx.guild, "AutoMod Config", role, ctx.author, "Removed from ignore list")
         else:
@@ -3259,14 +5975,138 @@ async def list_bad_words(ctx):
     embed.set_footer(text=f"Requested by {ctx.author.display_name}")
     await ctx.send(embed=embed)
 
+# --- Auto-Responder Commands ---
+
+@bot.group(name='autoresponder', aliases=['ar'], invoke_without_command=True, help='Manages keyword auto-responses for this server. Usage: {prefix}autoresponder <add|addembed|remove|cooldown|list>')
+@commands.has_permissions(administrator=True)
+@commands.guild_only()
+async def autoresponder(ctx):
+    """
+    Base command for auto-responder management. Shows usage if no subcommand is given.
+    """
+    embed = discord.Embed(
+        title="💬 Auto-Responder",
+        description=(
+            f"`{ctx.prefix}autoresponder add \"<trigger>\" <reply>` - Reply with plain text\n"
+            f"`{ctx.prefix}autoresponder addembed \"<trigger>\" <reply>` - Reply with an embed\n"
+            f"`{ctx.prefix}autoresponder remove <trigger>` - Remove a trigger\n"
+            f"`{ctx.prefix}autoresponder cooldown \"<trigger>\" <seconds>` - Per-channel cooldown\n"
+            f"`{ctx.prefix}autoresponder list` - Show all triggers\n\n"
+            f"Replies may use `{{user}}`, `{{channel}}` and `{{server}}` placeholders."
+        ),
+        color=discord.Color.blue()
+    )
+    await ctx.send(embed=embed)
+
+async def _add_autoresponse(ctx, trigger: str, response: str, use_embed: bool):
+    """Shared logic for the add/addembed subcommands."""
+    trigger = trigger.strip().lower()
+    if not trigger or len(trigger) > 100:
+        await ctx.send("Triggers must be between 1 and 100 characters long.")
+        return
+    if len(response) > 2000:
+        await ctx.send("Auto-responses cannot be longer than 2000 characters.")
+        return
+
+    guild_triggers = autoresponders.setdefault(ctx.guild.id, {})
+    if trigger not in guild_triggers and len(guild_triggers) >= AUTORESPONDER_MAX_TRIGGERS:
+        await ctx.send(f"This server already has the maximum of {AUTORESPONDER_MAX_TRIGGERS} auto-responses.")
+        return
+
+    previous = guild_triggers.get(trigger, {})
+    guild_triggers[trigger] = {
+        "response": response,
+        "embed": use_embed,
+        "cooldown": previous.get("cooldown", AUTORESPONDER_DEFAULT_COOLDOWN)
+    }
+    _invalidate_autoresponder_index(ctx.guild.id)
+    save_autoresponders()
+    await ctx.send(f"Auto-response for `{trigger}` {'updated' if previous else 'added'}.")
+    await log_moderation_action(ctx.guild, "Auto-Responder", "Auto-Responder", ctx.author, f"Set trigger '{trigger}'")
+
+@autoresponder.command(name='add', help='Adds a plain-text auto-response. Usage: {prefix}autoresponder add "<trigger>" <reply>')
+@commands.has_permissions(administrator=True)
+async def autoresponder_add(ctx, trigger: str, *, response: str):
+    """Adds or replaces a trigger that replies with plain text."""
+    await _add_autoresponse(ctx, trigger, response, use_embed=False)
+
+@autoresponder.command(name='addembed', help='Adds an auto-response sent as an embed. Usage: {prefix}autoresponder addembed "<trigger>" <reply>')
+@commands.has_permissions(administrator=True)
+async def autoresponder_addembed(ctx, trigger: str, *, response: str):
+    """Adds or replaces a trigger that replies with an embed."""
+    await _add_autoresponse(ctx, trigger, response, use_embed=True)
+
+@autoresponder.command(name='remove', help='Removes an auto-response. Usage: {prefix}autoresponder remove <trigger>')
+@commands.has_permissions(administrator=True)
+async def autoresponder_remove(ctx, *, trigger: str):
+    """Removes a trigger from this server."""
+    trigger = trigger.strip().strip('"').lower()
+    guild_triggers = autoresponders.get(ctx.guild.id, {})
+    if trigger not in guild_triggers:
+        await ctx.send(f"There is no auto-response for `{trigger}`.")
+        return
+
+    del guild_triggers[trigger]
+    if not guild_triggers:
+        del autoresponders[ctx.guild.id]
+    _invalidate_autoresponder_index(ctx.guild.id)
+    save_autoresponders()
+    await ctx.send(f"Removed the auto-response for `{trigger}`.")
+    await log_moderation_action(ctx.guild, "Auto-Responder", "Auto-Responder", ctx.author, f"Removed trigger '{trigger}'")
+
+@autoresponder.command(name='cooldown', help='Sets how often a trigger may fire per channel. Usage: {prefix}autoresponder cooldown "<trigger>" <seconds>')
+@commands.has_permissions(administrator=True)
+async def autoresponder_cooldown(ctx, trigger: str, seconds: int):
+    """Sets the per-channel cooldown for a trigger (0 disables the cooldown)."""
+    trigger = trigger.strip().lower()
+    guild_triggers = autoresponders.get(ctx.guild.id, {})
+    if trigger not in guild_triggers:
+        await ctx.send(f"There is no auto-response for `{trigger}`.")
+        return
+    if not 0 <= seconds <= 86400:
+        await ctx.send("Cooldown must be between 0 and 86400 seconds (24 hours).")
+        return
+
+    guild_triggers[trigger]["cooldown"] = seconds
+    _invalidate_autoresponder_index(ctx.guild.id)
+    save_autoresponders()
+    await ctx.send(f"Cooldown for `{trigger}` set to {seconds} seconds per channel.")
+
+@autoresponder.command(name='list', help='Lists all auto-responses for this server. Usage: {prefix}autoresponder list')
+@commands.has_permissions(administrator=True)
+async def autoresponder_list(ctx):
+    """Lists the configured triggers for this server."""
+    guild_triggers = autoresponders.get(ctx.guild.id)
+    if not guild_triggers:
+        await ctx.send("This server has no auto-responses configured.")
+        return
+
+    lines = [
+        f"`{trigger}` → {entry['response'][:50]}{'…' if len(entry['response']) > 50 else ''}"
+        f"{' (embed)' if entry.get('embed') else ''}"
+        for trigger, entry in sorted(guild_triggers.items())
+    ]
+    description = "\n".join(lines)
+    if len(description) > 4000: # Embed description limit is 4096 characters
+        description = description[:4000] + "\n…"
+    embed = discord.Embed(
+        title=f"💬 Auto-Responses ({len(guild_triggers)})",
+        description=description,
+        color=discord.Color.blue(),
+        timestamp=datetime.datetime.now(datetime.timezone.utc)
+    )
+    embed.set_footer(text=f"Requested by {ctx.author.display_name}")
+    await ctx.send(embed=embed)
+
 
-@bot.command(name='clear', help='Clears a specified number of messages from the channel. Messages older than 14 days cannot be cleared. Usage: {prefix}clear <amount>')
+@bot.command(name='clear', help='Clears a specified number of messages from the channel, optionally only those among them matching a filter expression (same terms as purge). Messages older than 14 days cannot be cleared. Usage: {prefix}clear <amount> [filters]')
 @commands.has_permissions(manage_messages=True)
 @commands.bot_has_permissions(manage_messages=True)
 @commands.cooldown(1, 5, commands.BucketType.channel)
-async def clear(ctx, amount: int):
+async def clear(ctx, amount: int, *, filters: str = None):
     """
     Clears a specified number of messages from the current channel.
+    With a filter expression, only the matching messages among the last `amount` are cleared.
     Messages older than 14 days cannot be cleared due to Discord API limitations.
     Requires 'Manage Messages' permission for the user and bot.
     Includes a confirmation step.
@@ -3278,7 +6118,16 @@ async def clear(ctx, amount: int):
         await ctx.send("You can clear a maximum of 100 messages at once.")
         return
 
+    try:
+        purge_filter = compile_purge_filter(filters)
+    except ValueError as e:
+        await ctx.send(f"Invalid filter: {e}")
+        return
+    matching = f" matching `{purge_filter.text}`" if purge_filter.text else ""
+
     confirmation_message = f"Are you sure you want to clear {amount} messages in this channel? (Note: Discord only allows bulk deletion of messages up to 14 days old.)"
+    if matching:
+        confirmation_message = f"Are you sure you want to clear the messages{matching} among the last {amount} in this channel? (Note: Discord only allows bulk deletion of messages up to 14 days old.)"
     if not await _confirm_action(ctx, confirmation_message):
         return
 
@@ -3286,7 +6135,9 @@ async def clear(ctx, amount: int):
         # Fetch messages, including the command message itself.
         # The `before` parameter ensures we only fetch messages up to the current time.
         # The `limit` is `amount + 1` to also delete the command message itself.
-        deleted = await ctx.channel.purge(limit=amount + 1, before=datetime.datetime.now(datetime.timezone.utc))
+        _boost_message_cache(ctx.channel.id)
+        deleted = await ctx.channel.purge(limit=amount + 1, before=datetime.datetime.now(datetime.timezone.utc),
+                                          check=lambda message: message.id == ctx.message.id or purge_filter.matches(message))
         
         # Adjust count if the command message was among those deleted
         actual_deleted_count = len(deleted)
@@ -3297,7 +6148,7 @@ async def clear(ctx, amount: int):
             actual_deleted_count = 0
 
         await ctx.send(f'Successfully cleared {actual_deleted_count} messages.', delete_after=5)
-        await log_moderation_action(ctx.guild, "Clear Messages", ctx.channel, ctx.author, f"{actual_deleted_count} messages cleared")
+        await log_moderation_action(ctx.guild, "Clear Messages", ctx.channel, ctx.author, f"{actual_deleted_count} messages{matching} cleared")
     except discord.Forbidden:
         await ctx.send(f"I don't have permission to manage messages in this channel. Please ensure I have the 'Manage Messages' permission.")
         print(f"DEBUG: Bot missing permissions to clear messages in channel {ctx.channel.name}.")
@@ -3326,10 +6177,10 @@ async def punish(ctx, member: discord.Member, punishment_type: str, duration_or_
 
     # --- Handle Kick ---
     if punishment_type == 'kick':
-        if not ctx.author.guild_permissions.kick_members:
+        if not _cached_guild_permissions(ctx.author).kick_members:
             await ctx.send("You don't have permission to kick members.")
             return
-        if not ctx.guild.me.guild_permissions.kick_members:
+        if not _cached_guild_permissions(ctx.guild.me).kick_members:
             await ctx.send("I don't have permission to kick members.")
             return
         
@@ -3351,10 +6202,10 @@ async def punish(ctx, member: discord.Member, punishment_type: str, duration_or_
 
     # --- Handle Ban ---
     elif punishment_type == 'ban':
-        if not ctx.author.guild_permissions.ban_members:
+        if not _cached_guild_permissions(ctx.author).ban_members:
             await ctx.send("You don't have permission to ban members.")
             return
-        if not ctx.guild.me.guild_permissions.ban_members:
+        if not _cached_guild_permissions(ctx.guild.me).ban_members:
             await ctx.send("I don't have permission to ban members.")
             return
         
@@ -3387,10 +6238,10 @@ async def punish(ctx, member: discord.Member, punishment_type: str, duration_or_
 
     # --- Handle Timeout ---
     elif punishment_type == 'timeout':
-        if not ctx.author.guild_permissions.moderate_members:
+        if not _cached_guild_permissions(ctx.author).moderate_members:
             await ctx.send("You don't have permission to timeout members.")
             return
-        if not ctx.guild.me.guild_permissions.moderate_members:
+        if not _cached_guild_permissions(ctx.guild.me).moderate_members:
             await ctx.send("I don't have permission to timeout members.")
             return
 
@@ -3447,7 +6298,31 @@ async def punish(ctx, member: discord.Member, punishment_type: str, duration_or_
         await ctx.send("Invalid punishment type. Please choose from `kick`, `ban`, or `timeout`.")
 
 
+# Instrument handlers (if SLOW_STEP_TRACING is on) once every event and command above has been registered
+_instrument_slow_steps()
+
+async def main():
+    """
+    Runs the bot until it disconnects, then stops the web server with it.
+    The web server itself is started from setup_hook so it shares the bot's event loop.
+    """
+    async with bot:
+        try:
+            await bot.start(DISCORD_BOT_TOKEN)
+        finally:
+            await stop_web_server()
+
 # Run the bot with your token
 if __name__ == '__main__':
-    keep_alive() # Start the web server to keep the bot alive on hosting platforms
-    bot.run(DISCORD_BOT_TOKEN)
+    discord.utils.setup_logging() # bot.run() used to do this for us
+    set_metrics_provider(render_metrics) # Serve bot metrics on /metrics
+    set_health_provider(health_report) # Serve /healthz and /readyz
+    register_admin_resource('guild_warnings', _api_guild_warnings) # Read-only admin API
+    register_admin_resource('user_warnings', _api_user_warnings)
+    register_admin_resource('afk', _api_afk)
+    register_admin_resource('automod', _api_automod)
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    flush_dirty_stores_now() # Persist anything still pending once the bot has shut down
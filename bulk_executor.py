@@ -0,0 +1,243 @@
+# bulk_executor.py
+"""
+Bounded, adaptive-concurrency executor for bulk API operations (mass role changes, bans, ...).
+
+Discord rate limits each route bucket separately and reports the bucket's state in response
+headers. RateLimitObserver collects those headers from every HTTP response through an aiohttp
+TraceConfig, and BulkExecutor uses them to decide how many operations to keep in flight:
+it grows concurrency while the bucket has headroom, halves it on 429s, and pauses every worker
+until the bucket resets when it runs dry. This module has no discord.py dependency, so the
+operation is just a coroutine function called once per item.
+"""
+import asyncio
+import time
+
+import aiohttp
+
+# Path segments whose following ID is a "major parameter": Discord keeps separate buckets per value
+_MAJOR_PARAMETERS = ('guilds', 'channels', 'webhooks')
+
+
+class _BucketState:
+    """Last known state of one route's rate limit bucket."""
+    __slots__ = ('limit', 'remaining', 'reset_at', 'last_429')
+
+    def __init__(self):
+        self.limit = None
+        self.remaining = None
+        self.reset_at = 0.0
+        self.last_429 = 0.0
+
+
+class RateLimitObserver:
+    """Tracks rate limit headers per route from every response the HTTP client sees."""
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._routes = {} # route key -> _BucketState
+        self.global_reset_at = 0.0
+        self.total_429s = 0
+
+    @staticmethod
+    def route_key(method, path):
+        """
+        Normalizes a request to its route: IDs become ':id' except major parameters, so
+        PUT /api/v10/guilds/1/members/2/roles/3 -> 'PUT /guilds/1/members/:id/roles/:id'.
+        """
+        segments = path.split('/')
+        if len(segments) > 2 and segments[1] == 'api' and segments[2].startswith('v'):
+            segments = [''] + segments[3:]
+        for i, segment in enumerate(segments):
+            if segment.isdigit() and not (i > 0 and segments[i - 1] in _MAJOR_PARAMETERS):
+                segments[i] = ':id'
+        return f"{method.upper()} {'/'.join(segments)}"
+
+    def observe(self, method, path, status, headers):
+        """Records one response's rate limit headers."""
+        now = self._clock()
+        key = self.route_key(method, path)
+        state = self._routes.get(key)
+        if state is None:
+            state = self._routes[key] = _BucketState()
+        try:
+            if 'X-RateLimit-Limit' in headers:
+                state.limit = int(headers['X-RateLimit-Limit'])
+                state.remaining = int(headers.get('X-RateLimit-Remaining', state.limit))
+                state.reset_at = now + float(headers.get('X-RateLimit-Reset-After', 0))
+            if status == 429:
+                self.total_429s += 1
+                state.last_429 = now
+                retry_after = float(headers.get('Retry-After', 1))
+                if headers.get('X-RateLimit-Global'):
+                    self.global_reset_at = now + retry_after
+                else:
+                    state.remaining = 0
+                    state.reset_at = max(state.reset_at, now + retry_after)
+        except ValueError:
+            pass # Malformed header; keep the previous state
+
+    def state(self, route_key):
+        """Returns the last known bucket state for a route, or None if it hasn't been seen yet."""
+        return self._routes.get(route_key)
+
+    def trace_config(self):
+        """An aiohttp TraceConfig that feeds every response into this observer."""
+        async def on_request_end(session, context, params):
+            self.observe(params.method, params.url.path, params.response.status, params.response.headers)
+
+        trace = aiohttp.TraceConfig()
+        trace.on_request_end.append(on_request_end)
+        return trace
+
+
+class BulkResult:
+    """Outcome of a bulk run. `failures` holds (item, error message) pairs."""
+    __slots__ = ('total', 'succeeded', 'failures', 'elapsed')
+
+    def __init__(self, total):
+        self.total = total
+        self.succeeded = 0
+        self.failures = []
+        self.elapsed = 0.0
+
+    @property
+    def failed(self):
+        return len(self.failures)
+
+
+class BulkExecutor:
+    """
+    Runs `operation(item)` for every item with bounded, adaptive concurrency.
+
+    The operation succeeds by returning and fails by raising; failures are collected, never
+    raised. If `route` (a RateLimitObserver.route_key) and an observer are given, concurrency
+    follows that route's bucket; otherwise it backs off whenever calls get slow. `progress`
+    is an optional coroutine function called with a snapshot dict at most once per
+    `progress_interval` seconds while the run is going.
+    """
+
+    SLOW_CALL = 1.0 # Seconds; a call this slow most likely waited on a bucket
+
+    def __init__(self, operation, *, route=None, observer=None, max_concurrency=8, initial_concurrency=2,
+                 progress=None, progress_interval=5.0, clock=time.monotonic):
+        self._operation = operation
+        self._route = route
+        self._observer = observer
+        self._max = max(1, max_concurrency)
+        self._limit = max(1, min(initial_concurrency, self._max))
+        self._progress = progress
+        self._progress_interval = progress_interval
+        self._clock = clock
+        self._active = 0
+        self._resume_at = 0.0
+        self._streak = 0 # Successes since the last concurrency change
+        self._condition = asyncio.Condition()
+        self._cancelled = False
+        self._result = None
+        self._started = 0.0
+        self._last_progress = 0.0
+        self._reporting = False
+
+    @property
+    def concurrency(self):
+        return self._limit
+
+    def cancel(self):
+        """Stops handing out new items; calls already in flight finish."""
+        self._cancelled = True
+
+    def snapshot(self):
+        """Current progress as a plain dict."""
+        result = self._result
+        return {
+            "total": result.total if result else 0,
+            "done": (result.succeeded + result.failed) if result else 0,
+            "succeeded": result.succeeded if result else 0,
+            "failed": result.failed if result else 0,
+            "concurrency": self._limit,
+            "elapsed": self._clock() - self._started if self._started else 0.0,
+        }
+
+    async def run(self, items):
+        """Processes every item and returns a BulkResult."""
+        items = list(items)
+        self._result = BulkResult(len(items))
+        self._started = self._last_progress = self._clock()
+        iterator = iter(items)
+        workers = [asyncio.create_task(self._worker(iterator)) for _ in range(min(self._max, len(items)))]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+        self._result.elapsed = self._clock() - self._started
+        return self._result
+
+    async def _worker(self, iterator):
+        while not self._cancelled:
+            await self._acquire()
+            try:
+                item = next(iterator, _DONE)
+                if item is _DONE:
+                    return
+                started = self._clock()
+                try:
+                    await self._operation(item)
+                    self._result.succeeded += 1
+                    failed = False
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self._result.failures.append((item, f"{type(e).__name__}: {e}"))
+                    failed = True
+                self._adapt(started, self._clock() - started, failed)
+            finally:
+                await self._release()
+            await self._maybe_report()
+
+    async def _acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._active < self._limit)
+            self._active += 1
+        delay = max(self._resume_at, self._observer.global_reset_at if self._observer else 0.0) - self._clock()
+        if delay > 0:
+            await asyncio.sleep(delay) # Bucket (or global limit) exhausted; wait for the reset
+
+    async def _release(self):
+        async with self._condition:
+            self._active -= 1
+            self._condition.notify_all()
+
+    def _adapt(self, started, duration, failed):
+        """Adjusts concurrency after a call: multiplicative decrease, additive increase."""
+        state = self._observer.state(self._route) if (self._observer and self._route) else None
+        hit_429 = state is not None and state.last_429 >= started
+        if hit_429 or duration >= self.SLOW_CALL:
+            self._limit = max(1, self._limit // 2)
+            self._streak = 0
+        elif not failed:
+            self._streak += 1
+            headroom = state is None or state.remaining is None or state.remaining > self._limit
+            if headroom and self._streak >= self._limit * 2 and self._limit < self._max:
+                self._limit += 1
+                self._streak = 0
+        if state is not None and state.remaining == 0 and state.reset_at > self._clock():
+            self._resume_at = max(self._resume_at, state.reset_at)
+
+    async def _maybe_report(self):
+        if not self._progress or self._reporting:
+            return
+        now = self._clock()
+        if now - self._last_progress < self._progress_interval:
+            return
+        self._last_progress = now
+        self._reporting = True
+        try:
+            await self._progress(self.snapshot())
+        except Exception as e:
+            print(f"DEBUG: Bulk progress callback failed: {e}")
+        finally:
+            self._reporting = False
+
+
+_DONE = object()
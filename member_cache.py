@@ -0,0 +1,118 @@
+# member_cache.py
+"""
+Bounded cache of recently seen guild members, for running with discord.py's member cache off.
+
+With the members intent and the default cache policy discord.py keeps every member of every
+guild in memory, although most of them never interact with the bot. RecentMemberCache keeps
+only members the bot has seen recently (per-guild LRU with a TTL) plus members holding one of
+a set of pinned roles, which never expire. Anything else is looked up on demand by the caller.
+Entries are whatever member objects the caller hands in; only `.id`, `.guild.id` and
+`.get_role(role_id)` are used.
+"""
+import collections
+import time
+
+
+class RecentMemberCache:
+    """
+    Recently seen members per guild, evicted least recently seen first once a guild holds
+    `max_per_guild` of them or they haven't been seen for `ttl` seconds. `on_evict(guild_id,
+    user_id)` is called for every member that leaves the cache, so derived caches can follow.
+    """
+
+    def __init__(self, ttl=900.0, max_per_guild=5000, pinned_role_ids=(), on_evict=None, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_per_guild = max_per_guild
+        self.pinned_role_ids = frozenset(pinned_role_ids)
+        self._on_evict = on_evict
+        self._clock = clock
+        self._recent = {} # guild_id -> OrderedDict(user_id -> (member, last seen)), oldest first
+        self._pinned = {} # guild_id -> {user_id: member}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._recent.values()) + sum(len(entries) for entries in self._pinned.values())
+
+    def is_pinned_member(self, member):
+        """True if the member holds one of the pinned roles."""
+        return any(member.get_role(role_id) for role_id in self.pinned_role_ids)
+
+    def remember(self, member):
+        """Records a sighting of `member` and returns the entry it replaced, or None."""
+        guild_id = member.guild.id
+        now = self._clock()
+        if self.pinned_role_ids and self.is_pinned_member(member):
+            previous = self._pinned.setdefault(guild_id, {}).get(member.id)
+            self._pinned[guild_id][member.id] = member
+            recent = self._recent.get(guild_id)
+            entry = recent.pop(member.id, None) if recent else None # Moves from recent to pinned
+            return previous or (entry[0] if entry else None)
+
+        previous = self._pinned.get(guild_id, {}).pop(member.id, None) # Lost its pinned role
+        recent = self._recent.get(guild_id)
+        if recent is None:
+            recent = self._recent[guild_id] = collections.OrderedDict()
+        entry = recent.pop(member.id, None)
+        if entry is not None:
+            previous = entry[0]
+        recent[member.id] = (member, now)
+        self._evict(guild_id, recent, now)
+        return previous
+
+    def get(self, guild_id, user_id):
+        """The cached member, or None if it was never seen, expired or evicted."""
+        member = self._pinned.get(guild_id, {}).get(user_id)
+        if member is not None:
+            self.hits += 1
+            return member
+        recent = self._recent.get(guild_id)
+        entry = recent.get(user_id) if recent else None
+        if entry is None or self._clock() - entry[1] >= self.ttl:
+            if entry is not None:
+                self._drop(guild_id, recent, user_id)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0]
+
+    def forget(self, guild_id, user_id):
+        """Drops a member, e.g. because they left the guild."""
+        if self._pinned.get(guild_id, {}).pop(user_id, None) is not None and self._on_evict:
+            self._on_evict(guild_id, user_id)
+        recent = self._recent.get(guild_id)
+        if recent and user_id in recent:
+            self._drop(guild_id, recent, user_id)
+
+    def forget_guild(self, guild_id):
+        """Drops every member of a guild."""
+        self._recent.pop(guild_id, None)
+        self._pinned.pop(guild_id, None)
+
+    def pinned_members(self, guild_id):
+        """The guild's cached holders of pinned roles."""
+        return list(self._pinned.get(guild_id, {}).values())
+
+    def replace_pinned(self, guild_id, members):
+        """Replaces a guild's pinned members with the pinned-role holders among `members` (any iterable)."""
+        pinned = {member.id: member for member in members if self.is_pinned_member(member)}
+        for user_id in self._pinned.get(guild_id, {}).keys() - pinned.keys():
+            if self._on_evict:
+                self._on_evict(guild_id, user_id)
+        self._pinned[guild_id] = pinned
+        return len(pinned)
+
+    def _evict(self, guild_id, recent, now):
+        """Drops the least recently seen entries while the guild is over size or they have expired."""
+        while recent:
+            user_id, (member, seen_at) = next(iter(recent.items()))
+            if len(recent) <= self.max_per_guild and now - seen_at < self.ttl:
+                break
+            self._drop(guild_id, recent, user_id)
+
+    def _drop(self, guild_id, recent, user_id):
+        del recent[user_id]
+        self.evictions += 1
+        if self._on_evict:
+            self._on_evict(guild_id, user_id)
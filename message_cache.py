@@ -0,0 +1,157 @@
+# message_cache.py
+"""
+Message cache with one global memory budget, shared between channels by how active they are.
+
+discord.py's built-in cache is a single deque of the last N messages across every guild, so
+a few busy channels push everything else out and the cache size says nothing about memory.
+BudgetedMessageCache keeps messages per channel and tracks an estimate of their size. Each
+channel has a heat score that grows with traffic and, much faster, with moderation activity
+(purges, reaction confirmations), and decays with a half-life. When the estimate goes
+over the budget, each channel is trimmed towards its heat-proportional share, oldest messages
+and coldest channels first. Hit and miss counts are kept so the budget can be tuned.
+"""
+import collections
+import time
+
+MESSAGE_BASE_BYTES = 1400 # A discord.py Message plus its author Member (measured with tracemalloc)
+EMBED_BYTES = 1000 # Rough cost of one parsed embed
+ATTACHMENT_BYTES = 500 # Rough cost of one parsed attachment
+
+
+def estimate_message_size(message):
+    """Approximate memory held by a cached message, in bytes."""
+    return (MESSAGE_BASE_BYTES + len(message.content or "")
+            + EMBED_BYTES * len(message.embeds) + ATTACHMENT_BYTES * len(message.attachments))
+
+
+class _ChannelEntry:
+    """Cached messages of one channel, oldest first, plus the channel's heat."""
+    __slots__ = ('messages', 'bytes', 'heat', 'heat_at')
+
+    def __init__(self, now):
+        self.messages = collections.OrderedDict() # message_id -> (message, size)
+        self.bytes = 0
+        self.heat = 0.0
+        self.heat_at = now
+
+
+class BudgetedMessageCache:
+    """
+    Per-channel message cache under a global byte budget.
+
+    `add` counts as 1 heat for the channel and `boost` as `weight`; heat halves every
+    `half_life` seconds. Trimming stops at `budget_bytes * (1 - slack)` so it runs in batches
+    rather than on every message once the cache is full.
+    """
+
+    def __init__(self, budget_bytes, half_life=600.0, slack=0.05, size_of=estimate_message_size, clock=time.monotonic):
+        self.budget_bytes = budget_bytes
+        self.half_life = half_life
+        self.slack = slack
+        self._size_of = size_of
+        self._clock = clock
+        self._channels = {} # channel_id -> _ChannelEntry
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return sum(len(entry.messages) for entry in self._channels.values())
+
+    def _heat(self, entry, now):
+        if now != entry.heat_at:
+            entry.heat *= 0.5 ** ((now - entry.heat_at) / self.half_life)
+            entry.heat_at = now
+        return entry.heat
+
+    def _entry(self, channel_id, now):
+        entry = self._channels.get(channel_id)
+        if entry is None:
+            entry = self._channels[channel_id] = _ChannelEntry(now)
+        return entry
+
+    def add(self, message):
+        """Caches a new or edited message, trimming the cache if it is over budget."""
+        now = self._clock()
+        entry = self._entry(message.channel.id, now)
+        old = entry.messages.pop(message.id, None)
+        if old is not None:
+            entry.bytes -= old[1]
+            self.bytes -= old[1]
+        size = self._size_of(message)
+        entry.messages[message.id] = (message, size)
+        entry.bytes += size
+        self.bytes += size
+        entry.heat = self._heat(entry, now) + 1
+        if self.bytes > self.budget_bytes:
+            self._trim(now)
+
+    def get(self, channel_id, message_id):
+        """Returns a cached message or None, counting the hit or miss."""
+        entry = self._channels.get(channel_id)
+        cached = entry.messages.get(message_id) if entry else None
+        if cached is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return cached[0]
+
+    def remove(self, channel_id, message_id):
+        """Drops a deleted message."""
+        entry = self._channels.get(channel_id)
+        cached = entry.messages.pop(message_id, None) if entry else None
+        if cached is not None:
+            entry.bytes -= cached[1]
+            self.bytes -= cached[1]
+            if not entry.messages:
+                del self._channels[channel_id]
+
+    def remove_channel(self, channel_id):
+        """Drops everything cached for a deleted channel."""
+        entry = self._channels.pop(channel_id, None)
+        if entry is not None:
+            self.bytes -= entry.bytes
+
+    def boost(self, channel_id, weight=50.0):
+        """Marks moderation activity in a channel so it keeps a larger share of the budget."""
+        now = self._clock()
+        entry = self._entry(channel_id, now)
+        entry.heat = self._heat(entry, now) + weight
+
+    def stats(self):
+        """Current size, budget and lookup counts as a plain dict."""
+        lookups = self.hits + self.misses
+        return {
+            "bytes": self.bytes,
+            "budget_bytes": self.budget_bytes,
+            "messages": len(self),
+            "channels": len(self._channels),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+    def _trim(self, now):
+        """Evicts oldest messages, coldest channels first, until under the budget minus slack."""
+        target = self.budget_bytes * (1 - self.slack)
+        heats = {channel_id: self._heat(entry, now) for channel_id, entry in self._channels.items()}
+        total_heat = sum(heats.values()) or 1.0
+        # Coldest per byte first; each channel is first cut down to its heat-proportional share
+        order = sorted(self._channels, key=lambda channel_id: heats[channel_id] / max(1, self._channels[channel_id].bytes))
+        for proportional in (True, False):
+            for channel_id in order:
+                entry = self._channels.get(channel_id)
+                if entry is None:
+                    continue
+                share = self.budget_bytes * heats[channel_id] / total_heat if proportional else 0
+                while entry.messages and entry.bytes > share and self.bytes > target:
+                    _, (_, size) = entry.messages.popitem(last=False)
+                    entry.bytes -= size
+                    self.bytes -= size
+                    self.evictions += 1
+                if not entry.messages:
+                    del self._channels[channel_id]
+                if self.bytes <= target:
+                    return
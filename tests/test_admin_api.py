@@ -0,0 +1,213 @@
+# tests/test_admin_api.py
+"""
+Admin API routes from webserver.py, served by create_app(): first with canned providers for the
+routing, pagination and ETag handling, then with bot.py's own providers over seeded stores.
+"""
+import os
+import sys
+import types
+from unittest import mock
+
+from aiohttp.test_utils import AioHTTPTestCase
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bot # noqa: E402
+import webserver # noqa: E402
+
+GUILD_ID = 1234
+WARNINGS = [{"user_id": user_id, "count": 10 - user_id} for user_id in range(1, 8)] # 7 entries
+
+
+class AdminApiTest(AioHTTPTestCase):
+    async def get_application(self):
+        self.version = 1
+        webserver.ADMIN_API_TOKEN = None # Local requests only, which is what the test client sends
+        webserver.register_admin_resource(
+            'guild_warnings', lambda guild_id: (self.version, WARNINGS) if guild_id == GUILD_ID else None)
+        webserver.register_admin_resource('automod', lambda: (self.version, {"spam_threshold": 5}))
+        return webserver.create_app()
+
+    async def asyncTearDown(self):
+        webserver._admin_resources.clear()
+        await super().asyncTearDown()
+
+    async def test_paginates_list_resources(self):
+        response = await self.client.get(f'/api/guilds/{GUILD_ID}/warnings', params={'page': 2, 'per_page': 3})
+        self.assertEqual(response.status, 200)
+        body = await response.json()
+        self.assertEqual(body["items"], WARNINGS[3:6])
+        self.assertEqual((body["page"], body["per_page"], body["total"], body["pages"]), (2, 3, 7, 3))
+
+        response = await self.client.get(f'/api/guilds/{GUILD_ID}/warnings', params={'page': 3, 'per_page': 3})
+        self.assertEqual((await response.json())["items"], WARNINGS[6:])
+
+    async def test_default_page_size(self):
+        response = await self.client.get(f'/api/guilds/{GUILD_ID}/warnings')
+        body = await response.json()
+        self.assertEqual(body["per_page"], webserver.ADMIN_API_DEFAULT_PAGE_SIZE)
+        self.assertEqual(body["items"], WARNINGS)
+
+    async def test_non_list_resources_are_returned_as_is(self):
+        response = await self.client.get('/api/automod')
+        self.assertEqual(await response.json(), {"spam_threshold": 5})
+
+    async def test_matching_if_none_match_is_not_modified(self):
+        response = await self.client.get(f'/api/guilds/{GUILD_ID}/warnings')
+        etag = response.headers['ETag']
+
+        response = await self.client.get(f'/api/guilds/{GUILD_ID}/warnings', headers={'If-None-Match': etag})
+        self.assertEqual(response.status, 304)
+        self.assertEqual(response.headers['ETag'], etag)
+
+    async def test_etag_changes_with_version_and_page(self):
+        response = await self.client.get(f'/api/guilds/{GUILD_ID}/warnings')
+        etag = response.headers['ETag']
+
+        response = await self.client.get(f'/api/guilds/{GUILD_ID}/warnings', params={'page': 2, 'per_page': 3},
+                                         headers={'If-None-Match': etag})
+        self.assertEqual(response.status, 200)
+
+        self.version += 1
+        response = await self.client.get(f'/api/guilds/{GUILD_ID}/warnings', headers={'If-None-Match': etag})
+        self.assertEqual(response.status, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    async def test_unknown_guild_is_not_found(self):
+        response = await self.client.get('/api/guilds/999/warnings')
+        self.assertEqual(response.status, 404)
+
+    async def test_bad_page_parameters_are_rejected(self):
+        for params in ({'page': 0}, {'page': 'two'}, {'per_page': 0},
+                       {'per_page': webserver.ADMIN_API_MAX_PAGE_SIZE + 1}):
+            with self.subTest(params=params):
+                response = await self.client.get(f'/api/guilds/{GUILD_ID}/warnings', params=params)
+                self.assertEqual(response.status, 400)
+
+    async def test_unregistered_resource_is_unavailable(self):
+        response = await self.client.get('/api/afk')
+        self.assertEqual(response.status, 503)
+
+    async def test_token_is_required_when_configured(self):
+        webserver.ADMIN_API_TOKEN = "secret"
+        try:
+            response = await self.client.get('/api/automod')
+            self.assertEqual(response.status, 401)
+            response = await self.client.get('/api/automod', headers={'Authorization': 'Bearer secret'})
+            self.assertEqual(response.status, 200)
+        finally:
+            webserver.ADMIN_API_TOKEN = None
+
+
+# Snowflakes above 2**53, which a JavaScript client can't hold as numbers
+ALICE, BOB, CAROL = 712345678901234567, 712345678901234568, 712345678901234569
+CHANNEL_ID, ROLE_ID = 812345678901234567, 912345678901234567
+
+
+class AdminApiStoreTest(AioHTTPTestCase):
+    """The bot's admin providers, registered as bot.py does, over seeded stores."""
+
+    async def get_application(self):
+        webserver.ADMIN_API_TOKEN = None
+        self._saved = {name: dict(getattr(bot, name)) for name in ('user_warnings', 'afk_status', 'automod_settings')}
+        bot.user_warnings.clear()
+        bot.user_warnings.update({ALICE: ["spam"], BOB: ["spam", "links", "caps"], CAROL: ["left the server"]})
+        bot.afk_status.clear()
+        bot.afk_status.update({BOB: {"message": "lunch", "time": "2026-01-01 12:00:00 UTC"}})
+        bot.automod_settings.clear()
+        bot.automod_settings.update({"anti_invite_enabled": True, "automod_ignored_channels": [CHANNEL_ID],
+                                     "automod_ignored_roles": [ROLE_ID]})
+        bot._guild_warning_index.clear()
+
+        members = {ALICE: "alice", BOB: "bob"} # CAROL has warnings but isn't in the guild
+        self.guild = types.SimpleNamespace(member_count=2, get_member=lambda user_id: members.get(user_id))
+        get_guild = mock.patch.object(bot.bot, 'get_guild', lambda guild_id: self.guild if guild_id == GUILD_ID else None)
+        get_guild.start()
+        self.addCleanup(get_guild.stop)
+
+        webserver.register_admin_resource('guild_warnings', bot._api_guild_warnings)
+        webserver.register_admin_resource('user_warnings', bot._api_user_warnings)
+        webserver.register_admin_resource('afk', bot._api_afk)
+        webserver.register_admin_resource('automod', bot._api_automod)
+        return webserver.create_app()
+
+    async def asyncTearDown(self):
+        webserver._admin_resources.clear()
+        for name, saved in self._saved.items():
+            getattr(bot, name).clear()
+            getattr(bot, name).update(saved)
+        bot._dirty_stores.clear() # Nothing here should be written to disk
+        await super().asyncTearDown()
+
+    async def test_guild_warnings(self):
+        response = await self.client.get(f'/api/guilds/{GUILD_ID}/warnings')
+        self.assertEqual(response.status, 200)
+        body = await response.json()
+        self.assertEqual(body["items"], [
+            {"user_id": str(BOB), "name": "bob", "count": 3, "warnings": ["spam", "links", "caps"]},
+            {"user_id": str(ALICE), "name": "alice", "count": 1, "warnings": ["spam"]},
+        ])
+        self.assertEqual(body["total"], 2)
+
+    async def test_unknown_guild_is_not_found(self):
+        response = await self.client.get('/api/guilds/999/warnings')
+        self.assertEqual(response.status, 404)
+
+    async def test_user_warnings(self):
+        response = await self.client.get(f'/api/users/{BOB}/warnings', params={'per_page': 2})
+        body = await response.json()
+        self.assertEqual(body["items"], [{"number": 1, "reason": "spam"}, {"number": 2, "reason": "links"}])
+        self.assertEqual(body["pages"], 2)
+
+    async def test_afk(self):
+        response = await self.client.get('/api/afk')
+        body = await response.json()
+        self.assertEqual(body["items"], [{"user_id": str(BOB), "message": "lunch", "since": "2026-01-01 12:00:00 UTC"}])
+
+    async def test_automod_ids_are_strings(self):
+        response = await self.client.get('/api/automod')
+        body = await response.json()
+        self.assertTrue(body["anti_invite_enabled"])
+        self.assertEqual(body["automod_ignored_channels"], [str(CHANNEL_ID)])
+        self.assertEqual(body["automod_ignored_roles"], [str(ROLE_ID)])
+
+    async def test_etag_follows_store_versions(self):
+        response = await self.client.get(f'/api/guilds/{GUILD_ID}/warnings')
+        etag = response.headers['ETag']
+        response = await self.client.get(f'/api/guilds/{GUILD_ID}/warnings', headers={'If-None-Match': etag})
+        self.assertEqual(response.status, 304)
+
+        bot.user_warnings[ALICE].append("caps")
+        bot._schedule_save(bot.save_warnings) # How commands record a change; bumps store_versions
+        response = await self.client.get(f'/api/guilds/{GUILD_ID}/warnings', headers={'If-None-Match': etag})
+        self.assertEqual(response.status, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual((await response.json())["items"][1]["count"], 2)
+
+    async def test_etag_changes_when_membership_does(self):
+        response = await self.client.get(f'/api/guilds/{GUILD_ID}/warnings')
+        etag = response.headers['ETag']
+        self.guild.member_count = 3
+        response = await self.client.get(f'/api/guilds/{GUILD_ID}/warnings', headers={'If-None-Match': etag})
+        self.assertEqual(response.status, 200)
+
+    async def test_other_stores_keep_their_etag(self):
+        response = await self.client.get('/api/afk')
+        etag = response.headers['ETag']
+        bot._schedule_save(bot.save_warnings)
+        response = await self.client.get('/api/afk', headers={'If-None-Match': etag})
+        self.assertEqual(response.status, 304)
+
+        bot.afk_status.pop(BOB)
+        bot._schedule_save(bot.save_afk_status)
+        response = await self.client.get('/api/afk', headers={'If-None-Match': etag})
+        self.assertEqual(response.status, 200)
+        self.assertEqual((await response.json())["items"], [])
+
+    async def test_lazy_mode_resolves_uncached_members(self):
+        async def resolve_members(guild, user_ids):
+            return {user_id: name for user_id, name in ((ALICE, "alice"), (BOB, "bob")) if user_id in user_ids}
+
+        with mock.patch.object(bot, 'LAZY_MEMBER_CACHE', True), mock.patch.object(bot, 'resolve_members', resolve_members):
+            response = await self.client.get(f'/api/guilds/{GUILD_ID}/warnings')
+        body = await response.json()
+        self.assertEqual([item["name"] for item in body["items"]], ["bob", "alice"])
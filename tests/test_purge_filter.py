@@ -0,0 +1,59 @@
+# tests/test_purge_filter.py
+"""
+Purge filter expressions from bot.py: parsing, the normalized text jobs store, and the regex:
+guard against patterns that would stall the event loop.
+"""
+import os
+import sys
+import types
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bot # noqa: E402
+
+
+def _message(content="", author_id=1, is_bot=False, message_id=100):
+    author = types.SimpleNamespace(id=author_id, bot=is_bot)
+    return types.SimpleNamespace(id=message_id, content=content, author=author, attachments=[], embeds=[], pinned=False)
+
+
+class PurgeFilterTest(unittest.TestCase):
+    def test_terms_combine(self):
+        purge_filter = bot.compile_purge_filter('bots contains:nitro !from:5')
+        self.assertTrue(purge_filter.matches(_message("free NITRO here", author_id=2, is_bot=True)))
+        self.assertFalse(purge_filter.matches(_message("free nitro", author_id=5, is_bot=True)))
+        self.assertFalse(purge_filter.matches(_message("free nitro", author_id=2)))
+
+    def test_message_id_bounds(self):
+        purge_filter = bot.compile_purge_filter('after:10 before:50 before:40')
+        self.assertEqual((purge_filter.after, purge_filter.before), (10, 40))
+        self.assertTrue(purge_filter.matches(_message(message_id=20)))
+        self.assertFalse(purge_filter.matches(_message(message_id=40)))
+
+    def test_text_compiles_back_to_the_same_filter(self):
+        for expression in ('contains:"it\'s"', 'regex:"free\\s+nitro" !pinned', '"contains:a b" links', 'bots'):
+            with self.subTest(expression=expression):
+                text = bot.compile_purge_filter(expression).text
+                self.assertEqual(bot.compile_purge_filter(text).text, text)
+
+    def test_invalid_terms_are_rejected(self):
+        for expression in ('nope', 'from:someone', 'before:soon', '!after:5', 'regex:(', 'regex:' + 'a' * 201):
+            with self.subTest(expression=expression):
+                with self.assertRaises(ValueError):
+                    bot.compile_purge_filter(expression)
+
+    def test_catastrophic_regexes_are_rejected(self):
+        for pattern in ('(a+)+$', '(\\w*\\s?)*$', '(.*a){8}b', '(a|a)+$', '(a|aa)+$', '(?:x|xy)*z',
+                        '(?=(a+)+)', '((ab|a)c)+', '(a?){20}'):
+            with self.subTest(pattern=pattern):
+                with self.assertRaises(ValueError):
+                    bot.compile_purge_filter(f'regex:"{pattern}"')
+
+    def test_safe_regexes_are_allowed(self):
+        for pattern in ('free\\s+nitro', '\\d{3}-\\d{4}', '(?:a|b)+c', '(\\d{3}-){2}\\d{4}', 'discord\\.gg/\\w+', 'a|b'):
+            with self.subTest(pattern=pattern):
+                bot.compile_purge_filter(f'regex:"{pattern}"')
+
+
+if __name__ == '__main__':
+    unittest.main()
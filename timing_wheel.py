@@ -0,0 +1,162 @@
+# timing_wheel.py
+"""
+Hierarchical timing wheel for large numbers of pending timers.
+
+Level 0 has one slot per tick; each higher level has slots that span a whole rotation of
+the level below. A timer is filed in the coarsest level that can hold it and moves down
+("cascades") as its slot comes up, so insert and cancel are O(1) and advancing costs O(1)
+per tick plus the timers that actually expire. Each pending timer is one slotted record
+plus one dict entry, no matter how far in the future it is due.
+"""
+import math
+import time
+
+
+class _TimerEntry:
+    """One pending timer. Kept tiny on purpose: there may be millions of these."""
+    __slots__ = ('key', 'target', 'cancelled')
+
+    def __init__(self, key, target):
+        self.key = key
+        self.target = target # Absolute tick index at which the timer fires
+        self.cancelled = False
+
+
+class TimingWheel:
+    """
+    Timers keyed by a hashable key, firing on tick boundaries.
+
+    `tick` is the resolution in seconds; a timer never fires early and fires at most one tick
+    late (plus however late `advance` is called). With the defaults (1s ticks, 4 levels of 256
+    slots) the wheel covers 2**32 seconds; anything further out waits in an overflow list.
+    """
+
+    def __init__(self, tick=1.0, slots=256, levels=4, clock=time.time):
+        if slots & (slots - 1):
+            raise ValueError("slots must be a power of two")
+        self.tick = tick
+        self._clock = clock
+        self._bits = slots.bit_length() - 1
+        self._mask = slots - 1
+        self._wheels = [[[] for _ in range(slots)] for _ in range(levels)]
+        self._overflow = [] # Timers beyond the top level's range
+        self._ready = [] # Timers whose tick has already been processed
+        self._entries = {} # key -> live _TimerEntry
+        self._stale = 0 # Cancelled records still sitting in slots
+        self._origin = clock()
+        self._current = 0 # Last processed tick index
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def _tick_of(self, timestamp):
+        return math.floor((timestamp - self._origin) / self.tick)
+
+    def next_tick_at(self):
+        """Timestamp of the next tick boundary, i.e. when `advance` may next return timers."""
+        return self._origin + (self._current + 1) * self.tick
+
+    def insert(self, key, due):
+        """Schedules `key` to fire at timestamp `due`, replacing any pending timer for it. O(1)."""
+        if key in self._entries:
+            self.cancel(key)
+        if not self._entries:
+            self._skip_idle_ticks(self._clock())
+        entry = _TimerEntry(key, math.ceil((due - self._origin) / self.tick))
+        self._entries[key] = entry
+        self._place(entry)
+
+    def cancel(self, key):
+        """Cancels the timer for `key`. O(1); the record is dropped lazily. Returns False if none was pending."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        entry.cancelled = True
+        self._stale += 1
+        if self._stale > max(1024, len(self._entries)):
+            self._compact() # Amortized: keeps cancelled records from outnumbering live ones
+        return True
+
+    def clear(self):
+        """Drops every pending timer."""
+        for wheel in self._wheels:
+            for i in range(len(wheel)):
+                wheel[i] = []
+        self._overflow = []
+        self._ready = []
+        self._entries.clear()
+        self._stale = 0
+
+    def advance(self, now=None):
+        """Processes every tick up to `now` and returns the keys of timers that fired, in order."""
+        target = self._tick_of(self._clock() if now is None else now)
+        if not self._entries:
+            self._skip_idle_ticks(now if now is not None else self._clock())
+            return []
+        fired = self._ready
+        self._ready = []
+        level0 = self._wheels[0]
+        while self._current < target:
+            self._current += 1
+            index = self._current & self._mask
+            if index == 0:
+                self._cascade(1)
+            if level0[index]:
+                fired.extend(level0[index])
+                level0[index] = []
+            if self._ready: # Cascaded timers that were due on this very tick
+                fired.extend(self._ready)
+                self._ready = []
+        keys = []
+        for entry in fired:
+            if not entry.cancelled:
+                del self._entries[entry.key]
+                keys.append(entry.key)
+            else:
+                self._stale -= 1
+        return keys
+
+    def _place(self, entry):
+        delta = entry.target - self._current
+        if delta <= 0:
+            self._ready.append(entry)
+            return
+        for level, wheel in enumerate(self._wheels):
+            if delta < 1 << (self._bits * (level + 1)):
+                wheel[(entry.target >> (self._bits * level)) & self._mask].append(entry)
+                return
+        self._overflow.append(entry)
+
+    def _cascade(self, level):
+        """Re-files the slot of `level` that just came up into the levels below it."""
+        if level == len(self._wheels):
+            entries, self._overflow = self._overflow, []
+        else:
+            index = (self._current >> (self._bits * level)) & self._mask
+            if index == 0:
+                self._cascade(level + 1)
+            wheel = self._wheels[level]
+            entries, wheel[index] = wheel[index], []
+        for entry in entries:
+            if entry.cancelled:
+                self._stale -= 1
+            else:
+                self._place(entry)
+
+    def _skip_idle_ticks(self, now):
+        """With nothing pending there is nothing to cascade, so jump straight to `now`."""
+        if self._stale:
+            self.clear()
+        self._current = max(self._current, self._tick_of(now))
+
+    def _compact(self):
+        for wheel in self._wheels:
+            for i, slot in enumerate(wheel):
+                if slot:
+                    wheel[i] = [entry for entry in slot if not entry.cancelled]
+        self._overflow = [entry for entry in self._overflow if not entry.cancelled]
+        self._ready = [entry for entry in self._ready if not entry.cancelled]
+        self._stale = 0
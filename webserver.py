@@ -1,44 +1,202 @@
 # webserver.py
-from flask import Flask
-from threading import Thread
+from aiohttp import web
+import hashlib
+import hmac
+import inspect
 import os # Import the os module to access environment variables
+import uuid
 
-app = Flask('')
+_metrics_provider = None # Callable returning Prometheus text, registered by bot.py
+_health_provider = None # Callable(readiness) -> (ok, report), registered by bot.py
+_admin_resources = {} # resource name -> provider(**path params) -> (version, data) or None
+_runner = None # aiohttp AppRunner while the server is running
 
-@app.route('/')
-def home():
+# --- Admin API Settings ---
+# With ADMIN_API_TOKEN set, /api requests need "Authorization: Bearer <token>".
+# Without it the API only answers requests from the local machine.
+ADMIN_API_TOKEN = os.environ.get("ADMIN_API_TOKEN")
+ADMIN_API_DEFAULT_PAGE_SIZE = 50
+ADMIN_API_MAX_PAGE_SIZE = 200
+_BOOT_ID = uuid.uuid4().hex[:8] # Store versions restart at every boot, so ETags include this
+
+def set_metrics_provider(provider):
+    """
+    Registers the function that renders the /metrics response.
+    The web server never imports the bot directly; bot.py hands it this callable instead.
+    """
+    global _metrics_provider
+    _metrics_provider = provider
+
+def set_health_provider(provider):
+    """
+    Registers the function that builds the /healthz and /readyz reports.
+    It is called with readiness=False for liveness and readiness=True for readiness.
+    """
+    global _health_provider
+    _health_provider = provider
+
+def register_admin_resource(name, provider):
+    """
+    Registers the data behind one admin API resource.
+    The provider gets the route's path parameters as ints and returns (version, data), where
+    version changes whenever data would, or None if the resource doesn't exist. The provider may
+    be a coroutine function. List data is paginated; anything else is returned as-is.
+    """
+    _admin_resources[name] = provider
+
+async def home(request):
     """
     A simple home route for the web server.
     This route is often used by hosting platforms like Render for health checks.
     """
-    return "Bot is alive!"
+    return web.Response(text="Bot is alive!")
+
+async def metrics(request):
+    """
+    Prometheus scrape endpoint.
+    Returns an empty exposition until the bot has registered its metrics provider.
+    """
+    body = _metrics_provider() if _metrics_provider else ""
+    return web.Response(body=body.encode('utf-8'), headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
+def _health_response(readiness):
+    if _health_provider is None:
+        # The process is up but the bot hasn't wired itself in yet
+        ok, report = (not readiness), {"status": "starting" if readiness else "ok", "checks": {}}
+    else:
+        ok, report = _health_provider(readiness)
+    return web.json_response(report, status=200 if ok else 503)
+
+async def healthz(request):
+    """
+    Liveness probe. Fails (503) only when the bot looks wedged: the gateway has been down
+    too long, the loop is badly lagging, stores aren't being flushed, or a background task died.
+    """
+    return _health_response(readiness=False)
 
-def run():
+async def readyz(request):
     """
-    Starts the Flask web server.
+    Readiness probe. Fails (503) until the gateway is connected and ready, and whenever
+    heartbeat latency or loop lag are above their readiness thresholds.
+    """
+    return _health_response(readiness=True)
+
+def _admin_authorized(request):
+    if ADMIN_API_TOKEN:
+        supplied = request.headers.get('Authorization', '')
+        return hmac.compare_digest(supplied.encode(), f"Bearer {ADMIN_API_TOKEN}".encode())
+    return request.remote in ('127.0.0.1', '::1')
+
+def _page_params(request):
+    """Parses ?page=&per_page=, returning None for invalid values."""
+    try:
+        page = int(request.query.get('page', 1))
+        per_page = int(request.query.get('per_page', ADMIN_API_DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return None
+    if page < 1 or not 1 <= per_page <= ADMIN_API_MAX_PAGE_SIZE:
+        return None
+    return page, per_page
+
+async def _admin_resource(request, name):
+    """
+    Serves one admin API resource with pagination and ETag/If-None-Match support.
+    The ETag only depends on the store version and the request, so a matching poll
+    is answered with 304 before any data is sliced or serialized.
+    """
+    if not _admin_authorized(request):
+        return web.json_response({"error": "unauthorized"}, status=401)
+    provider = _admin_resources.get(name)
+    if provider is None:
+        return web.json_response({"error": "not available"}, status=503)
+    params = _page_params(request)
+    if params is None:
+        return web.json_response({"error": f"page must be >= 1 and per_page between 1 and {ADMIN_API_MAX_PAGE_SIZE}"}, status=400)
+    result = provider(**{key: int(value) for key, value in request.match_info.items()})
+    if inspect.isawaitable(result):
+        result = await result
+    if result is None:
+        return web.json_response({"error": "not found"}, status=404)
+    version, data = result
+
+    tag_source = f"{_BOOT_ID}:{name}:{version}:{request.path}:{params}"
+    etag = '"' + hashlib.sha1(tag_source.encode()).hexdigest()[:20] + '"'
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if etag in request.headers.get('If-None-Match', ''):
+        return web.Response(status=304, headers=headers)
+
+    if isinstance(data, list):
+        page, per_page = params
+        start = (page - 1) * per_page
+        body = {
+            "items": data[start:start + per_page],
+            "page": page,
+            "per_page": per_page,
+            "total": len(data),
+            "pages": (len(data) + per_page - 1) // per_page,
+        }
+    else:
+        body = data
+    return web.json_response(body, headers=headers)
+
+async def api_guild_warnings(request):
+    """Warnings of a guild's members, most-warned first."""
+    return await _admin_resource(request, 'guild_warnings')
+
+async def api_user_warnings(request):
+    """All warnings recorded for one user."""
+    return await _admin_resource(request, 'user_warnings')
+
+async def api_afk(request):
+    """Everyone currently AFK."""
+    return await _admin_resource(request, 'afk')
+
+async def api_automod(request):
+    """The current AutoMod configuration."""
+    return await _admin_resource(request, 'automod')
+
+def create_app():
+    """Builds the aiohttp application with all routes registered."""
+    app = web.Application()
+    app.router.add_get('/', home)
+    app.router.add_get('/metrics', metrics)
+    app.router.add_get('/healthz', healthz)
+    app.router.add_get('/readyz', readyz)
+    app.router.add_get(r'/api/guilds/{guild_id:\d+}/warnings', api_guild_warnings)
+    app.router.add_get(r'/api/users/{user_id:\d+}/warnings', api_user_warnings)
+    app.router.add_get('/api/afk', api_afk)
+    app.router.add_get('/api/automod', api_automod)
+    return app
+
+async def start_web_server():
+    """
+    Starts the web server on the running event loop (the bot's own loop).
     It binds to 0.0.0.0 and gets the port from the 'PORT' environment variable,
     defaulting to 8080 if the variable is not set.
     """
-    # Use host='0.0.0.0' to make the server accessible from outside the container
-    # Use port=os.environ.get('PORT', 8080) if your hosting platform provides a PORT env variable
-    # For Render, typically port 10000 is used for web services, but 8080 is a common default.
+    global _runner
+    if _runner is not None:
+        return # Already serving
     # Render will automatically set the PORT environment variable.
-    app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 8080))) # Cast port to int
+    port = int(os.environ.get('PORT', 8080))
+    runner = web.AppRunner(create_app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, '0.0.0.0', port).start()
+    _runner = runner
+    print(f"Web server started on port {port}.")
 
-def keep_alive():
-    """
-    Starts the web server in a separate thread.
-    This allows the main bot process to continue running without being blocked by the web server.
-    """
-    server_thread = Thread(target=run)
-    server_thread.start()
-    print("Web server started in a separate thread.")
+async def stop_web_server():
+    """Stops the web server and releases its port. Safe to call if it never started."""
+    global _runner
+    if _runner is None:
+        return
+    runner, _runner = _runner, None
+    await runner.cleanup()
+    print("Web server stopped.")
 
 if __name__ == '__main__':
     # This block will only run if webserver.py is executed directly.
-    # In a Render setup, bot.py will import and call keep_alive().
+    # In a Render setup, bot.py starts the server from its setup hook.
     # For local testing of the web server:
-    print("Running web server directly for testing...")
-    keep_alive()
-    print(f"Access http://127.0.0.1:{os.environ.get('PORT', 8080)} in your browser to test.")
-    # For bot integration, the bot's event loop keeps the process alive.
+    print(f"Running web server directly for testing on http://127.0.0.1:{os.environ.get('PORT', 8080)} ...")
+    web.run_app(create_app(), port=int(os.environ.get('PORT', 8080)))